@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Connect the signal handlers that invalidate cached decks
+        from . import deck_cache  # noqa: F401
+        # Rebuilding the flashcard table in a migration drops the search
+        # index triggers - put them back (see search.py)
+        from .search import reinstall_search_triggers
+        post_migrate.connect(reinstall_search_triggers, sender=self)
@@ -0,0 +1,251 @@
+"""
+ASYNC VIEWS - The "Waiters Who Don't Stand at the Pass" in our Restaurant
+
+A sync view is a waiter who takes an order and then stands at the kitchen
+pass until the dish is ready: while the database or Gemini is busy, that
+thread can't serve anyone else. An async view takes the order and, while
+the dish cooks, serves the other tables. Under an ASGI server one web
+process can then hold hundreds of in-flight generations instead of one per
+thread.
+
+ENDPOINTS (same URLs and responses as the DRF views in views.py - urls.py
+routes here instead when settings.ASYNC_VIEWS is on):
+- GET /api/topics/             a page of the user's topics
+- POST /api/topics/            upload a document, generate its flashcards
+- POST /api/topics/batch/      upload several documents at once
+- GET /api/flashcards/<id>/    a page of a deck (with ETag / 304 support)
+- GET /api/jobs/<id>/events/   a job's progress and cards as they're saved
+
+WHAT'S DIFFERENT FROM views.py:
+- DRF's APIView can't run async code, so these are plain Django async
+  views: AsyncAPIView checks the JWT itself and errors are JsonResponses
+- Database access uses the async ORM (afirst, acreate, async for)
+- An upload isn't left for run_generation_worker: jobs.start_generation_job()
+  runs it on this process's event loop. Gemini is awaited through the async
+  client and text extraction runs in a bounded thread pool
+  (see the async pipeline in geminiapi.py)
+
+RUNNING:
+    ASYNC_VIEWS=True uvicorn backend.asgi:application
+Under runserver (WSGI) these views still work, but every request gets its
+own short-lived event loop, so uploads are left queued for the worker.
+
+CONCEPTS: async/await, ASGI, Event Loops, Non-blocking I/O
+RELATED: views.py (sync versions), jobs.py, geminiapi.py, urls.py
+"""
+
+import logging
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed, NotFound
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .deck_cache import aget_cached_page, astore_page, deck_etag
+from .events import ajob_event_stream
+from .geminiapi import validate_upload
+from .instrumentation import span
+from .jobs import aenqueue_generation_job, enqueue_generation_batch, start_generation_job
+from .models import Flashcard, GenerationJob, Topic
+from .pagination import KeysetPagination
+from .serializers import (
+    FlashcardSerializer, GenerationBatchSerializer, GenerationJobSerializer, TopicSerializer,
+)
+from .views import client_has_etag, read_batch_upload, topics_with_deck_stats
+
+logger = logging.getLogger('api')
+
+
+class AsyncAPIView(View):
+    """
+    Base class: JWT authentication and JSON errors, like DRF's APIView.
+
+    Every request must carry a valid "Authorization: Bearer <token>"
+    header; request.user is the token's user inside the handlers.
+    """
+    authentication = JWTAuthentication()
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Authenticated by token, not cookie, so no CSRF check (same as DRF)
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            # Looking up the token's user is a database query
+            result = await sync_to_async(self.authentication.authenticate)(request)
+        except AuthenticationFailed as e:
+            return self.unauthorized(e.detail)
+        if result is None:
+            return self.unauthorized("Authentication credentials were not provided.")
+        request.user = result[0]
+
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except NotFound as e:
+            return JsonResponse({"detail": e.detail}, status=404)
+
+    def unauthorized(self, detail):
+        if isinstance(detail, str):
+            detail = {"detail": detail}
+        response = JsonResponse(detail, status=401)
+        response["WWW-Authenticate"] = self.authentication.authenticate_header(None)
+        return response
+
+
+def _read_form(request):
+    # Parsing a multipart body writes large uploads to a temp file
+    # (blocking I/O), so it runs in a thread
+    return request.POST, request.FILES
+
+
+class TopicListCreate(AsyncAPIView):
+    """
+    ENDPOINT: GET /api/topics/ or POST /api/topics/
+    (async version of views.TopicListCreate)
+    """
+    keyset_ordering = ("-created_at", "-id")  # Newest topics first
+
+    async def get(self, request):
+        """One page of the user's topics, with card counts"""
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(
+            topics_with_deck_stats(request.user), Request(request), view=self
+        )
+        with span("serialize"):
+            data = TopicSerializer(page, many=True).data
+        return JsonResponse({"next": paginator.get_next_link(), "results": data})
+
+    async def post(self, request):
+        """
+        Queue the upload and start generating it on this event loop
+
+        Responds 202 with the job straight away, exactly like the sync view;
+        the frontend follows the job at /api/jobs/<id>/ (or .../events/).
+        """
+        form, files = await sync_to_async(_read_form, thread_sensitive=False)(request)
+        serializer = TopicSerializer(data=form)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+
+        uploaded_file = files.get("file")
+        if not uploaded_file:
+            return JsonResponse({"error": "No file uploaded"}, status=400)
+        try:
+            validate_upload(uploaded_file)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        with span("upload"):
+            job = await aenqueue_generation_job(
+                uploaded_file, serializer.validated_data.get("name"), request.user
+            )
+        data = GenerationJobSerializer(job).data
+
+        # Only an ASGI server keeps the event loop (and the task) running
+        # after the response has been sent
+        if isinstance(request, ASGIRequest) and start_generation_job(job):
+            logger.debug("Generating job %s in the web process", job.id)
+        else:
+            logger.debug("Queued generation job %s for a worker", job.id)
+        return JsonResponse(data, status=202)
+
+
+class GenerationBatchCreate(AsyncAPIView):
+    """
+    ENDPOINT: POST /api/topics/batch/
+    (async version of views.GenerationBatchCreate)
+
+    Every file is started on this event loop right away, so the files of a
+    batch are generated concurrently (each still limited by the rate
+    limiter and LLM_MAX_IN_FLIGHT).
+    """
+
+    async def post(self, request):
+        form, files = await sync_to_async(_read_form, thread_sensitive=False)(request)
+        try:
+            uploads, shared_name, rejected = read_batch_upload(form, files)
+        except ValueError as e:
+            return JsonResponse({"error": str(e), "rejected": []}, status=400)
+
+        with span("upload"):
+            # One transaction for the whole batch, so it runs in a thread
+            batch, jobs = await sync_to_async(enqueue_generation_batch)(
+                uploads, request.user, shared_name
+            )
+        # The jobs were just created, so serialize them without a query
+        batch._prefetched_objects_cache = {"jobs": jobs}
+        data = GenerationBatchSerializer(batch).data
+        data["rejected"] = rejected
+
+        if isinstance(request, ASGIRequest):
+            started = sum(start_generation_job(job) for job in jobs)
+            logger.debug("Batch %s: generating %d of %d files in the web process",
+                         batch.id, started, len(jobs))
+        return JsonResponse(data, status=202)
+
+
+class FlashcardListByTopic(AsyncAPIView):
+    """
+    ENDPOINT: GET /api/flashcards/<topic_id>/
+    (async version of views.FlashcardListByTopic)
+    """
+
+    async def get(self, request, topic_id):
+        """A page of the deck: 304, cached page, or query + serialize"""
+        topic = await Topic.objects.filter(id=topic_id, user=request.user).afirst()
+        if topic is None:
+            return JsonResponse({"detail": "No Topic matches the given query."}, status=404)
+
+        paginator = KeysetPagination()
+        drf_request = Request(request)
+        cursor = drf_request.query_params.get(paginator.cursor_query_param)
+        page_size = paginator.get_page_size(drf_request)
+        etag = deck_etag(topic, cursor, page_size)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if client_has_etag(request, etag):
+            return HttpResponseNotModified(headers=headers)
+
+        cached = await aget_cached_page(topic, cursor, page_size)
+        if cached is not None:
+            data, paginator.next_cursor = cached
+            paginator.request = drf_request
+        else:
+            page = await paginator.apaginate_queryset(
+                Flashcard.objects.filter(topic=topic), drf_request, view=self
+            )
+            with span("serialize"):
+                data = FlashcardSerializer(page, many=True).data
+            await astore_page(topic, cursor, page_size, data, paginator.next_cursor)
+
+        return JsonResponse(
+            {"next": paginator.get_next_link(), "results": data}, headers=headers
+        )
+
+
+class GenerationJobEvents(AsyncAPIView):
+    """
+    ENDPOINT: GET /api/jobs/<id>/events/
+    (async version of views.GenerationJobEvents)
+
+    Waiting between polls doesn't hold a thread here, so the stream stays
+    open until the job has finished (see events.py).
+    """
+
+    async def get(self, request, pk):
+        # Security: users can only follow their own jobs
+        job = await GenerationJob.objects.filter(pk=pk, user=request.user).afirst()
+        if job is None:
+            return JsonResponse({"detail": "No GenerationJob matches the given query."}, status=404)
+
+        response = StreamingHttpResponse(ajob_event_stream(job), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Ask nginx-style proxies not to buffer the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
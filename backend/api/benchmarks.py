@@ -0,0 +1,367 @@
+"""
+INGESTION BENCHMARKS - The "Stopwatch in the Kitchen"
+
+Measures where the time goes between "student uploads a file" and "the
+flashcards are in the database", stage by stage, for synthetic documents
+of known size. Run it with:
+
+    python manage.py benchmark_ingestion
+
+STAGES:
+- upload:     POST /api/topics/ (multipart parsing, SHA-256, storing the job)
+- extract:    extract_text_from_file() with the production limits, on the
+              upload as stored in MEDIA_ROOT (the file a worker reads)
+- preprocess: preprocess_text() on the extracted text
+- chunk:      split_into_chunks() with settings.LLM_CHUNK_TOKENS
+- parse:      parse_flashcards() on one LLM-sized response per chunk
+- end_to_end: a generation job queued for the upload and run as a worker
+              runs it (run_generation_job() with the fake LLM provider)
+
+For every stage we record wall time and CPU time (best of N runs), peak
+Python memory (tracemalloc, in a separate run so it doesn't slow the timed
+ones) and the number of SQL queries.
+
+Queries are counted with a connection.execute_wrapper() rather than
+CaptureQueriesContext: the test client sends request_started, which
+empties connection.queries_log, so every query of the upload stage would
+be missed.
+
+CAVEATS:
+- CPU time only counts this process (not PDF extraction worker processes)
+- tracemalloc sees Python allocations, not memory-mapped files
+
+CONCEPTS: Benchmarking, Profiling, Synthetic Workloads, Regression Baselines
+RELATED: management/commands/benchmark_ingestion.py, llm_providers.py (FakeProvider)
+"""
+
+import io
+import json
+import random
+import time
+import tracemalloc
+import zipfile
+import zlib
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.db import connection
+from rest_framework.test import APIClient
+
+from .geminiapi import MAX_FILE_SIZE, parse_flashcards
+from .jobs import enqueue_generation_job, run_generation_job
+from .llm_providers import FakeProvider
+from .models import GenerationJob
+from .utils.chunking import split_into_chunks, CHARS_PER_TOKEN
+from .utils.preprocessing import preprocess_text
+from .utils.text_extractors import extract_text_from_file
+
+MIME_TYPES = {
+    "txt": "text/plain",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf": "application/pdf",
+}
+
+_WORDS = (
+    "cell membrane protein enzyme energy molecule structure function process "
+    "system theory evidence model data result analysis example concept the of "
+    "and to in is that for as with by on are this from which be it an"
+).split()
+
+
+# ============================================
+# SYNTHETIC DOCUMENTS
+# ============================================
+
+def synthetic_text(size, seed=0):
+    """Deterministic lecture-notes-like text of about `size` characters."""
+    rng = random.Random(seed)
+    paragraphs = []
+    total = 0
+    while total < size:
+        sentences = []
+        for _ in range(rng.randint(3, 7)):
+            words = rng.choices(_WORDS, k=rng.randint(8, 20))
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+    return "\n\n".join(paragraphs)[:size]
+
+
+def make_txt(size, seed=0):
+    return synthetic_text(size, seed).encode("utf-8")
+
+
+def _docx_bytes(text):
+    paragraphs = "".join(
+        f"<w:p><w:r><w:t>{paragraph}</w:t></w:r></w:p>" for paragraph in text.split("\n\n")
+    )
+    files = {
+        "[Content_Types].xml": (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            "</Types>"
+        ),
+        "_rels/.rels": (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+            'relationships/officeDocument" Target="word/document.xml"/>'
+            "</Relationships>"
+        ),
+        "word/document.xml": (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f"<w:body>{paragraphs}</w:body></w:document>"
+        ),
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def make_docx(size, seed=0):
+    """A .docx of about `size` bytes (the text inside is compressed)."""
+    # Estimate how much text compresses down to `size` bytes from a sample
+    sample = synthetic_text(64 * 1024, seed).encode("utf-8")
+    ratio = len(sample) / len(zlib.compress(sample))
+    return _docx_bytes(synthetic_text(int(size * ratio), seed))
+
+
+def make_pdf(size, seed=0, lines_per_page=50, chars_per_line=90):
+    """A text-only PDF of about `size` bytes (uncompressed content streams)."""
+    text = synthetic_text(size, seed).replace("\n\n", " ")
+    lines = [text[i:i + chars_per_line] for i in range(0, len(text), chars_per_line)]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    # Objects 1-3: catalog, page tree, font. Then a page + content stream per page.
+    page_ids = [4 + 2 * number for number in range(len(pages))]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(pages)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for page_id, page_lines in zip(page_ids, pages):
+        content = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({line}) '" for line in page_lines) + " ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream".encode())
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+MAKERS = {"txt": make_txt, "docx": make_docx, "pdf": make_pdf}
+
+
+def make_document(file_format, size):
+    """Build a synthetic document, never larger than the upload limit."""
+    return MAKERS[file_format](min(size, MAX_FILE_SIZE - 64 * 1024))
+
+
+# ============================================
+# MEASURING
+# ============================================
+
+class _QueryCounter:
+    """connection.execute_wrapper() that counts the queries it sees."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(function, repeat=1):
+    """
+    Run a stage and measure it.
+
+    Returns:
+        tuple: (the function's last result, {"wall_ms", "cpu_ms", "peak_kb", "queries"})
+    """
+    walls, cpus = [], []
+    for _ in range(repeat):
+        queries = _QueryCounter()
+        with connection.execute_wrapper(queries):
+            wall, cpu = time.perf_counter(), time.process_time()
+            result = function()
+            walls.append(time.perf_counter() - wall)
+            cpus.append(time.process_time() - cpu)
+
+    # Separate run for memory: tracemalloc slows Python down noticeably
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, {
+        "wall_ms": round(min(walls) * 1000, 2),
+        "cpu_ms": round(min(cpus) * 1000, 2),
+        "peak_kb": round(peak / 1024, 1),
+        "queries": queries.count,
+    }
+
+
+def _uploaded_file(name, data, content_type):
+    """An upload as Django would hand it to a view (in memory or spooled to disk)."""
+    if len(data) <= settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+        return SimpleUploadedFile(name, data, content_type=content_type)
+    uploaded = TemporaryUploadedFile(name, content_type, len(data), None)
+    uploaded.write(data)
+    uploaded.seek(0)
+    return uploaded
+
+
+def benchmark_document(file_format, size, user, repeat=1):
+    """
+    Benchmark every ingestion stage for one synthetic document.
+
+    Expects the fake LLM provider and a scratch database (see the command).
+    """
+    data = make_document(file_format, size)
+    mime_type = MIME_TYPES[file_format]
+    name = f"bench.{file_format}"
+    stages = {}
+
+    client = APIClient()
+    client.force_authenticate(user)
+
+    def upload():
+        response = client.post(
+            "/api/topics/",
+            {"name": "Benchmark", "file": SimpleUploadedFile(name, data, content_type=mime_type)},
+            format="multipart",
+        )
+        assert response.status_code == 202, response.content
+    _, stages["upload"] = measure(upload, repeat)
+
+    # Workers extract from the copy of the upload stored with the job
+    stored = Path(settings.MEDIA_ROOT) / name
+    stored.write_bytes(data)
+    max_chars = settings.EXTRACT_MAX_TOKENS * CHARS_PER_TOKEN or None
+    text, stages["extract"] = measure(
+        lambda: extract_text_from_file(
+            str(stored), mime_type, max_chars=max_chars, pdf_processes=settings.PDF_EXTRACT_PROCESSES
+        ),
+        repeat,
+    )
+
+    (prompt_text, preprocessing), stages["preprocess"] = measure(
+        lambda: preprocess_text(text), repeat
+    )
+
+    chunks, stages["chunk"] = measure(
+        lambda: split_into_chunks(prompt_text, settings.LLM_CHUNK_TOKENS), repeat
+    )
+
+    provider = FakeProvider()
+    responses = [provider.generate(chunk) for chunk in chunks]
+    _, stages["parse"] = measure(
+        lambda: [parse_flashcards(response) for response in responses], repeat
+    )
+
+    stored.unlink()
+
+    def end_to_end():
+        # A fresh upload every run: storing a spooled upload moves its temp file
+        job = enqueue_generation_job(_uploaded_file(name, data, mime_type), "Benchmark", user)
+        run_generation_job(job)
+        assert job.status == GenerationJob.STATUS_DONE, job.error
+    _, stages["end_to_end"] = measure(end_to_end, repeat)
+
+    return {
+        "file_bytes": len(data),
+        "text_chars": len(text),
+        "tokens_before": preprocessing["tokens_before"],
+        "tokens_after": preprocessing["tokens_after"],
+        "chunks": len(chunks),
+        "stages": stages,
+    }
+
+
+def run_benchmarks(formats, sizes, repeat=1, progress=None):
+    """
+    Benchmark every format at every size.
+
+    Returns:
+        dict: {"txt/10k": {"file_bytes": ..., "stages": {...}}, ...}
+    """
+    user, _ = User.objects.get_or_create(username="benchmark")
+    results = {}
+    for file_format in formats:
+        for label, size in sizes:
+            case = f"{file_format}/{label}"
+            if progress:
+                progress(case)
+            results[case] = benchmark_document(file_format, size, user, repeat)
+    return results
+
+
+# ============================================
+# BASELINES
+# ============================================
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Find stages that got worse than the baseline.
+
+    Timings and memory may be up to `tolerance` (0.5 = 50%) worse before
+    they count, and tiny absolute changes are ignored as noise. Query
+    counts are deterministic, so any increase counts.
+
+    Returns:
+        list[str]: One line per regression
+    """
+    regressions = []
+    for case, result in results.items():
+        base_case = baseline.get(case)
+        if not base_case:
+            continue
+        for stage, current in result["stages"].items():
+            base = base_case["stages"].get(stage)
+            if not base:
+                continue
+            checks = [("wall_ms", 5.0), ("cpu_ms", 5.0), ("peak_kb", 256.0)]
+            for metric, noise in checks:
+                limit = base[metric] * (1 + tolerance)
+                if current[metric] > limit and current[metric] - base[metric] > noise:
+                    regressions.append(
+                        f"{case} {stage}: {metric} {current[metric]} > baseline {base[metric]}"
+                    )
+            if current["queries"] > base["queries"]:
+                regressions.append(
+                    f"{case} {stage}: queries {current['queries']} > baseline {base['queries']}"
+                )
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as file:
+        return json.load(file)["results"]
+
+
+def save_results(path, results, meta):
+    with open(path, "w") as file:
+        json.dump({"meta": meta, "results": results}, file, indent=2, sort_keys=True)
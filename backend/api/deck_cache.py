@@ -0,0 +1,108 @@
+"""
+DECK CACHE - The "Plated and Waiting" Counter in our Restaurant
+
+Once a deck is generated it rarely changes, yet students open it again and
+again. Instead of querying and serializing the same flashcards every time,
+we keep each serialized page of a deck in Django's cache, and tell the
+browser which version it already has (ETag) so it can skip the download.
+
+HOW INVALIDATION WORKS (VERSIONED KEYS):
+Each Topic has a deck_version number that goes up whenever one of its
+flashcards is created, edited, reviewed or deleted. Cache keys and ETags
+include that number, so after a change:
+- the old cache entries are simply never asked for again (they expire)
+- the browser's ETag no longer matches, so it gets the new deck
+Nothing has to find and delete old entries, and the version lives in the
+database, so a bump made by a worker process is seen by every web process.
+
+WHERE VERSIONS ARE BUMPED (once per topic, never once per card):
+- save_flashcards() in geminiapi.py, after each batch it saves
+- views.py, where single cards are created, deleted or reviewed
+- a pre_delete signal on Topic, before the topic and its cards go
+
+WHY NOT A SIGNAL ON EVERY FLASHCARD:
+A post_save/post_delete receiver on Flashcard would cost one UPDATE per
+card. Worse, Django can only delete a topic's cards with one
+"DELETE ... WHERE topic_id = ..." when nothing has to happen per card:
+no signal receivers, and no on_delete that Django carries out itself. A
+receiver makes it load every card and send a signal for each - half a
+minute for a 50,000-card topic. (That's also why FlashcardBand.flashcard
+is DO_NOTHING: the bands are deleted by topic, see models.py.)
+
+CONCEPTS: Caching, Versioned Cache Keys, ETags, Conditional GET, Signals
+RELATED: views.py (FlashcardListByTopic), models.py (Topic.deck_version)
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import Topic
+
+# Change this when FlashcardSerializer's output changes, so cached pages
+# and ETags from the old format are no longer used
+DECK_CACHE_VERSION = 1
+
+
+def bump_deck_version(topic_id):
+    """Mark every cached page (and ETag) of this topic's deck as stale."""
+    Topic.objects.filter(pk=topic_id).update(deck_version=F("deck_version") + 1)
+
+
+def _page_id(topic, cursor, page_size):
+    """Identify one page of one version of a deck."""
+    return f"{DECK_CACHE_VERSION}:{topic.pk}:{topic.deck_version}:{cursor or ''}:{page_size}"
+
+
+def deck_etag(topic, cursor, page_size):
+    """
+    Build the ETag for a page of a deck.
+
+    The cursor is hashed because it's client-supplied and may contain
+    characters that aren't allowed in a header.
+    """
+    digest = hashlib.sha256(_page_id(topic, cursor, page_size).encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def get_cached_page(topic, cursor, page_size):
+    """
+    Return the cached (serialized flashcards, next cursor) for a page.
+
+    Returns:
+        tuple | None: None on a miss
+    """
+    return cache.get(f"deck:{_page_id(topic, cursor, page_size)}")
+
+
+def store_page(topic, cursor, page_size, data, next_cursor):
+    """Remember a serialized page for settings.DECK_CACHE_TIMEOUT seconds."""
+    cache.set(
+        f"deck:{_page_id(topic, cursor, page_size)}",
+        (data, next_cursor),
+        settings.DECK_CACHE_TIMEOUT,
+    )
+
+
+async def aget_cached_page(topic, cursor, page_size):
+    """get_cached_page() for async views."""
+    return await cache.aget(f"deck:{_page_id(topic, cursor, page_size)}")
+
+
+async def astore_page(topic, cursor, page_size, data, next_cursor):
+    """store_page() for async views."""
+    await cache.aset(
+        f"deck:{_page_id(topic, cursor, page_size)}",
+        (data, next_cursor),
+        settings.DECK_CACHE_TIMEOUT,
+    )
+
+
+@receiver(pre_delete, sender=Topic)
+def invalidate_deck(sender, instance, **kwargs):
+    # The topic's cards are deleted with it, without signals of their own
+    bump_deck_version(instance.pk)
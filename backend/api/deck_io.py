@@ -0,0 +1,233 @@
+"""
+DECK IMPORT/EXPORT - The "Takeaway Counter" of our Restaurant
+
+Students move decks between Help2Study, spreadsheets and Anki. Without a
+bulk path, exporting means paging through the deck JSON, and importing
+means one POST per card - 50,000 requests for a big deck.
+
+FORMATS (one card per row/line, question then answer):
+- csv:   a "question,answer" header, then one row per card
+- jsonl: one {"question": ..., "answer": ...} object per line
+- anki:  tab-separated text with Anki's file headers (#separator:tab ...),
+         which Anki's File → Import reads as Front/Back notes
+
+STREAMING, BOTH WAYS:
+- Export iterates the deck with QuerySet.iterator(), which reads rows from
+  the database cursor EXPORT_CHUNK_SIZE at a time instead of loading the
+  whole deck, and yields the file a chunk at a time to a
+  StreamingHttpResponse. Memory stays the same for 50 or 50,000 cards.
+- Import reads the uploaded file line by line (Django has already spooled
+  big uploads to a temp file) and saves every settings.IMPORT_BATCH_SIZE
+  cards with save_flashcards() - batched bulk_create, the near-duplicate
+  check (importing the same deck twice doesn't double it) and the search
+  and dedupe indexes, one short transaction per batch so other writers
+  get their turn in between. Big files are imported by a worker instead
+  of in the request (see DeckImport and jobs.run_import_job).
+
+CONCEPTS: Streaming, Generators, Batching, File Formats
+RELATED: views.py (DeckExport, DeckImport), geminiapi.py (save_flashcards),
+         jobs.py (run_import_job)
+"""
+
+import csv
+import io
+import json
+from pathlib import Path
+
+from django.conf import settings
+
+from .geminiapi import save_flashcards
+
+# Rows fetched from the database, and written out, per chunk
+EXPORT_CHUNK_SIZE = 2000
+
+# format: (content type, file extension)
+FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "jsonl": ("application/x-ndjson", ".jsonl"),
+    "anki": ("text/tab-separated-values", ".txt"),
+}
+_EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".txt": "anki", ".tsv": "anki"}
+
+# Anki reads these lines at the top of a text file as import settings
+ANKI_HEADER = "#separator:tab\n#html:false\n#columns:Front\tBack\n"
+# Header cells we recognise (and skip) on the first row of a CSV file
+_HEADER_NAMES = {("question", "answer"), ("front", "back")}
+
+# Invalid rows reported back in detail (the rest are only counted)
+MAX_REPORTED_ERRORS = 20
+
+
+def detect_format(file_name, requested=None):
+    """
+    The format of an upload: as requested, or from its file extension.
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    file_format = requested or _EXTENSIONS.get(Path(file_name).suffix.lower())
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format - use one of: {', '.join(FORMATS)}")
+    return file_format
+
+
+# ============================================
+# EXPORT
+# ============================================
+
+def _csv_writer(buffer, file_format):
+    if file_format == "anki":
+        # Fields with tabs or line breaks get quoted, which Anki understands
+        return csv.writer(buffer, delimiter="\t", lineterminator="\n")
+    return csv.writer(buffer, lineterminator="\n")
+
+
+def export_deck(flashcards, file_format):
+    """
+    Yield an export file in chunks.
+
+    Args:
+        flashcards: A Flashcard queryset, in the order to export
+        file_format (str): One of FORMATS
+
+    EXAMPLE:
+        response = StreamingHttpResponse(export_deck(topic.flashcards.all(), "csv"))
+    """
+    buffer = io.StringIO()
+    if file_format == "jsonl":
+        def write(question, answer):
+            buffer.write(json.dumps({"question": question, "answer": answer}, ensure_ascii=False))
+            buffer.write("\n")
+    else:
+        write = _csv_writer(buffer, file_format).writerow
+        if file_format == "anki":
+            buffer.write(ANKI_HEADER)
+        else:
+            write(("question", "answer"))
+
+    rows = flashcards.values_list("question", "answer").iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for number, (question, answer) in enumerate(rows, start=1):
+        if file_format == "jsonl":
+            write(question, answer)
+        else:
+            write((question, answer))
+        if number % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# ============================================
+# IMPORT
+# ============================================
+
+def _text_lines(uploaded_file):
+    """The upload as a text stream (UTF-8, with or without a byte order mark)."""
+    uploaded_file.seek(0)
+    return io.TextIOWrapper(uploaded_file.file, encoding="utf-8-sig", newline="")
+
+
+def _csv_rows(lines, file_format):
+    """(line number, question, answer) for each row of a CSV/Anki file."""
+    if file_format == "anki":
+        reader = csv.reader(lines, delimiter="\t")
+    else:
+        reader = csv.reader(lines)
+    first = True
+    for row in reader:
+        if file_format == "anki" and first and row and row[0].startswith("#"):
+            continue  # Anki file headers, only at the top of the file
+        if first and tuple(cell.strip().lower() for cell in row[:2]) in _HEADER_NAMES:
+            first = False
+            continue
+        first = False
+        if not any(cell.strip() for cell in row):
+            continue
+        yield reader.line_num, row[0] if row else "", row[1] if len(row) > 1 else ""
+
+
+def _jsonl_rows(lines):
+    """(line number, question, answer) for each line of a JSONL file."""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            card = json.loads(line)
+        except json.JSONDecodeError:
+            yield line_number, None, None
+            continue
+        if not isinstance(card, dict):
+            yield line_number, None, None
+            continue
+        yield line_number, card.get("question"), card.get("answer")
+
+
+def read_flashcards(uploaded_file, file_format, errors):
+    """
+    Yield {"question", "answer"} dicts from an uploaded file, one at a time.
+
+    Rows without a question or an answer are skipped and reported in
+    `errors` (a dict with "count" and "rows", updated in place), so one
+    bad line doesn't stop a 50,000-card import.
+
+    Raises:
+        ValueError: If the file isn't UTF-8 text or isn't valid CSV
+    """
+    lines = _text_lines(uploaded_file)
+    rows = _jsonl_rows(lines) if file_format == "jsonl" else _csv_rows(lines, file_format)
+    try:
+        for line_number, question, answer in rows:
+            question = question.strip() if isinstance(question, str) else ""
+            answer = answer.strip() if isinstance(answer, str) else ""
+            if question and answer:
+                yield {"question": question, "answer": answer}
+                continue
+            errors["count"] += 1
+            if len(errors["rows"]) < MAX_REPORTED_ERRORS:
+                errors["rows"].append(
+                    {"line": line_number, "error": "Expected a question and an answer"}
+                )
+    except UnicodeDecodeError:
+        raise ValueError("The file must be UTF-8 text")
+    except csv.Error as e:
+        raise ValueError(f"Invalid {file_format} file: {e}")
+    finally:
+        # Leave the upload's file open for Django to clean up
+        lines.detach()
+
+
+def import_deck(uploaded_file, file_format, topic, user, job=None):
+    """
+    Save every card of an uploaded file into a topic, a batch at a time.
+
+    The cards are tagged with `job` when a worker runs the import, so the
+    job's event stream can send them.
+
+    Returns:
+        dict: "imported" (cards created), "duplicates" (skipped or merged
+              as near-duplicates, see dedupe.py), "invalid" (rows skipped)
+              and "errors" (details of the first few invalid rows)
+
+    Raises:
+        ValueError: If the file can't be read (cards from batches saved
+                    before the problem was found are kept)
+    """
+    errors = {"count": 0, "rows": []}
+    imported = read = 0
+    batch = []
+    for flashcard in read_flashcards(uploaded_file, file_format, errors):
+        batch.append(flashcard)
+        if len(batch) == settings.IMPORT_BATCH_SIZE:
+            imported += len(save_flashcards(batch, topic, user, job))
+            read += len(batch)
+            batch = []
+    if batch:
+        imported += len(save_flashcards(batch, topic, user, job))
+        read += len(batch)
+    return {
+        "imported": imported,
+        "duplicates": read - imported,
+        "invalid": errors["count"],
+        "errors": errors["rows"],
+    }
@@ -0,0 +1,180 @@
+"""
+NEAR-DUPLICATE DETECTION - The "Don't Plate the Same Dish Twice" Rule
+
+Re-uploading revised notes into a topic, or generating from overlapping
+chapters, produces cards that are worded slightly differently but ask the
+same thing. Without a check, every one of them lands in the deck: more
+rows, more to review, no more to learn.
+
+HOW IT WORKS (details in utils/minhash.py):
+- Every saved card has BANDS rows in the FlashcardBand table: the LSH band
+  hashes of its MinHash signature
+- New cards are fingerprinted the same way, and their band hashes are
+  looked up in the topic's index (one indexed query per 500 hashes)
+- Only cards that share a band hash are compared word by word, so the
+  cost depends on how many near-duplicates there are, not on deck size
+- New cards are also checked against each other (the same document
+  often yields the same question from two chunks)
+
+WHAT HAPPENS TO A DUPLICATE (settings.FLASHCARD_DEDUPE):
+- "skip":  the new card is dropped
+- "merge": the existing card is kept (with its id, so links and review
+           history stay), but takes the new card's answer if it's longer -
+           a revised upload usually explains more, not less
+- "off":   no check; cards are still indexed so turning it on later works
+
+CONCEPTS: Deduplication, Locality-Sensitive Hashing, Secondary Indexes
+RELATED: utils/minhash.py, geminiapi.py (save_flashcards), models.py (FlashcardBand)
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+from .instrumentation import count
+from .models import Flashcard, FlashcardBand
+from .utils.minhash import band_hashes, card_words, is_near_duplicate, signature
+
+# Hashes per IN (...) query, well below SQLite's variable limit
+LOOKUP_BATCH_SIZE = 500
+
+
+def fingerprint(flashcard):
+    """
+    Words and band hashes of a card (a dict with "question" and "answer").
+
+    Pure CPU work, so callers do it before taking the database write lock.
+    """
+    words = card_words(flashcard["question"], flashcard["answer"])
+    return words, band_hashes(signature(words))
+
+
+def candidates_query(topic_id, hashes):
+    """
+    SQL and parameters for the cards of a topic with any of these band hashes.
+
+    Written out rather than built with the ORM: Django prepares and checks
+    every value of an IN (...) list one by one, which took longer than
+    running the query.
+    """
+    placeholders = ", ".join(["%s"] * len(hashes))
+    sql = (
+        f"SELECT band_hash, flashcard_id FROM {FlashcardBand._meta.db_table} "
+        f"WHERE topic_id = %s AND band_hash IN ({placeholders})"
+    )
+    return sql, [topic_id, *hashes]
+
+
+def _candidates(topic, hashes):
+    """{band hash: [ids of existing cards in the topic with that band hash]}"""
+    found = defaultdict(list)
+    hashes = list(hashes)
+    with connection.cursor() as cursor:
+        for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+            cursor.execute(*candidates_query(topic.pk, hashes[start:start + LOOKUP_BATCH_SIZE]))
+            for band_hash, flashcard_id in cursor.fetchall():
+                found[band_hash].append(flashcard_id)
+    return found
+
+
+def remove_near_duplicates(flashcards, fingerprints, topic):
+    """
+    Drop (or merge) new cards that repeat a card already in the topic or
+    an earlier card in the same list.
+
+    Must run inside the transaction that saves the cards, so two saves
+    into the same topic can't both miss each other's cards.
+
+    Args:
+        flashcards (list[dict]): New cards ("question", "answer")
+        fingerprints (list): fingerprint() of each card
+        topic: The topic the cards are saved to
+
+    Returns:
+        tuple: (cards to create, their fingerprints,
+                existing Flashcards whose answer was merged and needs saving)
+    """
+    mode = settings.FLASHCARD_DEDUPE
+    if mode == "off":
+        return flashcards, fingerprints, []
+    threshold = settings.FLASHCARD_DEDUPE_THRESHOLD
+
+    existing_by_band = _candidates(topic, {h for _, hashes in fingerprints for h in hashes})
+    candidate_ids = list({card_id for ids in existing_by_band.values() for card_id in ids})
+    existing = {}
+    for start in range(0, len(candidate_ids), LOOKUP_BATCH_SIZE):
+        batch = Flashcard.objects.filter(id__in=candidate_ids[start:start + LOOKUP_BATCH_SIZE])
+        for card in batch.only("id", "topic_id", "question", "answer"):
+            existing[card.id] = (card, card_words(card.question, card.answer))
+
+    kept, kept_fingerprints, merged = [], [], {}
+    kept_by_band = defaultdict(list)  # band hash → indexes into kept
+
+    def find_duplicate(words, hashes):
+        """An existing Flashcard, the index of a kept new card, or None"""
+        checked_existing, checked_new = set(), set()
+        for band_hash in hashes:
+            for card_id in existing_by_band.get(band_hash, ()):
+                if card_id not in checked_existing:
+                    checked_existing.add(card_id)
+                    card, other_words = existing[card_id]
+                    if is_near_duplicate(words, other_words, threshold):
+                        return card
+            for index in kept_by_band.get(band_hash, ()):
+                if index not in checked_new:
+                    checked_new.add(index)
+                    if is_near_duplicate(words, kept_fingerprints[index][0], threshold):
+                        return index
+        return None
+
+    for flashcard, (words, hashes) in zip(flashcards, fingerprints):
+        duplicate = find_duplicate(words, hashes)
+        if duplicate is None:
+            for band_hash in hashes:
+                kept_by_band[band_hash].append(len(kept))
+            kept.append(flashcard)
+            kept_fingerprints.append((words, hashes))
+            continue
+
+        count(f"dedupe.{mode}")
+        if mode != "merge":
+            continue
+        if isinstance(duplicate, int):
+            # Repeats a card from this same list that isn't saved yet
+            if len(flashcard["answer"]) > len(kept[duplicate]["answer"]):
+                kept[duplicate] = {**kept[duplicate], "answer": flashcard["answer"]}
+        elif len(flashcard["answer"]) > len(duplicate.answer):
+            duplicate.answer = flashcard["answer"]
+            merged[duplicate.id] = duplicate
+
+    return kept, kept_fingerprints, list(merged.values())
+
+
+def index_flashcards(created, fingerprints=None):
+    """Add the band hashes of just-created cards (fingerprinted here if not given) to the index."""
+    if fingerprints is None:
+        fingerprints = [
+            fingerprint({"question": card.question, "answer": card.answer}) for card in created
+        ]
+    rows = [
+        (card.topic_id, card.pk, band_hash)
+        for card, (_, hashes) in zip(created, fingerprints)
+        for band_hash in hashes
+    ]
+    if not rows:
+        return
+    # BANDS rows per card add up (800k for a 50k-card import): a plain
+    # executemany() skips building and compiling a model instance per row,
+    # which made bulk_create() the slowest part of saving a deck
+    table = connection.ops.quote_name(FlashcardBand._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} (topic_id, flashcard_id, band_hash) VALUES (%s, %s, %s)", rows
+        )
+
+
+def reindex_flashcards(cards):
+    """Replace the band hashes of cards whose text has changed."""
+    FlashcardBand.objects.filter(flashcard__in=cards).delete()
+    index_flashcards(cards, None)
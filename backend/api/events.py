@@ -0,0 +1,142 @@
+"""
+JOB EVENTS - The "Order Status Screen" in our Restaurant
+
+While a worker generates flashcards, the browser keeps one response open
+(Server-Sent Events) and we push to it:
+- `job` events whenever the job's status or card count changes
+- `card` events for every flashcard as soon as it has been saved
+The stream ends after the job is done or has failed.
+
+WIRE FORMAT (text/event-stream):
+    event: card
+    data: {"id": 12, "question": "...", "answer": "...", ...}
+
+    event: job
+    data: {"id": 7, "status": "running", "flashcard_count": 3, ...}
+
+WHY POLL THE DATABASE:
+The worker is a separate process, so the web process can't be called back
+when a card is saved. Checking for rows newer than the last card we sent
+every JOB_EVENTS_POLL_INTERVAL seconds is one small indexed query. Only
+the job's own cards are sent (Flashcard.job): not the cards a topic had
+before an import into it, nor those of other jobs sharing the topic.
+
+WHO WAITS BETWEEN POLLS:
+- ajob_event_stream() (async_views.py, under ASGI) awaits asyncio.sleep(),
+  so a watching student costs the server a coroutine, not a thread
+- job_event_stream() (views.py, under WSGI) holds a worker thread while it
+  sleeps, so it gives up after JOB_EVENTS_MAX_SECONDS. The frontend then
+  polls GET /api/jobs/<id>/ until the job has finished
+
+CONCEPTS: Server-Sent Events, Streaming Responses, Long-lived Connections
+RELATED: views.py and async_views.py (GenerationJobEvents),
+         jobs.py (saves cards as they stream)
+"""
+
+import asyncio
+import json
+import time
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer
+
+from .models import Flashcard, GenerationJob
+from .serializers import FlashcardSerializer, GenerationJobSerializer
+
+# Send a comment line this often when nothing happens, so proxies
+# don't close the connection as idle (seconds)
+KEEPALIVE_INTERVAL = 15
+
+
+def format_event(event, data):
+    """Encode one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets clients that send `Accept: text/event-stream` (like EventSource)
+    through content negotiation. The stream itself is a
+    StreamingHttpResponse; this only renders errors (401, 404) as an event.
+    """
+    media_type = "text/event-stream"
+    format = "event-stream"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return format_event("error", data).encode("utf-8")
+
+
+# What the stream reads of the job on every poll
+JOB_FIELDS = ["status", "flashcard_count", "topic", "error", "result", "started_at", "finished_at"]
+_FINISHED = (GenerationJob.STATUS_DONE, GenerationJob.STATUS_FAILED)
+
+
+def _new_cards(job, after_id):
+    """The job's cards saved since the card with id `after_id`."""
+    return Flashcard.objects.filter(job=job, id__gt=after_id).order_by("id")
+
+
+class _EventStream:
+    """What one stream has sent so far, shared by the sync and async streams."""
+
+    def __init__(self):
+        self.last_card_id = 0
+        self.last_state = None
+        self.last_sent = time.monotonic()
+
+    def events(self, job, cards):
+        """The events of one poll: the new cards, then the job if it changed."""
+        events = [format_event("card", FlashcardSerializer(card).data) for card in cards]
+        if cards:
+            self.last_card_id = cards[-1].id
+        state = GenerationJobSerializer(job).data
+        if state != self.last_state:
+            events.append(format_event("job", state))
+            self.last_state = state
+        if events:
+            self.last_sent = time.monotonic()
+        elif time.monotonic() - self.last_sent >= KEEPALIVE_INTERVAL:
+            events.append(": keepalive\n\n")
+            self.last_sent = time.monotonic()
+        return events
+
+
+def job_event_stream(job):
+    """
+    Yield events for a generation job until it has finished, or until
+    JOB_EVENTS_MAX_SECONDS have passed (0 = no limit).
+
+    Args:
+        job: The GenerationJob to follow (already checked to be the user's)
+    """
+    stream = _EventStream()
+    max_seconds = settings.JOB_EVENTS_MAX_SECONDS
+    deadline = time.monotonic() + max_seconds
+
+    while True:
+        # Read the job before its cards: if it's finished now, every card
+        # it saved is already committed and gets sent below
+        job.refresh_from_db(fields=JOB_FIELDS)
+        cards = list(_new_cards(job, stream.last_card_id))
+        yield from stream.events(job, cards)
+
+        if job.status in _FINISHED:
+            return
+        if max_seconds and time.monotonic() >= deadline:
+            return  # The thread is needed elsewhere - the client polls from here
+        time.sleep(settings.JOB_EVENTS_POLL_INTERVAL)
+
+
+async def ajob_event_stream(job):
+    """job_event_stream() for async views: waits without holding a thread, for as long as the job runs."""
+    stream = _EventStream()
+
+    while True:
+        await job.arefresh_from_db(fields=JOB_FIELDS)
+        cards = [card async for card in _new_cards(job, stream.last_card_id)]
+        for event in stream.events(job, cards):
+            yield event
+
+        if job.status in _FINISHED:
+            return
+        await asyncio.sleep(settings.JOB_EVENTS_POLL_INTERVAL)
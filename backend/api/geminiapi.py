@@ -1,33 +1,44 @@
-from google import genai
 from django.conf import settings
 from dotenv import load_dotenv
-import os
+import re
 import json
+import asyncio
+import contextvars
 import logging
+import queue
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
 from .models import Flashcard
 from .utils.text_extractors import extract_text_from_file
+from .utils.chunking import split_into_chunks, CHARS_PER_TOKEN
+from .utils.preprocessing import preprocess_text
+from .utils.json_stream import JSONArrayStreamParser
+from .llm_cache import make_cache_key, get_cached_flashcards, store_flashcards
+from .text_cache import get_cached_text, store_text
+from .instrumentation import span, count, timed, atimed
+from .rate_limit import call_with_retries, acall_with_retries, llm_slot, allm_slot
+from .llm_providers import get_provider
+from .deck_cache import bump_deck_version
+from .write_queue import serialized_write
+from .dedupe import fingerprint, index_flashcards, reindex_flashcards, remove_near_duplicates
 
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-# Configure the API with error handling
-api_key = os.getenv("API_KEY")
-if not api_key:
-    raise ValueError(
-        "API_KEY not found in environment variables. "
-        "Please create a .env file with your Gemini API key. "
-        "See .env.example for reference."
-    )
-client = genai.Client(api_key=api_key)
+# Prompts are answered by get_provider(): the provider chosen in
+# settings.LLM_PROVIDER. The Gemini client is created (and API_KEY read)
+# only when the first prompt is sent - see llm_providers.py
 
 
 # Maximum file size: 10MB
 MAX_FILE_SIZE = 10 * 1024 * 1024
 
 
-# Function to process uploaded file and save it temporarily
-def processfile(uploaded_file):
+# Function to reject uploads we refuse to process
+def validate_upload(uploaded_file):
     # Validate file size
     if uploaded_file.size > MAX_FILE_SIZE:
         raise ValueError(
@@ -35,61 +46,321 @@ def processfile(uploaded_file):
             f"Your file is {uploaded_file.size / (1024 * 1024):.1f}MB."
         )
 
-    temp_dir = os.path.join(settings.BASE_DIR, "temp_files")
-    os.makedirs(temp_dir, exist_ok=True)  # Ensure directory exists
-    file_path = os.path.join(temp_dir, uploaded_file.name)
-    with open(file_path, "wb+") as destination:
-        for chunk in uploaded_file.chunks():
-            destination.write(chunk)
-    return file_path
-
 
 # Text extraction functions moved to utils/text_extractors.py
 # This keeps the code organized and reusable!
 
 
+# Bump this whenever PROMPT_TEMPLATE or FLASHCARD_SCHEMA (llm_providers.py)
+# changes so cached responses generated with the old prompt are no longer served
+PROMPT_TEMPLATE_VERSION = 2
+PROMPT_TEMPLATE = (
+    "Create flashcards in JSON format based on the following content: {text}\n"
+    "Format strictly as a JSON array of objects with \"question\" and \"answer\" keys.\n"
+    "Example: [{{\"question\": \"What is...?\", \"answer\": \"This is...\"}}, ...]\n"
+    "Ensure valid JSON formatting."
+)
+
+# Function to keep only well-formed flashcards
+def _valid_flashcards(items):
+    for item in items:
+        if (isinstance(item, dict)
+                and isinstance(item.get("question"), str) and item["question"].strip()
+                and isinstance(item.get("answer"), str) and item["answer"].strip()):
+            yield {"question": item["question"], "answer": item["answer"]}
+        else:
+            count("llm_parse.cards_dropped")
+
+
+# Function to count which parsing path a response needed
+# COUNTERS (see instrumentation.counters()):
+#   llm_parse.strict        whole response parsed by json.loads
+#   llm_parse.clean         streamed response parsed without any fixes
+#   llm_parse.repaired      parser had to fix, skip or cut short something
+#   llm_parse.failed        no usable flashcards at all (the job fails)
+#   llm_parse.cards_dropped individual cards that couldn't be salvaged
+def _count_parse_path(parser):
+    try:
+        parser.close()
+    except ValueError:
+        count("llm_parse.failed")
+        raise
+    if parser.skipped:
+        count("llm_parse.cards_dropped", parser.skipped)
+    if parser.repairs or parser.skipped or parser.truncated:
+        count("llm_parse.repaired")
+    else:
+        count("llm_parse.clean")
+
+
+# Function to turn Gemini's answer into flashcards, salvaging what it can
+def parse_flashcards(text):
+    # FAST PATH: structured output is plain JSON, parsed by the C decoder
+    try:
+        items = json.loads(text)
+    except ValueError:
+        items = None
+    if isinstance(items, list):
+        count("llm_parse.strict")
+        flashcards = list(_valid_flashcards(items))
+    else:
+        # RECOVERY PATH: one pass of the tolerant parser skips prose and
+        # code fences, fixes single quotes and trailing commas, and drops
+        # only the cards that are still unreadable
+        parser = JSONArrayStreamParser()
+        items = parser.feed(text)
+        _count_parse_path(parser)
+        flashcards = list(_valid_flashcards(items))
+
+    if not flashcards:
+        count("llm_parse.failed")
+        raise ValueError("No valid flashcards found in the response")
+    return flashcards
+
+
 # Function to generate flashcards from text
-def text_2flashcards(text):
-    try:
-        logger.info(f"Input text for flashcards: {text}")  # logs text from file
-        prompt = (
-            f"Create flashcards in JSON format based on the following content: {text}\n"
-            "Format strictly as a JSON array of objects with 'question' and 'answer' keys.\n"
-            "Example: [{'question': 'What is...?', 'answer': 'This is...'}, ...]\n"
-            "Ensure valid JSON formatting."
-        )
+# (user_id = whose rate limit quota the Gemini call counts against)
+def text_2flashcards(text, user_id=None):
+    try:
+        provider = get_provider()
+
+        # Same document + model + prompt → same flashcards, skip the LLM
+        cache_key = make_cache_key(text, provider.model_name, PROMPT_TEMPLATE_VERSION)
+        cached = get_cached_flashcards(cache_key)
+        if cached is not None:
+            return cached
+
+        logger.debug("Generating flashcards for %d characters of text", len(text))
+        prompt = PROMPT_TEMPLATE.format(text=text)
         try:
-            response = client.models.generate_content(
-                model="gemini-2.0-flash", contents=prompt
-            )
+            with llm_slot():
+                response_text = call_with_retries(lambda: provider.generate(prompt), user_id)
         except Exception as api_error:
-            logger.error(f"API call failed: {api_error}")
+            logger.error("API call failed: %s", api_error)
             raise ValueError(f"Gemini API call failed: {api_error}")
 
-        logger.info(f"Raw response: {response.text}")  # log response from api
-
-        if response.text.startswith("```json"):
-            text = response.text[7:]
-        else:
-            text = response.text
-        if text.endswith("```"):
-            text = text[:-3]
-        flashcards_dict = json.loads(text)
+        flashcards_dict = parse_flashcards(response_text)
 
+        store_flashcards(cache_key, provider.model_name, flashcards_dict)
         return flashcards_dict
     except Exception as e:
         raise ValueError(f"Failed to generate flashcards: {str(e)}")
 
 
+# Function to open a streamed LLM response
+def _open_stream(provider, prompt):
+    # The stream is lazy: the request is only sent (and can only fail) when
+    # the first piece is read. Read it here, so retries happen before any
+    # card has been handed on.
+    stream = provider.stream(prompt)
+    first = next(stream, None)
+    return itertools.chain([first] if first is not None else [], stream)
+
+
+# Function to generate flashcards from text, yielding each one as Gemini writes it
+def stream_text_2flashcards(text, user_id=None):
+    try:
+        provider = get_provider()
+        cache_key = make_cache_key(text, provider.model_name, PROMPT_TEMPLATE_VERSION)
+        cached = get_cached_flashcards(cache_key)
+        if cached is not None:
+            yield from cached
+            return
+
+        logger.debug("Streaming flashcards for %d characters of text", len(text))
+        prompt = PROMPT_TEMPLATE.format(text=text)
+        # The slot is held until the whole response has been read
+        with llm_slot():
+            try:
+                stream = call_with_retries(lambda: _open_stream(provider, prompt), user_id)
+            except Exception as api_error:
+                logger.error("API call failed: %s", api_error)
+                raise ValueError(f"Gemini API call failed: {api_error}")
+
+            # Each card is handed on as soon as its closing brace arrives,
+            # instead of after the whole response has been generated.
+            # The parser repairs malformed output in the same pass.
+            parser = JSONArrayStreamParser()
+            flashcards = []
+            for piece in stream:
+                for flashcard in _valid_flashcards(parser.feed(piece)):
+                    flashcards.append(flashcard)
+                    yield flashcard
+        _count_parse_path(parser)
+        if not flashcards:
+            count("llm_parse.failed")
+            raise ValueError("No valid flashcards found in the response")
+
+        store_flashcards(cache_key, provider.model_name, flashcards)
+    except Exception as e:
+        raise ValueError(f"Failed to generate flashcards: {str(e)}")
+
+
+# Function to generate flashcards for one chunk from a worker thread
+def _chunk_2flashcards(chunk, user_id=None):
+    try:
+        return text_2flashcards(chunk, user_id)
+    finally:
+        # Each thread gets its own DB connection (for the response cache);
+        # close it so finished threads don't leak connections
+        connection.close()
+
+
+# Function to compare questions ignoring case and punctuation:
+# "What is DNA?" and "what is dna" count as the same question
+def _question_key(flashcard):
+    return re.sub(r"[\W_]+", " ", flashcard["question"]).strip().casefold()
+
+
+# Function to combine per-chunk results, dropping repeated questions
+def merge_flashcards(flashcard_lists):
+    merged = []
+    seen_questions = set()
+    for flashcards in flashcard_lists:
+        for flashcard in flashcards:
+            key = _question_key(flashcard)
+            if key in seen_questions:
+                continue
+            seen_questions.add(key)
+            merged.append(flashcard)
+    return merged
+
+
+# Function to generate flashcards for a whole document, chunk by chunk
+def document_2flashcards(text, user_id=None):
+    # MAP-REDUCE:
+    # - Map: split the document into chunks that fit the token budget and
+    #   ask Gemini for flashcards for every chunk at the same time
+    # - Reduce: merge the answers (in document order) and drop duplicates
+    # A long PDF then takes about as long as its slowest chunk.
+    chunks = split_into_chunks(text, settings.LLM_CHUNK_TOKENS)
+    if len(chunks) <= 1:
+        return text_2flashcards(chunks[0] if chunks else text, user_id)
+
+    logger.debug("Generating flashcards for %d chunks", len(chunks))
+    max_workers = min(settings.LLM_MAX_CONCURRENCY, len(chunks))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Each chunk runs in a copy of our context, so what it counts ends up
+        # in this job's trace (one copy per chunk: a context can't be
+        # entered by two threads at once)
+        futures = [
+            executor.submit(contextvars.copy_context().run, _chunk_2flashcards, chunk, user_id)
+            for chunk in chunks
+        ]
+        results = [future.result() for future in futures]
+    return merge_flashcards(results)
+
+
+# Marks the end of one chunk's stream on the shared queue
+_CHUNK_DONE = object()
+
+
+# Function to stream one chunk's flashcards into a queue from a worker thread
+def _stream_chunk(chunk, results, user_id=None):
+    try:
+        for flashcard in stream_text_2flashcards(chunk, user_id):
+            results.put(flashcard)
+    except Exception as e:
+        results.put(e)
+    finally:
+        results.put(_CHUNK_DONE)
+        connection.close()
+
+
+# Function to stream flashcards for a whole document as they are generated
+def document_2flashcards_stream(text, user_id=None):
+    # Same map step as document_2flashcards, but every chunk is streamed and
+    # each card is yielded the moment any chunk produces it. The price is
+    # ordering: with several chunks, cards arrive in the order they were
+    # generated rather than in document order.
+    chunks = split_into_chunks(text, settings.LLM_CHUNK_TOKENS)
+    seen_questions = set()
+
+    def unseen(flashcard):
+        key = _question_key(flashcard)
+        if key in seen_questions:
+            return False
+        seen_questions.add(key)
+        return True
+
+    if len(chunks) <= 1:
+        for flashcard in stream_text_2flashcards(chunks[0] if chunks else text, user_id):
+            if unseen(flashcard):
+                yield flashcard
+        return
+
+    logger.debug("Streaming flashcards for %d chunks", len(chunks))
+    results = queue.Queue()
+    executor = ThreadPoolExecutor(max_workers=min(settings.LLM_MAX_CONCURRENCY, len(chunks)))
+    try:
+        for chunk in chunks:
+            # In a copy of our context, like document_2flashcards' chunks
+            executor.submit(contextvars.copy_context().run, _stream_chunk, chunk, results, user_id)
+
+        remaining = len(chunks)
+        while remaining:
+            item = results.get()
+            if item is _CHUNK_DONE:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            elif unseen(item):
+                yield item
+    finally:
+        # If we stop early (an error, or the consumer went away), don't
+        # start the chunks that haven't been sent yet
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Function to extract text, reusing earlier extractions of the same file
+def extract_text(file_path, mime_type, sha256=None):
+    # Stop extracting once we have more text than we'd ever send to the LLM
+    max_chars = settings.EXTRACT_MAX_TOKENS * CHARS_PER_TOKEN or None
+    text = get_cached_text(sha256, mime_type, max_chars)
+    if text is not None:
+        return text
+
+    text = extract_text_from_file(
+        file_path, mime_type,
+        max_chars=max_chars,
+        pdf_processes=settings.PDF_EXTRACT_PROCESSES,
+    )
+    store_text(sha256, mime_type, text, max_chars)
+    return text
+
+
+# Function to extract text and trim what the LLM doesn't need
+def prepare_text(file_path, mime_type, sha256=None):
+    # The cache keeps the text as extracted, so changing the preprocessing
+    # (or turning it off) applies to cached files too
+    with span("extract"):
+        text = extract_text(file_path, mime_type, sha256)
+    if not settings.TEXT_PREPROCESSING:
+        return text
+
+    with span("preprocess"):
+        text, stats = preprocess_text(text)
+    # Per upload in the job's trace, and in total in the process counters
+    count("preprocess.bytes_saved", stats["bytes_before"] - stats["bytes_after"])
+    count("preprocess.tokens_saved", stats["tokens_before"] - stats["tokens_after"])
+    logger.debug(
+        "Preprocessing: %d → %d tokens (%d header/footer lines, %d repeated paragraphs)",
+        stats["tokens_before"], stats["tokens_after"],
+        stats["boilerplate_lines"], stats["duplicate_paragraphs"],
+    )
+    return text
+
+
 # Main function to create flashcards from files
-def create_flashcards(file_path, mime_type):
+def create_flashcards(file_path, mime_type, sha256=None, user_id=None):
     try:
         # Extract text using our utility function
         # (Text extraction logic is now in utils/text_extractors.py)
-        text = extract_text_from_file(file_path, mime_type)
+        text = prepare_text(file_path, mime_type, sha256)
 
         # Generate flashcards from extracted text
-        flashcards = text_2flashcards(text)
+        with span("llm"):
+            flashcards = document_2flashcards(text, user_id)
 
         return flashcards
 
@@ -97,28 +368,265 @@ def create_flashcards(file_path, mime_type):
         raise ValueError(f"Something went wrong: {str(e)}")
 
 
-def handle_flashcard_creation(uploaded_file, topic, user):
-    mime_type = uploaded_file.content_type
-
+# Streaming version of create_flashcards: yields each flashcard when it's ready
+def stream_flashcards(file_path, mime_type, sha256=None, user_id=None):
     try:
-        file_path = processfile(uploaded_file)
-        flashcards = create_flashcards(file_path, mime_type)
+        text = prepare_text(file_path, mime_type, sha256)
 
-        created_flashcards = []
-        for flashcard in flashcards:
-            fcard = Flashcard.objects.create(
+        # Only the waits for Gemini count as "llm", not the caller's work
+        # between cards (saving them is "persist")
+        yield from timed("llm", document_2flashcards_stream(text, user_id))
+
+    except Exception as e:
+        raise ValueError(f"Something went wrong: {str(e)}")
+
+
+# Function to store generated flashcards for a topic (tagged with the job
+# that made them, if any - see events.py)
+def save_flashcards(flashcards, topic, user, job=None):
+    # Near-duplicates of cards already in the topic (or of each other) are
+    # skipped or merged - see dedupe.py. Fingerprinting is CPU work, so it
+    # happens before we take the write lock.
+    with span("dedupe"):
+        fingerprints = [fingerprint(flashcard) for flashcard in flashcards]
+
+    # bulk_create sends one multi-row INSERT per batch instead of one INSERT
+    # (and, outside a transaction, one commit) per card. The atomic block
+    # makes the whole deck appear at once - or not at all if anything fails.
+    # Wait for our turn to write before BEGIN (see write_queue.py)
+    with serialized_write(), span("persist"), transaction.atomic():
+        flashcards, fingerprints, merged = remove_near_duplicates(flashcards, fingerprints, topic)
+        new_flashcards = [
+            Flashcard(
                 user=user,
                 topic=topic,
+                job=job,
                 question=flashcard["question"],
                 answer=flashcard["answer"],
             )
-            created_flashcards.append(fcard)
+            for flashcard in flashcards
+        ]
+        created = Flashcard.objects.bulk_create(
+            new_flashcards, batch_size=settings.FLASHCARD_BULK_BATCH_SIZE
+        )
+        index_flashcards(created, fingerprints)
+        if merged:
+            Flashcard.objects.bulk_update(merged, ["answer"])
+            reindex_flashcards(merged)
+        # bulk_create sends no post_save signals, so invalidate by hand
+        if created or merged:
+            bump_deck_version(topic.pk)
+    return created
+
+
+# ============================================
+# ASYNC PIPELINE (used by the async views, see async_views.py)
+# ============================================
+# The same steps as above, but while a generation waits for Gemini it hands
+# the event loop back, so one web process can have hundreds of generations
+# in flight instead of one per thread. What can't be awaited runs elsewhere:
+# - text extraction (CPU-bound) in a small, bounded thread pool, so a burst
+#   of uploads can't start hundreds of extractions at once
+# - the response/text caches (sync ORM) through sync_to_async
+
+_extract_executor = None
+
+
+# Function to get the extraction pool (created on first use, so settings
+# overridden in tests apply)
+def _get_extract_executor():
+    global _extract_executor
+    if _extract_executor is None:
+        _extract_executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_EXTRACT_WORKERS, thread_name_prefix="extract"
+        )
+    return _extract_executor
+
+
+# Function to extract (and preprocess) text in a pool thread
+def _pooled_prepare_text(file_path, mime_type, sha256):
+    try:
+        return prepare_text(file_path, mime_type, sha256)
+    finally:
+        # Pool threads outlive the request; don't keep a connection open in each
+        connection.close()
+
+
+# Async version of prepare_text
+async def aprepare_text(file_path, mime_type, sha256=None):
+    loop = asyncio.get_running_loop()
+    # Run in a copy of our context, so the extraction is timed in this request's trace
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _get_extract_executor(), context.run, _pooled_prepare_text, file_path, mime_type, sha256
+    )
+
+
+# Async version of text_2flashcards
+async def atext_2flashcards(text, user_id=None):
+    try:
+        provider = get_provider()
+        cache_key = make_cache_key(text, provider.model_name, PROMPT_TEMPLATE_VERSION)
+        cached = await sync_to_async(get_cached_flashcards)(cache_key)
+        if cached is not None:
+            return cached
+
+        logger.debug("Generating flashcards for %d characters of text", len(text))
+        prompt = PROMPT_TEMPLATE.format(text=text)
+        try:
+            async with allm_slot():
+                response_text = await acall_with_retries(lambda: provider.agenerate(prompt), user_id)
+        except Exception as api_error:
+            logger.error("API call failed: %s", api_error)
+            raise ValueError(f"Gemini API call failed: {api_error}")
+
+        flashcards_dict = parse_flashcards(response_text)
+
+        await sync_to_async(store_flashcards)(cache_key, provider.model_name, flashcards_dict)
+        return flashcards_dict
+    except Exception as e:
+        raise ValueError(f"Failed to generate flashcards: {str(e)}")
+
+
+# Async version of _open_stream: read the first piece so retries happen here
+async def _aopen_stream(provider, prompt):
+    stream = provider.astream(prompt)
+    first = await anext(stream, None)
+
+    async def pieces():
+        if first is not None:
+            yield first
+        async for piece in stream:
+            yield piece
+    return pieces()
+
 
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
+# Async version of stream_text_2flashcards
+async def astream_text_2flashcards(text, user_id=None):
+    try:
+        provider = get_provider()
+        cache_key = make_cache_key(text, provider.model_name, PROMPT_TEMPLATE_VERSION)
+        cached = await sync_to_async(get_cached_flashcards)(cache_key)
+        if cached is not None:
+            for flashcard in cached:
+                yield flashcard
+            return
+
+        logger.debug("Streaming flashcards for %d characters of text", len(text))
+        prompt = PROMPT_TEMPLATE.format(text=text)
+        async with allm_slot():
+            try:
+                stream = await acall_with_retries(lambda: _aopen_stream(provider, prompt), user_id)
+            except Exception as api_error:
+                logger.error("API call failed: %s", api_error)
+                raise ValueError(f"Gemini API call failed: {api_error}")
+
+            parser = JSONArrayStreamParser()
+            flashcards = []
+            async for piece in stream:
+                for flashcard in _valid_flashcards(parser.feed(piece)):
+                    flashcards.append(flashcard)
+                    yield flashcard
+        _count_parse_path(parser)
+        if not flashcards:
+            count("llm_parse.failed")
+            raise ValueError("No valid flashcards found in the response")
 
+        await sync_to_async(store_flashcards)(cache_key, provider.model_name, flashcards)
     except Exception as e:
-        # Clean up the temporary file in case of errors
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
-        raise Exception(f"Processing failed: {str(e)}")
+        raise ValueError(f"Failed to generate flashcards: {str(e)}")
+
+
+# Async version of document_2flashcards: the chunks are coroutines, not threads
+async def adocument_2flashcards(text, user_id=None):
+    chunks = split_into_chunks(text, settings.LLM_CHUNK_TOKENS)
+    if len(chunks) <= 1:
+        return await atext_2flashcards(chunks[0] if chunks else text, user_id)
+
+    logger.debug("Generating flashcards for %d chunks", len(chunks))
+    limit = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+
+    async def chunk_2flashcards(chunk):
+        async with limit:
+            return await atext_2flashcards(chunk, user_id)
+
+    tasks = [asyncio.ensure_future(chunk_2flashcards(chunk)) for chunk in chunks]
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        # If one chunk failed, don't keep generating the others
+        for task in tasks:
+            task.cancel()
+    return merge_flashcards(results)
+
+
+# Async version of document_2flashcards_stream
+async def adocument_2flashcards_stream(text, user_id=None):
+    chunks = split_into_chunks(text, settings.LLM_CHUNK_TOKENS)
+    seen_questions = set()
+
+    def unseen(flashcard):
+        key = _question_key(flashcard)
+        if key in seen_questions:
+            return False
+        seen_questions.add(key)
+        return True
+
+    if len(chunks) <= 1:
+        async for flashcard in astream_text_2flashcards(chunks[0] if chunks else text, user_id):
+            if unseen(flashcard):
+                yield flashcard
+        return
+
+    logger.debug("Streaming flashcards for %d chunks", len(chunks))
+    results = asyncio.Queue()
+    limit = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+
+    async def stream_chunk(chunk):
+        try:
+            async with limit:
+                async for flashcard in astream_text_2flashcards(chunk, user_id):
+                    results.put_nowait(flashcard)
+        except Exception as e:
+            results.put_nowait(e)
+        finally:
+            results.put_nowait(_CHUNK_DONE)
+
+    tasks = [asyncio.ensure_future(stream_chunk(chunk)) for chunk in chunks]
+    try:
+        remaining = len(chunks)
+        while remaining:
+            item = await results.get()
+            if item is _CHUNK_DONE:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            elif unseen(item):
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# Async version of create_flashcards
+async def acreate_flashcards(file_path, mime_type, sha256=None, user_id=None):
+    try:
+        text = await aprepare_text(file_path, mime_type, sha256)
+
+        with span("llm"):
+            return await adocument_2flashcards(text, user_id)
+
+    except Exception as e:
+        raise ValueError(f"Something went wrong: {str(e)}")
+
+
+# Async version of stream_flashcards
+async def astream_flashcards(file_path, mime_type, sha256=None, user_id=None):
+    try:
+        text = await aprepare_text(file_path, mime_type, sha256)
+
+        async for flashcard in atimed("llm", adocument_2flashcards_stream(text, user_id)):
+            yield flashcard
+
+    except Exception as e:
+        raise ValueError(f"Something went wrong: {str(e)}")
@@ -0,0 +1,211 @@
+"""
+INSTRUMENTATION - The "Kitchen Timer" in our Restaurant
+
+We want to know how long each stage of handling a request takes (upload,
+extract, LLM, persist, serialize) without slowing every request down to
+find out. This module records those timings cheaply:
+
+- SAMPLING: only a fraction of requests/jobs (INSTRUMENTATION_SAMPLE_RATE)
+  are timed at all. For the rest, span() does nothing but one lookup.
+- ONE LINE PER TRACE: all stage durations of a request are collected and
+  logged together when it finishes, instead of a log line per step.
+- LAZY FORMATTING: the JSON log line is only built if a handler actually
+  emits it (the Trace object formats itself in __str__).
+
+USAGE:
+    with trace("job"):               # starts timing (if sampled)
+        with span("extract"):        # adds elapsed time to "extract"
+            ...
+        for card in timed("llm", stream):   # time spent waiting on a generator
+            ...
+
+Sampled HTTP responses also carry a Server-Timing header, so the stage
+breakdown shows up in the browser's network tab.
+
+COUNTERS:
+    count("llm_parse.repaired")      # how often did something happen?
+count() keeps process-wide totals (see counters()) and also adds the
+count to the current trace's log line when it is sampled.
+
+ENABLED IN: settings.MIDDLEWARE (TimingMiddleware traces every request)
+
+CONCEPTS: Instrumentation, Tracing, Sampling, Context Variables, Middleware
+RELATED: views.py, jobs.py, geminiapi.py (where the spans are)
+"""
+
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger('api.timing')
+
+# The trace being recorded for the current request/job (None = not sampled)
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+# Totals of every count() call in this process
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+class Trace:
+    """Stage durations collected for one request or job."""
+    __slots__ = ("name", "stages", "counts", "started", "elapsed")
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self.counts = {}
+        self.started = time.perf_counter()
+        self.elapsed = None
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name, amount):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Format stages as a Server-Timing header value."""
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items()]
+        entries.append(f"total;dur={self.elapsed * 1000:.1f}")
+        return ", ".join(entries)
+
+    def __str__(self):
+        # Only called when the log record is actually emitted
+        record = {
+            "trace": self.name,
+            "total_ms": round(self.elapsed * 1000, 1),
+            "stages_ms": {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()},
+        }
+        if self.counts:
+            record["counts"] = self.counts
+        return json.dumps(record)
+
+
+@contextmanager
+def trace(name):
+    """
+    Time everything inside this block as one trace, if it is sampled.
+
+    Yields the Trace, or None when this trace isn't sampled.
+    """
+    if random.random() >= settings.INSTRUMENTATION_SAMPLE_RATE:
+        token = _current_trace.set(None)
+        try:
+            yield None
+        finally:
+            _current_trace.reset(token)
+        return
+
+    current = Trace(name)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+        current.finish()
+        logger.info("%s", current)
+
+
+@contextmanager
+def span(stage):
+    """Add the time spent inside this block to a stage of the current trace."""
+    current = _current_trace.get()
+    if current is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.add(stage, time.perf_counter() - started)
+
+
+def timed(stage, iterable):
+    """
+    Yield from an iterable, adding the time spent waiting for each item to
+    a stage of the current trace.
+
+    A span() around a loop over a generator would also time whatever the
+    loop does with each item (e.g. saving a streamed card); this only times
+    the generator itself.
+    """
+    iterator = iter(iterable)
+    while True:
+        with span(stage):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+async def atimed(stage, aiterable):
+    """timed() for async iterables."""
+    iterator = aiter(aiterable)
+    while True:
+        with span(stage):
+            try:
+                item = await anext(iterator)
+            except StopAsyncIteration:
+                return
+        yield item
+
+
+def count(name, amount=1):
+    """Add to a named counter (and to the current trace, if it is sampled)."""
+    with _counters_lock:
+        _counters[name] += amount
+    current = _current_trace.get()
+    if current is not None:
+        current.count(name, amount)
+
+
+def counters():
+    """Return a snapshot of this process's counter totals."""
+    with _counters_lock:
+        return dict(_counters)
+
+
+class TimingMiddleware:
+    """
+    Trace every request and add a Server-Timing header when sampled.
+
+    Works both ways: under ASGI with async views Django calls it as a
+    coroutine, so it doesn't push every request through a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with trace(f"{request.method} {request.path}") as current:
+            response = self.get_response(request)
+        if current is not None:
+            response["Server-Timing"] = current.server_timing()
+        return response
+
+    async def __acall__(self, request):
+        with trace(f"{request.method} {request.path}") as current:
+            response = await self.get_response(request)
+        if current is not None:
+            response["Server-Timing"] = current.server_timing()
+        return response
@@ -0,0 +1,636 @@
+"""
+GENERATION JOBS - The "Ticket Rail" in our Restaurant
+
+Generating flashcards means extracting text and waiting on Gemini, which can
+take tens of seconds. Doing that inside the request would tie up a web worker
+for the whole time, so the upload view only drops a ticket (a GenerationJob
+row) on the rail and returns immediately. Worker processes started with
+`python manage.py run_generation_worker` take tickets off the rail one at a
+time and cook them (each worker can cook several tickets at once, one per
+thread - see run_worker).
+
+ROLE IN THE SYSTEM:
+- enqueue_generation_job(): called by the upload view, stores the file
+- enqueue_generation_batch(): the same for several files uploaded together
+- claim_next_job(): called by workers, atomically takes the oldest queued job
+  (after reclaim_stale_jobs() has re-queued jobs whose worker was lost)
+- run_generation_job(): does the actual extract → Gemini → save work
+- run_job(): what workers call - run_generation_job() or run_import_job()
+
+STREAMING MODE (settings.LLM_STREAMING):
+Instead of waiting for Gemini's whole answer, the worker saves each card
+the moment it has been generated, so the student can start reading the
+first cards (via GET /api/jobs/<id>/events/) after about a second.
+
+IN-PROCESS MODE (settings.ASYNC_VIEWS, under an ASGI server):
+The async upload view runs the job on the web server's event loop right
+away (start_generation_job) instead of leaving it for a worker. The job is
+claimed the same way a worker claims it, and uploads beyond
+ASYNC_MAX_GENERATIONS simply stay queued for the workers.
+
+DECK IMPORTS:
+Importing a big CSV/JSONL/Anki file takes about a millisecond per card
+(fingerprinting, duplicate checks, index updates) - 40 seconds for 50,000
+cards, too long to hold a request open. Files over IMPORT_QUEUE_MIN_SIZE
+are stored and queued as jobs of kind "import" (enqueue_import_job), and
+workers run them with run_import_job(); the summary ends up in job.result.
+
+BATCH UPLOADS:
+Every file of a batch is an ordinary job, so workers pick them up (and run
+them in parallel) like any other upload. Files either get a topic each, or
+share one topic that is created up front; a shared topic is only deleted
+when no file of the batch produced any cards.
+
+LEASES (WHAT IF A WORKER DIES?):
+A worker that crashes, or a web process restarted mid-generation, would
+leave its job "running" forever. While a job runs, its worker refreshes
+the job's heartbeat_at every third of settings.JOB_LEASE_SECONDS (see
+_lease/_alease). Before claiming, claim_next_job() puts jobs whose
+heartbeat is older than a whole lease back in the queue - or marks them
+failed after JOB_MAX_ATTEMPTS claims, so a file that kills its worker
+every time can't do so forever. Jobs run in-process by the async views
+hold a lease the same way, so a worker picks them up if the web process
+goes away.
+
+A worker that was only slow (not dead) may still be running a job that
+has since been reclaimed. Every claim sets a new lease_token and a reclaim
+clears it, so the old worker's writes - heartbeats, progress, the final
+outcome - match no row and are dropped instead of overwriting the newer
+attempt (see _leased/_finish).
+
+WHY THE DATABASE AS A QUEUE:
+We already have a database, and a job table is enough for our load.
+Claiming is a conditional UPDATE (status=queued → running), so two workers
+can never pick up the same job, even when they run as separate processes.
+
+CONCEPTS: Background Jobs, Work Queues, Atomic Claims, Polling Workers
+RELATED: management/commands/run_generation_worker.py, views.py, geminiapi.py
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .deck_io import import_deck
+from .models import GenerationBatch, GenerationJob, Topic
+from .geminiapi import (
+    create_flashcards, save_flashcards, stream_flashcards,
+    acreate_flashcards, astream_flashcards,
+)
+from .upload_handlers import file_sha256
+from .instrumentation import trace
+from .write_queue import serialized_write
+
+logger = logging.getLogger('api')
+
+
+def enqueue_generation_job(uploaded_file, topic_name, user, batch=None, topic=None):
+    """
+    Store the upload and queue it for a worker.
+
+    Large uploads that Django already spooled to a temp file are moved
+    (renamed) into MEDIA_ROOT by the storage backend rather than copied, and
+    the storage picks a unique name so same-named uploads never collide.
+
+    Args:
+        uploaded_file: Django UploadedFile from the request
+        topic_name (str): Name of the topic to create once cards are ready
+        user: Owner of the topic and flashcards
+        batch: The GenerationBatch this file was uploaded with, if any
+        topic: An existing topic to add the cards to instead of a new one
+
+    Returns:
+        GenerationJob: The newly queued job
+    """
+    return GenerationJob.objects.create(
+        user=user,
+        topic_name=topic_name,
+        topic=topic,
+        batch=batch,
+        source_name=uploaded_file.name[:255],
+        upload=uploaded_file,
+        mime_type=uploaded_file.content_type,
+        source_sha256=file_sha256(uploaded_file),
+    )
+
+
+async def aenqueue_generation_job(uploaded_file, topic_name, user):
+    """enqueue_generation_job() for async views."""
+    return await GenerationJob.objects.acreate(
+        user=user,
+        topic_name=topic_name,
+        source_name=uploaded_file.name[:255],
+        upload=uploaded_file,
+        mime_type=uploaded_file.content_type,
+        source_sha256=file_sha256(uploaded_file),
+    )
+
+
+def enqueue_generation_batch(uploads, user, shared_topic_name=None):
+    """
+    Queue several uploaded files as one batch.
+
+    Args:
+        uploads: List of (uploaded_file, topic_name) pairs
+        user: Owner of the topics and flashcards
+        shared_topic_name (str): If given, every file's cards go into one
+            topic with this name instead of a topic per file
+
+    Returns:
+        tuple: (GenerationBatch, list of its GenerationJobs)
+    """
+    # Either the whole batch is queued or none of it
+    with transaction.atomic():
+        batch = GenerationBatch.objects.create(user=user)
+        topic = None
+        if shared_topic_name:
+            topic = Topic.objects.create(user=user, name=shared_topic_name)
+        jobs = [
+            enqueue_generation_job(
+                uploaded_file, shared_topic_name or topic_name, user, batch=batch, topic=topic
+            )
+            for uploaded_file, topic_name in uploads
+        ]
+    return batch, jobs
+
+
+def enqueue_import_job(uploaded_file, file_format, user, topic=None, topic_name=""):
+    """
+    Store a deck file and queue it to be imported by a worker.
+
+    Args:
+        uploaded_file: Django UploadedFile from the request
+        file_format (str): csv, jsonl or anki (see deck_io.FORMATS)
+        user: Owner of the topic and flashcards
+        topic: An existing topic to add the cards to...
+        topic_name (str): ...or the name of a new topic for them
+
+    Returns:
+        GenerationJob: The newly queued job
+    """
+    return GenerationJob.objects.create(
+        user=user,
+        kind=GenerationJob.KIND_IMPORT,
+        import_format=file_format,
+        topic_name=topic.name if topic else topic_name,
+        topic=topic,
+        source_name=uploaded_file.name[:255],
+        upload=uploaded_file,
+        mime_type=uploaded_file.content_type or "",
+    )
+
+
+def _claim(now):
+    """The fields a claim sets: running, with a fresh lease."""
+    return {
+        "status": GenerationJob.STATUS_RUNNING,
+        "started_at": now,
+        "heartbeat_at": now,
+        "attempts": F("attempts") + 1,
+        "lease_token": uuid.uuid4(),
+    }
+
+
+def _leased(job):
+    """The job's row, as long as the lease we claimed it with is still ours."""
+    return GenerationJob.objects.filter(id=job.id, lease_token=job.lease_token)
+
+
+def reclaim_stale_jobs():
+    """
+    Re-queue running jobs whose worker stopped refreshing their lease.
+
+    A job that has already been claimed JOB_MAX_ATTEMPTS times is marked
+    failed instead (and cleaned up like any failed job).
+
+    Returns:
+        int: How many jobs were re-queued or failed
+    """
+    now = timezone.now()
+    # (No heartbeat at all: claimed before jobs had leases)
+    stale = GenerationJob.objects.filter(
+        Q(heartbeat_at__lt=now - timedelta(seconds=settings.JOB_LEASE_SECONDS))
+        | Q(heartbeat_at__isnull=True),
+        status=GenerationJob.STATUS_RUNNING,
+    )
+    # Conditional UPDATEs again: if two workers get here at once, every job
+    # is reclaimed by exactly one of them
+    requeued = stale.filter(attempts__lt=settings.JOB_MAX_ATTEMPTS).update(
+        status=GenerationJob.STATUS_QUEUED, heartbeat_at=None, lease_token=None
+    )
+    failed = 0
+    for job_id in stale.values_list("id", flat=True):
+        if not stale.filter(id=job_id).update(status=GenerationJob.STATUS_FAILED, lease_token=None):
+            continue
+        job = GenerationJob.objects.select_related("topic").get(id=job_id)
+        job.error = f"The worker stopped responding ({job.attempts} attempts)"
+        _abandon(job)
+        failed += 1
+
+    if requeued or failed:
+        logger.warning("Reclaimed jobs of lost workers: %d re-queued, %d failed", requeued, failed)
+    return requeued + failed
+
+
+def _abandon(job):
+    """Clean up after a job that was marked failed without running to the end."""
+    if job.kind == GenerationJob.KIND_IMPORT:
+        _discard_empty_import_topic(job)
+    else:
+        _discard_empty_topic(job)
+    if job.upload:
+        job.upload.delete(save=False)
+    job.finished_at = timezone.now()
+    job.save()
+
+
+def claim_next_job():
+    """
+    Take the oldest queued job, or return None if the queue is empty.
+
+    The UPDATE only succeeds if the job is still queued, so when two workers
+    race for the same row exactly one of them wins and the other moves on.
+    """
+    reclaim_stale_jobs()
+    while True:
+        job_id = (
+            GenerationJob.objects.filter(status=GenerationJob.STATUS_QUEUED)
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+
+        claimed = GenerationJob.objects.filter(
+            id=job_id, status=GenerationJob.STATUS_QUEUED
+        ).update(**_claim(timezone.now()))
+        if claimed:
+            return GenerationJob.objects.select_related("user").get(id=job_id)
+
+
+def run_generation_job(job):
+    """
+    Extract text from the job's upload, generate flashcards and save them.
+
+    Never raises - failures are recorded on the job so the client can see them.
+    """
+    try:
+        if settings.LLM_STREAMING:
+            _generate_streaming(job)
+        else:
+            _generate(job)
+        job.status = GenerationJob.STATUS_DONE
+    except Exception as e:
+        logger.exception("JOB %s: generation failed", job.id)
+        job.error = str(e)
+        job.status = GenerationJob.STATUS_FAILED
+        _discard_empty_topic(job)
+    finally:
+        _finish(job)
+    return job
+
+
+def run_import_job(job):
+    """
+    Import the cards of the job's deck file (see deck_io.import_deck).
+
+    Never raises - failures are recorded on the job. A topic created for
+    the import is deleted again if no card made it in; an existing topic
+    the student imported into is always kept.
+    """
+    try:
+        # Set already if importing into an existing topic, or if an earlier
+        # attempt created it before its worker was lost
+        if job.topic is None:
+            job.topic = Topic.objects.create(user=job.user, name=job.topic_name)
+            _leased(job).update(topic=job.topic)
+        with open(job.upload.path, "rb") as source:
+            job.result = import_deck(File(source), job.import_format, job.topic, job.user, job)
+        job.flashcard_count = job.result["imported"]
+        if not job.flashcard_count and not job.result["duplicates"]:
+            raise ValueError("No flashcards found in the file")
+        job.status = GenerationJob.STATUS_DONE
+    except Exception as e:
+        logger.exception("JOB %s: import failed", job.id)
+        job.error = str(e)
+        job.status = GenerationJob.STATUS_FAILED
+        # Cards of batches saved before the problem was found are kept
+        if _leased(job).exists():
+            _discard_empty_import_topic(job)
+    finally:
+        _finish(job)
+    return job
+
+
+def _discard_empty_import_topic(job):
+    """Delete the topic an import created, if none of its cards were saved."""
+    # A topic created after the job was queued is the import's own
+    if job.topic is None or job.topic.created_at < job.created_at:
+        return
+    if not job.topic.flashcards.exists():
+        job.topic.delete()
+        job.topic = None
+
+
+def _finish(job):
+    """
+    Record the job's outcome and delete its upload - if the lease is still ours.
+
+    A job whose lease ran out may have been claimed again (or failed) since:
+    writing this attempt's copy over it would undo the newer attempt's
+    status, lease, topic and progress, and that attempt still needs the
+    upload. So the outcome is only written to the row with our lease_token.
+
+    Returns:
+        bool: False if the lease was lost and nothing was recorded
+    """
+    job.finished_at = timezone.now()
+    finished = _leased(job).update(
+        status=job.status,
+        error=job.error,
+        result=job.result,
+        topic_id=job.topic_id,
+        flashcard_count=job.flashcard_count,
+        finished_at=job.finished_at,
+        upload="",
+        lease_token=None,
+    )
+    if not finished:
+        logger.warning("JOB %s: lease lost to a newer attempt, dropping this attempt's outcome (%s)",
+                       job.id, job.status)
+        return False
+    # The upload is only needed until the job has been processed
+    if job.upload:
+        job.upload.delete(save=False)
+    job.lease_token = None
+    return True
+
+
+def _renew_lease(job):
+    return _leased(job).update(heartbeat_at=timezone.now())
+
+
+@contextmanager
+def _lease(job):
+    """Keep refreshing the job's heartbeat (from a side thread) while the block runs."""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.JOB_LEASE_SECONDS / 3):
+                _renew_lease(job)
+        finally:
+            connection.close()
+
+    heart = threading.Thread(target=beat, name=f"lease-{job.id}", daemon=True)
+    heart.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        heart.join()
+
+
+@asynccontextmanager
+async def _alease(job):
+    """_lease() for jobs running on the event loop."""
+    async def beat():
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            await sync_to_async(_renew_lease)(job)
+
+    heart = asyncio.create_task(beat())
+    try:
+        yield
+    finally:
+        heart.cancel()
+
+
+def run_job(job):
+    """Run a claimed job of either kind. Never raises."""
+    if job.kind == GenerationJob.KIND_IMPORT:
+        return run_import_job(job)
+    return run_generation_job(job)
+
+
+def _generate(job):
+    """Generate all the cards, then save the topic and its cards at once."""
+    flashcards = create_flashcards(
+        job.upload.path, job.mime_type, job.source_sha256, user_id=job.user_id
+    )
+    _save_deck(job, flashcards)
+
+
+def _save_deck(job, flashcards):
+    """Create the job's topic (unless a batch shares one) with all its flashcards."""
+    # The topic and its flashcards are saved all-or-nothing
+    with serialized_write(), transaction.atomic():
+        topic = job.topic or Topic.objects.create(user=job.user, name=job.topic_name)
+        created_flashcards = save_flashcards(flashcards, topic, job.user, job)
+
+    job.topic = topic
+    job.flashcard_count = len(created_flashcards)
+
+
+def _generate_streaming(job):
+    """Save each card as soon as Gemini has written it."""
+    # The topic has to exist before its first card can be saved
+    if job.topic is None:
+        job.topic = Topic.objects.create(user=job.user, name=job.topic_name)
+        _leased(job).update(topic=job.topic)
+
+    flashcards = stream_flashcards(
+        job.upload.path, job.mime_type, job.source_sha256, user_id=job.user_id
+    )
+    for flashcard in flashcards:
+        _save_streamed_card(job, flashcard)
+
+
+def _save_streamed_card(job, flashcard):
+    """Save one card to the job's topic and count it."""
+    # The card and the job's progress count are committed together
+    with serialized_write(), transaction.atomic():
+        created = save_flashcards([flashcard], job.topic, job.user, job)
+        if created:  # Not a near-duplicate (see dedupe.py)
+            job.flashcard_count += 1
+            _leased(job).update(flashcard_count=job.flashcard_count)
+
+
+def _discard_empty_topic(job):
+    """
+    Don't leave an empty topic behind after a failed job.
+
+    Cards that were already streamed to the student are kept, and a topic
+    shared by a batch stays while another of its files has cards or may
+    still produce some.
+    """
+    if job.topic_id is None or job.flashcard_count > 0:
+        return
+    with serialized_write(), transaction.atomic():
+        # Record the failure first: if two files sharing the topic fail at
+        # the same time, the second one to get here sees the first as failed.
+        # A reclaimed job's topic belongs to its newer attempt.
+        if not _leased(job).update(status=job.status, error=job.error):
+            return
+        others = GenerationJob.objects.filter(topic_id=job.topic_id).exclude(id=job.id)
+        if others.filter(flashcard_count__gt=0).exists() or others.filter(
+            status__in=[GenerationJob.STATUS_QUEUED, GenerationJob.STATUS_RUNNING]
+        ).exists():
+            return
+        job.topic.delete()
+    job.topic = None
+
+
+def run_worker(poll_interval=1.0, once=False, threads=1):
+    """
+    Process jobs forever (or until the queue is empty when once=True).
+
+    Sleeps for poll_interval seconds whenever there is nothing to do.
+    With threads > 1, that many jobs are processed at the same time: most
+    of a job is waiting on Gemini, so the threads rarely compete for the CPU.
+    """
+    if threads > 1:
+        workers = [
+            threading.Thread(target=_worker_thread, args=(poll_interval, once), daemon=True)
+            for _ in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return
+
+    while True:
+        job = claim_next_job()
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+
+        logger.info("JOB %s: processing (%s)", job.id, job.kind)
+        with _lease(job), trace("import_job" if job.kind == GenerationJob.KIND_IMPORT else "generation_job"):
+            run_job(job)
+        logger.info("JOB %s: %s (%d flashcards)", job.id, job.status, job.flashcard_count)
+
+
+def _worker_thread(poll_interval, once):
+    try:
+        run_worker(poll_interval, once)
+    finally:
+        # Every thread has its own database connection
+        connection.close()
+
+
+# ============================================
+# IN-PROCESS GENERATION (async views)
+# ============================================
+# Jobs running on this process's event loop. asyncio only keeps weak
+# references to tasks, so we hold on to them until they finish.
+_running = set()
+
+
+def start_generation_job(job):
+    """
+    Run a just-queued job on the current event loop instead of in a worker.
+
+    Must be called from async code running under an ASGI server (the task
+    outlives the request).
+
+    Returns:
+        bool: False if this process is already running ASYNC_MAX_GENERATIONS
+              jobs - the job then stays queued for a worker
+    """
+    if len(_running) >= settings.ASYNC_MAX_GENERATIONS:
+        return False
+    # Start from an empty context: otherwise the task would keep using the
+    # request's sync_to_async thread, which is shut down once the response
+    # has been sent
+    task = asyncio.create_task(_run_in_process(job), context=contextvars.Context())
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return True
+
+
+async def _run_in_process(job):
+    # Claimed exactly like claim_next_job() does, so a worker that happened
+    # to see the job first wins and it's never generated twice
+    started_at = timezone.now()
+    claim = _claim(started_at)
+    claimed = await GenerationJob.objects.filter(
+        id=job.id, status=GenerationJob.STATUS_QUEUED
+    ).aupdate(**claim)
+    if not claimed:
+        return
+    job.status = GenerationJob.STATUS_RUNNING
+    job.started_at = job.heartbeat_at = started_at
+    job.attempts += 1
+    job.lease_token = claim["lease_token"]
+
+    logger.info("JOB %s: processing in the web process", job.id)
+    async with _alease(job):
+        with trace("generation_job"):
+            await arun_generation_job(job)
+    logger.info("JOB %s: %s (%d flashcards)", job.id, job.status, job.flashcard_count)
+
+
+async def wait_for_generation_jobs():
+    """Wait for this process's in-process jobs to finish (tests, shutdown)."""
+    while _running:
+        await asyncio.gather(*_running, return_exceptions=True)
+
+
+async def arun_generation_job(job):
+    """
+    run_generation_job() for the event loop.
+
+    Never raises - failures are recorded on the job so the client can see them.
+    """
+    try:
+        if settings.LLM_STREAMING:
+            await _agenerate_streaming(job)
+        else:
+            await _agenerate(job)
+        job.status = GenerationJob.STATUS_DONE
+    except Exception as e:
+        logger.exception("JOB %s: generation failed", job.id)
+        job.error = str(e)
+        job.status = GenerationJob.STATUS_FAILED
+        await sync_to_async(_discard_empty_topic)(job)
+    finally:
+        await sync_to_async(_finish)(job)
+    return job
+
+
+async def _agenerate(job):
+    flashcards = await acreate_flashcards(
+        job.upload.path, job.mime_type, job.source_sha256, user_id=job.user_id
+    )
+    # transaction.atomic() doesn't work in async code, so the all-or-nothing
+    # save runs in a thread
+    await sync_to_async(_save_deck)(job, flashcards)
+
+
+async def _agenerate_streaming(job):
+    if job.topic_id is None:
+        job.topic = await Topic.objects.acreate(user=job.user, name=job.topic_name)
+        await _leased(job).aupdate(topic=job.topic)
+
+    flashcards = astream_flashcards(
+        job.upload.path, job.mime_type, job.source_sha256, user_id=job.user_id
+    )
+    async for flashcard in flashcards:
+        await sync_to_async(_save_streamed_card)(job, flashcard)
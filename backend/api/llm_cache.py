@@ -0,0 +1,129 @@
+"""
+LLM RESPONSE CACHE - The "Leftovers Fridge" in our Restaurant
+
+Asking Gemini for flashcards costs seconds of latency and API quota. Students
+in the same course often upload the exact same lecture notes, so we keep the
+flashcards generated for each document and serve them again on a repeat.
+
+HOW A CACHE KEY IS BUILT:
+    sha256(model name + prompt template version + normalized text)
+- Normalizing (collapsing whitespace) means trivial formatting differences
+  still hit the cache
+- Including the model and prompt version means changing either one
+  automatically stops serving old answers
+
+EVICTION:
+- TTL: entries older than LLM_CACHE_TTL_SECONDS count as misses
+- LRU: when the table exceeds LLM_CACHE_MAX_ENTRIES, the least recently
+  used entries are deleted
+
+FAILURE POLICY:
+The cache is an optimization, never a requirement. If the cache table
+can't be read or written (e.g. it is locked by a concurrent writer), we log
+a warning and carry on as if it were a miss.
+
+CONCEPTS: Caching, Content Addressing, Hashing, LRU Eviction, TTL
+RELATED: geminiapi.py (uses the cache), models.py (LLMResponseCache table)
+"""
+
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LLMResponseCache
+
+logger = logging.getLogger('api')
+
+
+def normalize_text(text):
+    """Collapse all runs of whitespace so formatting noise doesn't change the key."""
+    return " ".join(text.split())
+
+
+def make_cache_key(text, model_name, prompt_version):
+    """
+    Build the content-addressed key for a prompt.
+
+    Returns:
+        str: 64-character hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for part in (model_name, str(prompt_version), normalize_text(text)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")  # separator so ("ab", "c") != ("a", "bc")
+    return digest.hexdigest()
+
+
+def _expiry_cutoff():
+    return timezone.now() - timedelta(seconds=settings.LLM_CACHE_TTL_SECONDS)
+
+
+def get_cached_flashcards(key):
+    """
+    Look up flashcards for a cache key.
+
+    Returns:
+        list | None: Cached flashcards, or None on a miss (or expired entry)
+    """
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+
+    try:
+        entry = LLMResponseCache.objects.filter(key=key).first()
+        if entry is None:
+            return None
+
+        if entry.created_at < _expiry_cutoff():
+            entry.delete()
+            return None
+
+        # Touch the entry so LRU eviction keeps it around
+        LLMResponseCache.objects.filter(pk=entry.pk).update(
+            last_used_at=timezone.now(), hit_count=F("hit_count") + 1
+        )
+    except DatabaseError as e:
+        logger.warning("LLM CACHE: lookup failed, treating as miss: %s", e)
+        return None
+    logger.debug("LLM CACHE: hit for %s", key[:12])
+    return entry.flashcards
+
+
+def store_flashcards(key, model_name, flashcards):
+    """Save generated flashcards under a cache key, then enforce the size limit."""
+    if not settings.LLM_CACHE_ENABLED:
+        return
+
+    now = timezone.now()
+    try:
+        LLMResponseCache.objects.update_or_create(
+            key=key,
+            defaults={
+                "model_name": model_name,
+                "flashcards": flashcards,
+                "created_at": now,
+                "last_used_at": now,
+            },
+        )
+        evict()
+    except DatabaseError as e:
+        logger.warning("LLM CACHE: store failed, skipping: %s", e)
+
+
+def evict():
+    """Drop expired entries, then the least recently used ones over the limit."""
+    LLMResponseCache.objects.filter(created_at__lt=_expiry_cutoff()).delete()
+
+    max_entries = settings.LLM_CACHE_MAX_ENTRIES
+    if LLMResponseCache.objects.count() <= max_entries:
+        return
+
+    stale_ids = list(
+        LLMResponseCache.objects.order_by("-last_used_at")
+        .values_list("id", flat=True)[max_entries:]
+    )
+    LLMResponseCache.objects.filter(id__in=stale_ids).delete()
@@ -0,0 +1,237 @@
+"""
+LLM PROVIDERS - The "Suppliers" of our Restaurant
+
+geminiapi.py knows *what* to ask for (the prompt) and what to do with the
+answer (parse, cache, save). The provider is whoever actually answers:
+
+- GeminiProvider: Google Gemini (the real thing). The client is only
+  created the first time a prompt is sent, so importing the app, running
+  tests or starting a benchmark never needs an API key.
+- FakeProvider: answers instantly from this machine with made-up but
+  well-formed flashcards. Latency, output size and failure rate are
+  configurable, so load tests and CI can run the whole upload pipeline
+  offline and at a known speed.
+
+Pick one with settings.LLM_PROVIDER ("gemini" or "fake").
+
+ADDING A PROVIDER:
+Subclass LLMProvider, implement generate() and stream() (it's an abstract
+base class, so a provider missing either can't even be created), and add
+it to PROVIDERS below. The async versions (agenerate/astream, used by the async
+views) fall back to running generate() in a thread; override them when
+the provider has a native async client.
+
+CONCEPTS: Interfaces, Dependency Injection, Lazy Initialization, Test Doubles, async/await
+RELATED: geminiapi.py (uses get_provider()), rate_limit.py (wraps the calls)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import cached_property
+
+from django.conf import settings
+from google import genai
+from google.genai import types
+
+# Model used to generate flashcards
+GEMINI_MODEL = "gemini-2.0-flash"
+
+# STRUCTURED OUTPUT: with settings.LLM_STRUCTURED_OUTPUT on, Gemini is told
+# to answer with JSON matching this schema, so it can't wrap the array in
+# prose or code fences or invent its own keys
+FLASHCARD_SCHEMA = types.Schema(
+    type=types.Type.ARRAY,
+    items=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "question": types.Schema(type=types.Type.STRING),
+            "answer": types.Schema(type=types.Type.STRING),
+        },
+        required=["question", "answer"],
+        property_ordering=["question", "answer"],
+    ),
+)
+
+
+class LLMProvider(ABC):
+    """
+    Interface every provider implements.
+
+    model_name is part of the LLM response cache key, so answers from
+    different providers/models are never mixed up.
+    """
+    model_name = None
+
+    @abstractmethod
+    def generate(self, prompt):
+        """Send a prompt and return the whole response text."""
+
+    @abstractmethod
+    def stream(self, prompt):
+        """Send a prompt and yield the response text piece by piece."""
+
+    async def agenerate(self, prompt):
+        """generate() for async code (default: in a thread)."""
+        return await asyncio.to_thread(self.generate, prompt)
+
+    async def astream(self, prompt):
+        """stream() for async code (default: the whole response as one piece)."""
+        yield await self.agenerate(prompt)
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through the google-genai client."""
+    model_name = GEMINI_MODEL
+
+    @cached_property
+    def client(self):
+        # Created on first use, not at import time
+        api_key = os.getenv("API_KEY")
+        if not api_key:
+            raise ValueError(
+                "API_KEY not found in environment variables. "
+                "Please create a .env file with your Gemini API key. "
+                "See .env.example for reference."
+            )
+        return genai.Client(api_key=api_key)
+
+    def _config(self):
+        if not settings.LLM_STRUCTURED_OUTPUT:
+            return None
+        return types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=FLASHCARD_SCHEMA,
+        )
+
+    def generate(self, prompt):
+        response = self.client.models.generate_content(
+            model=self.model_name, contents=prompt, config=self._config()
+        )
+        return response.text or ""
+
+    def stream(self, prompt):
+        chunks = self.client.models.generate_content_stream(
+            model=self.model_name, contents=prompt, config=self._config()
+        )
+        for chunk in chunks:
+            yield chunk.text or ""
+
+    # client.aio is the same client with async methods: awaiting a response
+    # frees the event loop instead of blocking a thread until Gemini answers
+
+    async def agenerate(self, prompt):
+        response = await self.client.aio.models.generate_content(
+            model=self.model_name, contents=prompt, config=self._config()
+        )
+        return response.text or ""
+
+    async def astream(self, prompt):
+        chunks = await self.client.aio.models.generate_content_stream(
+            model=self.model_name, contents=prompt, config=self._config()
+        )
+        async for chunk in chunks:
+            yield chunk.text or ""
+
+
+class FakeProviderError(ConnectionError):
+    """A simulated provider outage (retryable, like a real network error)."""
+
+
+class FakeProvider(LLMProvider):
+    """
+    Deterministic stand-in for a real LLM.
+
+    The same prompt always gets the same flashcards. Behaviour comes from
+    settings (read on every call, so tests can override them):
+        FAKE_LLM_LATENCY       seconds per response (spread over the stream)
+        FAKE_LLM_CARDS         flashcards per response
+        FAKE_LLM_ANSWER_CHARS  length of each answer
+        FAKE_LLM_FAILURE_RATE  fraction of calls that fail (0.0 - 1.0)
+        FAKE_LLM_SEED          seed for which calls fail
+    """
+    model_name = "fake"
+
+    def __init__(self):
+        self._random = random.Random(settings.FAKE_LLM_SEED)
+        self._lock = threading.Lock()
+
+    def _maybe_fail(self):
+        with self._lock:
+            roll = self._random.random()
+        if roll < settings.FAKE_LLM_FAILURE_RATE:
+            raise FakeProviderError("Fake LLM provider: simulated outage")
+
+    def _flashcards(self, prompt):
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        filler = ("lorem ipsum " * (settings.FAKE_LLM_ANSWER_CHARS // 12 + 1))
+        return [
+            {
+                "question": f"Question {number} about document {digest}?",
+                "answer": f"Answer {number}: {filler}"[:settings.FAKE_LLM_ANSWER_CHARS],
+            }
+            for number in range(1, settings.FAKE_LLM_CARDS + 1)
+        ]
+
+    def generate(self, prompt):
+        self._maybe_fail()
+        time.sleep(settings.FAKE_LLM_LATENCY)
+        return json.dumps(self._flashcards(prompt))
+
+    def stream(self, prompt):
+        self._maybe_fail()
+        flashcards = self._flashcards(prompt)
+        # One piece per card, arriving evenly over the response time
+        delay = settings.FAKE_LLM_LATENCY / (len(flashcards) + 1)
+        time.sleep(delay)
+        yield "["
+        for number, flashcard in enumerate(flashcards):
+            time.sleep(delay)
+            yield (", " if number else "") + json.dumps(flashcard)
+        yield "]"
+
+    async def agenerate(self, prompt):
+        self._maybe_fail()
+        await asyncio.sleep(settings.FAKE_LLM_LATENCY)
+        return json.dumps(self._flashcards(prompt))
+
+    async def astream(self, prompt):
+        self._maybe_fail()
+        flashcards = self._flashcards(prompt)
+        delay = settings.FAKE_LLM_LATENCY / (len(flashcards) + 1)
+        await asyncio.sleep(delay)
+        yield "["
+        for number, flashcard in enumerate(flashcards):
+            await asyncio.sleep(delay)
+            yield (", " if number else "") + json.dumps(flashcard)
+        yield "]"
+
+
+PROVIDERS = {
+    "gemini": GeminiProvider,
+    "fake": FakeProvider,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_provider():
+    """
+    Return the provider chosen by settings.LLM_PROVIDER.
+
+    One instance per provider is kept for the life of the process (so the
+    Gemini client is reused between calls).
+    """
+    name = settings.LLM_PROVIDER
+    with _instances_lock:
+        if name not in _instances:
+            if name not in PROVIDERS:
+                raise ValueError(f"Unknown LLM_PROVIDER {name!r}, expected one of {sorted(PROVIDERS)}")
+            _instances[name] = PROVIDERS[name]()
+        return _instances[name]
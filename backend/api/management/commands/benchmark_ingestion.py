@@ -0,0 +1,165 @@
+"""
+BENCHMARK COMMAND - Times every stage of turning an upload into flashcards
+
+USAGE:
+    python manage.py benchmark_ingestion                      # all formats and sizes
+    python manage.py benchmark_ingestion --formats pdf --sizes 1m,10m
+    python manage.py benchmark_ingestion --save-baseline      # record this machine's baseline
+    python manage.py benchmark_ingestion --repeat 5           # best of 5 runs per stage
+    python manage.py benchmark_ingestion --no-compare         # just print the results
+
+The results are compared against the baseline file, and the command exits
+with an error when a stage has regressed - so it can run in CI. Baselines
+are machine-specific, so none is committed: record one on the machine
+that compares against it. Without a baseline the command fails too
+(unless --no-compare), so a CI job can't pass without checking anything.
+
+Everything runs offline against a scratch database (like `manage.py test`)
+with the fake LLM provider, so no API key is needed and the real
+database is never touched.
+
+RELATED: api/benchmarks.py (the stages and measurements)
+"""
+
+import platform
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from api.benchmarks import (
+    MAKERS, compare_to_baseline, load_baseline, run_benchmarks, save_results,
+)
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "ingestion_baseline.json"
+UNITS = {"k": 1024, "m": 1024 * 1024}
+
+
+def parse_size(label):
+    """'10k' → 10240, '1m' → 1048576, '500' → 500"""
+    unit = UNITS.get(label[-1].lower(), 1)
+    number = label[:-1] if unit != 1 else label
+    try:
+        return int(float(number) * unit)
+    except ValueError:
+        raise CommandError(f"Invalid size {label!r} (use e.g. 10k or 1m)")
+
+
+class Command(BaseCommand):
+    help = "Benchmark the upload → extract → LLM → save pipeline on synthetic documents"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--formats", default="txt,docx,pdf",
+            help="Comma-separated formats to test (default: txt,docx,pdf)",
+        )
+        parser.add_argument(
+            "--sizes", default="10k,100k,1m,10m",
+            help="Comma-separated document sizes (default: 10k,100k,1m,10m)",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=3,
+            help="Timed runs per stage; the fastest counts (default: 3)",
+        )
+        parser.add_argument(
+            "--baseline", default=str(DEFAULT_BASELINE),
+            help="Baseline JSON file to compare against / save to",
+        )
+        parser.add_argument(
+            "--save-baseline", action="store_true",
+            help="Save these results as the new baseline instead of comparing",
+        )
+        parser.add_argument(
+            "--no-compare", action="store_true",
+            help="Don't compare against (or require) a baseline",
+        )
+        parser.add_argument(
+            "--tolerance", type=float, default=0.5,
+            help="Allowed slowdown before a stage counts as regressed (default: 0.5 = 50%%)",
+        )
+        parser.add_argument(
+            "--output", help="Also write the results to this JSON file",
+        )
+
+    def handle(self, *args, **options):
+        formats = [f.strip() for f in options["formats"].split(",") if f.strip()]
+        unknown = set(formats) - set(MAKERS)
+        if unknown:
+            raise CommandError(f"Unknown formats: {', '.join(sorted(unknown))}")
+        sizes = [(label.strip(), parse_size(label.strip())) for label in options["sizes"].split(",")]
+
+        results = self.run(formats, sizes, options["repeat"])
+        self.print_table(results)
+
+        meta = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "system": platform.system(),
+            "repeat": options["repeat"],
+        }
+        if options["output"]:
+            save_results(options["output"], results, meta)
+
+        baseline_path = Path(options["baseline"])
+        if options["save_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            save_results(baseline_path, results, meta)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {baseline_path}"))
+            return
+
+        if options["no_compare"]:
+            return
+        if not baseline_path.exists():
+            raise CommandError(
+                f"No baseline at {baseline_path} - record one on this machine with "
+                "--save-baseline, or pass --no-compare"
+            )
+
+        regressions = compare_to_baseline(results, load_baseline(baseline_path), options["tolerance"])
+        if regressions:
+            for line in regressions:
+                self.stderr.write(f"REGRESSION {line}")
+            raise CommandError(f"{len(regressions)} stage(s) regressed against {baseline_path}")
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def run(self, formats, sizes, repeat):
+        media_root = tempfile.mkdtemp(prefix="help2study-bench-")
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(
+                MEDIA_ROOT=media_root,
+                LLM_PROVIDER="fake",
+                FAKE_LLM_LATENCY=0,
+                # Measure the work itself, not cache hits or waiting for quota
+                LLM_CACHE_ENABLED=False,
+                TEXT_CACHE_ENABLED=False,
+                LLM_RATE_LIMIT_PER_MINUTE=0,
+                LLM_USER_RATE_LIMIT_PER_MINUTE=0,
+                INSTRUMENTATION_SAMPLE_RATE=0,
+            ):
+                return run_benchmarks(
+                    formats, sizes, repeat,
+                    progress=lambda case: self.stdout.write(f"Benchmarking {case}...", ending="\r"),
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def print_table(self, results):
+        header = f"{'case':<11} {'stage':<12} {'wall ms':>10} {'cpu ms':>10} {'peak KB':>10} {'queries':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for case, result in results.items():
+            for stage, m in result["stages"].items():
+                self.stdout.write(
+                    f"{case:<11} {stage:<12} {m['wall_ms']:>10.1f} {m['cpu_ms']:>10.1f} "
+                    f"{m['peak_kb']:>10.1f} {m['queries']:>8}"
+                )
+            self.stdout.write(
+                f"{'':<11} {result['file_bytes']:,} bytes → {result['text_chars']:,} chars → "
+                f"{result['tokens_after']:,} of {result['tokens_before']:,} tokens, {result['chunks']} chunks"
+            )
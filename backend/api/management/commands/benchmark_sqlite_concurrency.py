@@ -0,0 +1,219 @@
+"""
+BENCHMARK COMMAND - Many uploads writing while many students read
+
+USAGE:
+    python manage.py benchmark_sqlite_concurrency
+    python manage.py benchmark_sqlite_concurrency --writers 8 --readers 16 --seconds 10
+
+Runs the same workload once per SQLite profile and prints them side by side:
+- default:   Django's stock SQLite settings (SQLITE_CONCURRENT=False)
+- wal:       the concurrency profile (WAL, busy timeout, IMMEDIATE, pragmas)
+- wal+queue: the profile plus the in-process write queue (the default setup)
+
+WORKLOAD:
+- writer threads in one process save whole decks (bulk card inserts), like
+  the threads of a worker or an async web process finishing generations
+- reader processes load a page of a deck and the topic list, like web
+  processes serving students
+Each profile runs in a fresh child process with a fresh database file,
+because the pragmas are applied when a connection is opened.
+
+WHAT TO LOOK FOR:
+- errors: "database is locked" failures (an upload or a page load lost)
+- read p99 / max: how long the slowest page loads waited for writers
+- decks/s: write throughput
+
+RELATED: settings.py (SQLITE_* settings), api/write_queue.py
+"""
+
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from api.geminiapi import save_flashcards
+from api.models import Flashcard, Topic
+from api.views import topics_with_deck_stats
+
+PROFILES = {
+    "default": {"SQLITE_CONCURRENT": "False", "SQLITE_WRITE_QUEUE": "False"},
+    "wal": {"SQLITE_CONCURRENT": "True", "SQLITE_WRITE_QUEUE": "False"},
+    "wal+queue": {"SQLITE_CONCURRENT": "True", "SQLITE_WRITE_QUEUE": "True"},
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = "Compare SQLite profiles under concurrent deck writes and reads"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4, help="Threads saving decks (default: 4)")
+        parser.add_argument("--readers", type=int, default=4, help="Processes reading decks (default: 4)")
+        parser.add_argument("--seconds", type=float, default=5, help="How long each profile runs (default: 5)")
+        parser.add_argument("--deck-size", type=int, default=200, help="Cards per saved deck (default: 200)")
+        parser.add_argument(
+            "--profiles", default=",".join(PROFILES),
+            help=f"Comma-separated profiles to run (default: {','.join(PROFILES)})",
+        )
+        # Internal: run one profile in this process and print its results as JSON
+        parser.add_argument("--run-profile", help="(internal)")
+
+    def handle(self, *args, **options):
+        if options["run_profile"]:
+            results = self.run_workload(options)
+            self.stdout.write(json.dumps(results))
+            return
+
+        names = [name.strip() for name in options["profiles"].split(",") if name.strip()]
+        unknown = set(names) - set(PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profiles: {', '.join(sorted(unknown))}")
+
+        header = (f"{'profile':<10} {'reads/s':>8} {'read p50':>9} {'read p99':>9} {'read max':>9} "
+                  f"{'decks/s':>8} {'write p99':>10} {'errors':>7}")
+        rows = []
+        for name in names:
+            self.stdout.write(f"Running {name}...", ending="\r")
+            results = self.run_child(name, options)
+            rows.append(
+                f"{name:<10} {results['reads_per_second']:>8.0f} {results['read_p50_ms']:>7.1f}ms "
+                f"{results['read_p99_ms']:>7.1f}ms {results['read_max_ms']:>7.0f}ms "
+                f"{results['decks_per_second']:>8.1f} {results['write_p99_ms']:>8.0f}ms "
+                f"{results['errors']:>7}"
+            )
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for row in rows:
+            self.stdout.write(row)
+
+    def run_child(self, name, options):
+        command = [
+            sys.executable, str(Path(settings.BASE_DIR) / "manage.py"), "benchmark_sqlite_concurrency",
+            "--run-profile", name,
+            "--writers", str(options["writers"]), "--readers", str(options["readers"]),
+            "--seconds", str(options["seconds"]), "--deck-size", str(options["deck_size"]),
+        ]
+        env = {**os.environ, **PROFILES[name], "INSTRUMENTATION_SAMPLE_RATE": "0"}
+        child = subprocess.run(command, env=env, capture_output=True, text=True)
+        if child.returncode != 0:
+            raise CommandError(f"Profile {name} failed:\n{child.stderr}")
+        return json.loads(child.stdout.strip().splitlines()[-1])
+
+    def run_workload(self, options):
+        with tempfile.TemporaryDirectory() as directory:
+            # A scratch database file (in-memory databases don't do WAL)
+            connection.settings_dict["TEST"]["NAME"] = str(Path(directory) / "bench.sqlite3")
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                return self._run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _run(self, options):
+        user = User.objects.create(username="benchmark")
+        topic_ids = []
+        for number in range(20):
+            topic = Topic.objects.create(user=user, name=f"Seed {number}")
+            save_flashcards(self.cards(300), topic, user)
+            topic_ids.append(topic.id)
+        # Forked readers must not share this process's connection
+        connection.close()
+
+        processes = multiprocessing.get_context("fork")
+        stop = processes.Event()
+        read_results = processes.Queue()
+        lock = threading.Lock()
+        writes, errors = [], [0]
+
+        def timed(samples, operation):
+            """Run operation; return False if the database was locked."""
+            started = time.perf_counter()
+            try:
+                operation()
+            except OperationalError:
+                # "database is locked" - the request would have failed
+                return False
+            samples.append(time.perf_counter() - started)
+            return True
+
+        def writer():
+            cards = self.cards(options["deck_size"])
+
+            def save_deck():
+                topic = Topic.objects.create(user=user, name="Generated")
+                save_flashcards(cards, topic, user)
+            samples = []
+            failed = 0
+            try:
+                while not stop.is_set():
+                    failed += not timed(samples, save_deck)
+            finally:
+                connection.close()
+            with lock:
+                writes.extend(samples)
+                errors[0] += failed
+
+        def reader(seed):
+            rng = random.Random(seed)
+            samples = []
+            failed = 0
+
+            def load_page():
+                deck = Flashcard.objects.filter(topic_id=rng.choice(topic_ids))
+                list(deck.order_by("created_at", "id")[:50])
+                list(topics_with_deck_stats(user).order_by("-created_at", "-id")[:50])
+            while not stop.is_set():
+                failed += not timed(samples, load_page)
+            read_results.put((samples, failed))
+
+        readers = [processes.Process(target=reader, args=(seed,)) for seed in range(options["readers"])]
+        writers = [threading.Thread(target=writer) for _ in range(options["writers"])]
+        started = time.perf_counter()
+        for worker in readers + writers:
+            worker.start()
+        time.sleep(options["seconds"])
+        stop.set()
+
+        reads = []
+        for _ in readers:
+            samples, failed = read_results.get()
+            reads.extend(samples)
+            errors[0] += failed
+        for worker in readers + writers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            "reads_per_second": len(reads) / elapsed,
+            "read_p50_ms": statistics.median(reads) * 1000 if reads else 0.0,
+            "read_p99_ms": percentile(reads, 0.99) * 1000,
+            "read_max_ms": max(reads, default=0.0) * 1000,
+            "decks_per_second": len(writes) / elapsed,
+            "write_p99_ms": percentile(writes, 0.99) * 1000,
+            "errors": errors[0],
+        }
+
+    @staticmethod
+    def cards(count):
+        return [
+            {"question": f"Question {number}?", "answer": "Answer " + "lorem ipsum " * 15}
+            for number in range(count)
+        ]
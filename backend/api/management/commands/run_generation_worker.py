@@ -0,0 +1,98 @@
+"""
+WORKER COMMAND - Starts the "Line Cooks" that process generation jobs
+
+USAGE:
+    python manage.py run_generation_worker                 # one worker
+    python manage.py run_generation_worker --processes 4   # four workers
+    python manage.py run_generation_worker --threads 8     # eight jobs at once
+    python manage.py run_generation_worker --once          # drain queue, exit
+
+Each worker is a separate OS process, so a slow Gemini call in one of them
+never holds up the others (or the web server). Within a worker, each of
+--threads threads runs one job at a time - cheap parallelism for batch
+uploads, since jobs mostly wait on Gemini. Large deck imports are queued
+as jobs too, and the same workers run them.
+
+RELATED: api/jobs.py (the queue and the job logic)
+"""
+
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.jobs import run_worker
+from api.instrumentation import counters
+
+
+class Command(BaseCommand):
+    help = "Process queued flashcard generation jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Number of worker processes to run (default: 1)",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=settings.GENERATION_WORKER_THREADS,
+            help="Jobs each worker process runs at the same time "
+                 f"(default: {settings.GENERATION_WORKER_THREADS})",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.GENERATION_WORKER_POLL_INTERVAL,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit as soon as the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        processes = options["processes"]
+        poll_interval = options["poll_interval"]
+        once = options["once"]
+        threads = options["threads"]
+
+        if processes <= 1:
+            self.stdout.write(f"Worker started ({threads} threads, poll interval {poll_interval}s)")
+            try:
+                run_worker(poll_interval=poll_interval, once=once, threads=threads)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                # e.g. how often Gemini's output needed repairing
+                totals = counters()
+                if totals:
+                    self.stdout.write(f"Counters: {totals}")
+            return
+
+        # Re-run this command once per worker, each in its own process.
+        # Spawning fresh interpreters (rather than forking) works the same
+        # on every OS and never shares a database connection between workers.
+        command = [
+            sys.executable, sys.argv[0], "run_generation_worker",
+            "--processes", "1",
+            "--threads", str(threads),
+            "--poll-interval", str(poll_interval),
+        ]
+        if once:
+            command.append("--once")
+
+        self.stdout.write(f"Starting {processes} worker processes")
+        workers = [subprocess.Popen(command) for _ in range(processes)]
+        try:
+            for worker in workers:
+                worker.wait()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.wait()
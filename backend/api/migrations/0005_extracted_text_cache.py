@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_llmresponsecache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='source_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.CreateModel(
+            name='ExtractedTextCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64)),
+                ('mime_type', models.CharField(max_length=255)),
+                ('compressed_text', models.BinaryField()),
+                ('text_length', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('sha256', 'mime_type'), name='unique_extracted_text')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_extracted_text_cache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flashcard',
+            index=models.Index(fields=['topic', 'created_at', 'id'], name='flashcard_topic_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flashcard',
+            index=models.Index(fields=['user', 'topic'], name='flashcard_user_topic_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='topic_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['user', 'name'], name='topic_user_name_idx'),
+        ),
+    ]
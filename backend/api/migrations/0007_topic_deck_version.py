@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='deck_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:23
+
+import hashlib
+import random
+import re
+import struct
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of api/utils/minhash.py as of this migration, so it keeps
+# working whatever happens to that module. The constants (and the seed)
+# must match it: these band hashes are looked up by dedupe.py.
+BANDS = 16
+ROWS = 4
+_rng = random.Random(20240601)
+_MASKS = [_rng.getrandbits(64) for _ in range(BANDS * ROWS)]
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def card_words(question, answer):
+    return set(_NON_WORD.sub(" ", f"{question} {answer}").casefold().split())
+
+
+def signature(words):
+    if not words:
+        return []
+    hashes = [
+        int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+        for word in words
+    ]
+    return [min(map(mask.__xor__, hashes)) for mask in _MASKS]
+
+
+def band_hashes(sig):
+    result = []
+    for band in range(len(sig) // ROWS):
+        rows = sig[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(struct.pack(f">H{ROWS}Q", band, *rows), digest_size=8).digest()
+        result.append(int.from_bytes(digest, "big", signed=True))
+    return result
+
+
+def index_existing_flashcards(apps, schema_editor):
+    """Add the band hashes of cards saved before the index existed."""
+    Flashcard = apps.get_model("api", "Flashcard")
+    FlashcardBand = apps.get_model("api", "FlashcardBand")
+    cards = Flashcard.objects.values_list("id", "topic_id", "question", "answer")
+    bands = []
+    for card_id, topic_id, question, answer in cards.iterator(chunk_size=2000):
+        bands.extend(
+            FlashcardBand(topic_id=topic_id, flashcard_id=card_id, band_hash=band_hash)
+            for band_hash in band_hashes(signature(card_words(question, answer)))
+        )
+        if len(bands) >= 5000:
+            FlashcardBand.objects.bulk_create(bands)
+            bands = []
+    FlashcardBand.objects.bulk_create(bands)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_generationbatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlashcardBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band_hash', models.BigIntegerField()),
+                ('flashcard', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='api.flashcard')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.topic')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['topic', 'band_hash'], name='flashcardband_topic_hash_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_flashcards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Full-text search index over flashcards (see api/search.py)
+
+from django.db import migrations
+
+# A frozen copy of the index and triggers in api/search.py as of this
+# migration, so it keeps working whatever happens to that module
+FTS_TABLE = "api_flashcard_fts"
+
+CREATE_INDEX_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        question, answer, user_id, topic_id,
+        content='api_flashcard', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+"""
+DROP_INDEX_SQL = f"DROP TABLE IF EXISTS {FTS_TABLE}"
+REBUILD_INDEX_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+_DELETE_ENTRY = (
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question, answer, user_id, topic_id) "
+    "VALUES ('delete', old.id, old.question, old.answer, old.user_id, old.topic_id);"
+)
+_INSERT_ENTRY = (
+    f"INSERT INTO {FTS_TABLE}(rowid, question, answer, user_id, topic_id) "
+    "VALUES (new.id, new.question, new.answer, new.user_id, new.topic_id);"
+)
+TRIGGERS = {
+    "api_flashcard_fts_insert": f"AFTER INSERT ON api_flashcard BEGIN {_INSERT_ENTRY} END",
+    "api_flashcard_fts_delete": f"AFTER DELETE ON api_flashcard BEGIN {_DELETE_ENTRY} END",
+    "api_flashcard_fts_update": (
+        f"AFTER UPDATE OF question, answer, user_id, topic_id ON api_flashcard BEGIN {_DELETE_ENTRY} {_INSERT_ENTRY} END"
+    ),
+}
+
+
+def install_search_triggers(cursor):
+    for name, body in TRIGGERS.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+def drop_search_triggers(cursor):
+    for name in TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def create_search_index(apps, schema_editor):
+    """Create the FTS5 table and its triggers, and index the existing cards."""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CREATE_INDEX_SQL)
+        install_search_triggers(cursor)
+        cursor.execute(REBUILD_INDEX_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        drop_search_triggers(cursor)
+        cursor.execute(DROP_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_flashcardband'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
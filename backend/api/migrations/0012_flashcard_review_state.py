@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:36
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_flashcard_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='due_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='ease_factor',
+            field=models.FloatField(default=2.5),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='interval_days',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='last_reviewed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='repetitions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='flashcard',
+            index=models.Index(fields=['user', 'due_at', 'id'], name='flashcard_user_due_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_flashcard_review_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='import_format',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='kind',
+            field=models.CharField(choices=[('generate', 'Generate flashcards from a document'), ('import', 'Import a deck file')], default='generate', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='result',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
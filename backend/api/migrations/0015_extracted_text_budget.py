@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:24
+
+from django.db import migrations, models
+
+
+# Entries stored so far don't record the budget they were extracted with,
+# so none of them can be trusted to be the whole document. It's a cache:
+# the next upload of each file just extracts it again.
+def clear_cache(apps, schema_editor):
+    apps.get_model('api', 'ExtractedTextCache').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_generationjob_lease'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_cache, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='extractedtextcache',
+            name='unique_extracted_text',
+        ),
+        migrations.AddField(
+            model_name='extractedtextcache',
+            name='max_chars',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='extractedtextcache',
+            constraint=models.UniqueConstraint(fields=('sha256', 'mime_type', 'max_chars'), name='unique_extracted_text_budget'),
+        ),
+    ]
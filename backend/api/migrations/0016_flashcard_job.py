@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_extracted_text_budget'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='job',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='flashcards', to='api.generationjob'),
+        ),
+    ]
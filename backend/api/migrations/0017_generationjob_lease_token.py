@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_flashcard_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='lease_token',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_generationjob_lease_token'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='flashcardband',
+            name='flashcard',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='bands', to='api.flashcard'),
+        ),
+    ]
@@ -5,7 +5,7 @@ This file defines the structure of our database using Django's ORM (Object-Relat
 Each class represents a table, and each attribute represents a column.
 
 ROLE IN THE SYSTEM:
-- Defines what data we store (users, topics, flashcards)
+- Defines what data we store (users, topics, flashcards, generation jobs)
 - Establishes relationships between data (e.g., a topic belongs to a user)
 - Provides a Python interface to the database (no SQL needed!)
 
@@ -13,8 +13,11 @@ CONCEPTS: Models, ORM, Foreign Keys, Database Relationships, CRUD
 RELATED: views.py (uses these models), serializers.py (converts to JSON)
 """
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .utils.scheduling import DEFAULT_EASE
 
 
 class Topic(models.Model):
@@ -36,6 +39,22 @@ class Topic(models.Model):
     # auto_now_add = automatically set when created
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Bumped whenever a flashcard in this topic is created or deleted.
+    # Cached deck pages and ETags include it, so they go stale automatically
+    # (see api/deck_cache.py)
+    deck_version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # INDEXES = the "table of contents" for frequent lookups
+        # Each matches a hot query's filter columns, then its sort columns,
+        # so the database can jump straight to the rows in the right order
+        indexes = [
+            # Topic list: WHERE user_id = ? ORDER BY created_at, id
+            models.Index(fields=["user", "created_at", "id"], name="topic_user_created_idx"),
+            # Look up a user's topic by name
+            models.Index(fields=["user", "name"], name="topic_user_name_idx"),
+        ]
+
     def __str__(self):
         # How this object appears in Django admin and logs
         return self.name
@@ -69,5 +88,259 @@ class Flashcard(models.Model):
         User, on_delete=models.CASCADE, related_name="user_flashcards"
     )
 
+    # The generation or import job that saved it (empty for cards added by
+    # hand), so a job's event stream sends only its own cards even when
+    # the topic already had cards or is shared with other jobs
+    job = models.ForeignKey(
+        "GenerationJob", on_delete=models.SET_NULL, null=True, blank=True, related_name="flashcards"
+    )
+
+    # SPACED REPETITION STATE (SM-2, see api/utils/scheduling.py)
+    # New cards are due straight away; each review moves due_at forward
+    ease_factor = models.FloatField(default=DEFAULT_EASE)
+    interval_days = models.PositiveIntegerField(default=0)
+    repetitions = models.PositiveIntegerField(default=0)
+    due_at = models.DateTimeField(default=timezone.now)
+    last_reviewed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # A deck: WHERE topic_id = ? ORDER BY created_at, id
+            models.Index(fields=["topic", "created_at", "id"], name="flashcard_topic_created_idx"),
+            # A user's cards in one topic: WHERE user_id = ? AND topic_id = ?
+            models.Index(fields=["user", "topic"], name="flashcard_user_topic_idx"),
+            # Review queue: WHERE user_id = ? AND due_at <= now ORDER BY due_at, id
+            models.Index(fields=["user", "due_at", "id"], name="flashcard_user_due_idx"),
+        ]
+
     def __str__(self):
         return self.question
+
+    def delete(self, *args, **kwargs):
+        # Django doesn't cascade to the card's bands (see FlashcardBand.flashcard)
+        with transaction.atomic():
+            FlashcardBand.objects.filter(flashcard=self).delete()
+            return super().delete(*args, **kwargs)
+
+
+class FlashcardBand(models.Model):
+    """
+    One LSH band hash of a flashcard - the per-topic near-duplicate index.
+
+    Every card gets BANDS rows (see utils/minhash.py). Before new cards
+    are saved, their band hashes are looked up here: only cards sharing at
+    least one band hash with a new card are compared with it, so checking
+    for duplicates doesn't get slower as the deck grows (see dedupe.py).
+
+    DATABASE TABLE: api_flashcardband
+    """
+    # Denormalized from flashcard.topic so the lookup is a single index range
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name="+")
+    # DO_NOTHING: with CASCADE here, Django would have to load every card of
+    # a deleted topic (to find their bands) instead of deleting them all in
+    # one statement. Bands go with their topic instead (one DELETE ...
+    # WHERE topic_id = ?), and Flashcard.delete() removes a single card's.
+    flashcard = models.ForeignKey(Flashcard, on_delete=models.DO_NOTHING, related_name="bands")
+    band_hash = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            # Candidates: WHERE topic_id = ? AND band_hash IN (...)
+            models.Index(fields=["topic", "band_hash"], name="flashcardband_topic_hash_idx"),
+        ]
+
+
+class GenerationBatch(models.Model):
+    """
+    Several documents uploaded together (POST /api/topics/batch/).
+
+    Every file still gets its own GenerationJob - the batch only groups
+    them, so the client can follow a whole semester's uploads with one
+    request (GET /api/batches/<id>/).
+
+    DATABASE TABLE: api_generationbatch
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="generation_batches"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Batch {self.pk} ({self.user})"
+
+
+class GenerationJob(models.Model):
+    """
+    A queued request to turn an uploaded document into flashcards.
+
+    The upload view only stores the file and creates this row; a separate
+    worker process (`python manage.py run_generation_worker`) picks it up,
+    runs the slow extract + Gemini round-trip and records the outcome here.
+
+    Large deck imports (see deck_io.py) are queued the same way, as jobs of
+    kind "import": the worker reads the stored file instead of calling Gemini.
+
+    LIFECYCLE: queued → running → done | failed
+    (running → queued again if the job's worker is lost, see heartbeat_at)
+    DATABASE TABLE: api_generationjob
+    """
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+    KIND_GENERATE = "generate"
+    KIND_IMPORT = "import"
+    KIND_CHOICES = [
+        (KIND_GENERATE, "Generate flashcards from a document"),
+        (KIND_IMPORT, "Import a deck file"),
+    ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="generation_jobs"
+    )
+
+    # The topic is only created once its flashcards are ready,
+    # so a failed job never leaves an empty topic behind.
+    # (Exception: files of a batch that share one topic get it up front.)
+    topic_name = models.CharField(max_length=255)
+    topic = models.ForeignKey(
+        Topic, on_delete=models.SET_NULL, null=True, blank=True, related_name="jobs"
+    )
+
+    # Set when the file was uploaded as part of a batch
+    batch = models.ForeignKey(
+        GenerationBatch, on_delete=models.CASCADE, null=True, blank=True, related_name="jobs"
+    )
+    # The file's original name, to report per-file results
+    source_name = models.CharField(max_length=255, blank=True)
+
+    # The uploaded document, kept until the worker has processed it
+    upload = models.FileField(upload_to="uploads/%Y/%m/%d/", blank=True)
+    mime_type = models.CharField(max_length=255)
+    # Digest of the upload, used to reuse previously extracted text
+    source_sha256 = models.CharField(max_length=64, blank=True)
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES, default=KIND_GENERATE)
+    # Imports only: the file's format (csv, jsonl or anki), and once done the
+    # import summary (imported / duplicates / invalid / errors)
+    import_format = models.CharField(max_length=16, blank=True)
+    result = models.JSONField(null=True, blank=True)
+
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED
+    )
+    flashcard_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    # The lease: the running worker refreshes heartbeat_at, and a job whose
+    # heartbeat is older than settings.JOB_LEASE_SECONDS is claimed again
+    # (see jobs.reclaim_stale_jobs). attempts counts the claims.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    # New for every claim and cleared when the job is reclaimed: a worker
+    # only writes to the job while the row still has its token
+    lease_token = models.UUIDField(null=True, blank=True, editable=False)
+
+    class Meta:
+        # Workers poll for the oldest queued job
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"{self.topic_name} ({self.status})"
+
+
+class LLMResponseCache(models.Model):
+    """
+    Flashcards Gemini already generated for a given document.
+
+    The key is a SHA-256 of the normalized document text, the model name and
+    the prompt template version, so the same notes uploaded again (by anyone)
+    reuse the earlier answer instead of paying for another LLM call.
+
+    EVICTION: least recently used entries are removed once the table grows
+    past settings.LLM_CACHE_MAX_ENTRIES, and entries older than
+    settings.LLM_CACHE_TTL_SECONDS are treated as missing.
+
+    DATABASE TABLE: api_llmresponsecache
+    """
+    key = models.CharField(max_length=64, unique=True)
+    model_name = models.CharField(max_length=100)
+
+    # Parsed flashcards: [{"question": "...", "answer": "..."}, ...]
+    flashcards = models.JSONField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    hit_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.model_name}:{self.key[:12]}"
+
+
+class ExtractedTextCache(models.Model):
+    """
+    Text already extracted from a document, keyed by the file's SHA-256.
+
+    The same course PDF gets uploaded by many students; extraction is our
+    main CPU cost, so a repeat upload reuses the stored text instead.
+    The text is zlib-compressed (plain text typically shrinks 3-4x).
+
+    Extraction stops at a character budget (settings.EXTRACT_MAX_TOKENS),
+    so the budget is part of the key: after it's raised, a cached text cut
+    to the old budget isn't served as the whole document.
+
+    EVICTION: least recently used entries are removed once the table grows
+    past settings.TEXT_CACHE_MAX_ENTRIES.
+
+    DATABASE TABLE: api_extractedtextcache
+    """
+    sha256 = models.CharField(max_length=64)
+    mime_type = models.CharField(max_length=255)
+    # The character budget the text was extracted with (0 = no limit)
+    max_chars = models.PositiveIntegerField(default=0)
+
+    compressed_text = models.BinaryField()
+    text_length = models.PositiveIntegerField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sha256", "mime_type", "max_chars"], name="unique_extracted_text_budget"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.mime_type}:{self.sha256[:12]}"
+
+
+class RateLimitBucket(models.Model):
+    """
+    One token bucket of the Gemini rate limiter (see api/rate_limit.py).
+
+    Keeping the buckets in the database means every web and worker process
+    draws from the same quota. Tokens are refilled lazily: each time a
+    bucket is used, it gets the tokens earned since updated_at.
+
+    DATABASE TABLE: api_ratelimitbucket
+    """
+    # "global" or "user:<id>"
+    key = models.CharField(max_length=100, unique=True)
+    tokens = models.FloatField()
+    # Unix timestamp (seconds) of the last refill
+    updated_at = models.FloatField()
+
+    def __str__(self):
+        return f"{self.key} ({self.tokens:.1f} tokens)"
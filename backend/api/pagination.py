@@ -0,0 +1,131 @@
+"""
+PAGINATION - The "Courses" of our Restaurant
+
+Instead of bringing every dish to the table at once, list endpoints serve a
+page of results plus a link to the next page.
+
+WHY KEYSET (CURSOR) PAGINATION INSTEAD OF PAGE NUMBERS:
+- ?page=500 makes the database walk past 499 pages of rows (OFFSET) before
+  returning anything, so deep pages get slower and slower
+- A keyset cursor remembers the last row we sent, (created_at, id), and
+  asks for rows after it: WHERE (created_at, id) > (?, ?) LIMIT n.
+  With an index that is a direct jump, so every page costs the same
+- Rows added while someone is paging don't shift later pages around
+
+RESPONSE FORMAT:
+    { "next": "http://.../api/topics/?cursor=...", "results": [...] }
+"next" is null on the last page.
+
+CONCEPTS: Pagination, Keyset/Cursor Pagination, Stable Ordering
+RELATED: views.py (TopicListCreate, FlashcardListByTopic)
+"""
+
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate by (created_at, id), oldest first by default.
+
+    Views can set `keyset_ordering = ("-created_at", "-id")` for newest first.
+    Page size comes from settings.API_PAGE_SIZE and can be lowered or
+    raised (up to max_page_size) with ?page_size=.
+    """
+    ordering = ("created_at", "id")
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        page_size = settings.API_PAGE_SIZE
+        requested = request.query_params.get(self.page_size_query_param)
+        if requested:
+            try:
+                page_size = int(requested)
+            except ValueError:
+                pass
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, instance):
+        position = [instance.created_at.isoformat(), instance.pk]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError
+            return created_at, int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, page_size = self._page_queryset(queryset, request, view)
+        return self._finish_page(list(queryset), page_size)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views: the page is read with the async ORM."""
+        queryset, page_size = self._page_queryset(queryset, request, view)
+        return self._finish_page([row async for row in queryset], page_size)
+
+    def _page_queryset(self, queryset, request, view):
+        """Narrow the queryset down to the requested page (plus one row)."""
+        self.request = request
+        ordering = getattr(view, "keyset_ordering", self.ordering)
+        descending = ordering[0].startswith("-")
+        page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            created_at, pk = cursor
+            # Rows strictly after the cursor in (created_at, id) order
+            if descending:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+                )
+
+        # Fetch one extra row to find out whether there is a next page
+        return queryset.order_by(*ordering)[:page_size + 1], page_size
+
+    def _finish_page(self, results, page_size):
+        self.has_next = len(results) > page_size
+        results = results[:page_size]
+        self.next_cursor = self.encode_cursor(results[-1]) if self.has_next else None
+        return results
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,357 @@
+"""
+GEMINI RATE LIMITING - The "Host Stand" in our Restaurant
+
+Gemini only accepts so many requests per minute. Firing requests at it
+as fast as jobs arrive gets us 429 errors, and then every retry makes
+the storm worse. The host stand seats guests at the pace the kitchen can
+handle instead:
+
+1. TOKEN BUCKETS: every Gemini call takes a token from a global bucket
+   (our API quota) and from the uploading user's bucket (so one student
+   can't use up the quota for everyone). Buckets refill at a steady rate;
+   when one is empty the caller waits briefly for the next token instead
+   of failing. The buckets live in the database, so all web and worker
+   processes share them.
+2. RETRIES WITH BACKOFF: rate-limit (429) and server (5xx) errors are
+   retried after 1s, 2s, 4s, ... with random jitter, so workers that failed
+   together don't all retry at the same instant.
+3. CIRCUIT BREAKER: after several failures in a row we stop calling
+   Gemini for a while and fail jobs immediately, instead of every job
+   waiting through its own retries while the provider is down.
+4. CONCURRENCY LIMIT: buckets decide how many calls *start* per minute;
+   llm_slot() caps how many are *running* at once in this process, across
+   every job and chunk (e.g. all the files of a batch upload).
+
+FAILURE POLICY:
+Like our caches, the buckets are best-effort: if the bucket table can't be
+used (e.g. the database is locked), the call goes ahead without a token.
+The retry/backoff layer still protects us if that leads to a 429.
+
+USAGE:
+    response = call_with_retries(lambda: client.models.generate_content(...), user_id)
+    response = await acall_with_retries(lambda: client.aio.models.generate_content(...), user_id)
+
+The async versions wait with asyncio.sleep(), so a call waiting for a token
+or a retry doesn't hold up the other requests on the event loop.
+
+CONCEPTS: Rate Limiting, Token Buckets, Exponential Backoff, Jitter, Circuit Breakers
+RELATED: geminiapi.py (wraps every Gemini call), models.py (RateLimitBucket)
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from google.genai import errors as genai_errors
+
+from .models import RateLimitBucket
+from .instrumentation import count
+
+logger = logging.getLogger('api')
+
+
+class RateLimitTimeout(Exception):
+    """No token became available within settings.LLM_RATE_LIMIT_MAX_WAIT."""
+
+
+class CircuitOpen(Exception):
+    """Gemini has been failing, so calls are refused until the cooldown ends."""
+
+
+# ============================================
+# TOKEN BUCKETS
+# ============================================
+
+def _take_token(key, per_minute, burst):
+    """
+    Take one token from a bucket.
+
+    Returns:
+        float: 0 if a token was taken, otherwise seconds until one is available
+    """
+    rate = per_minute / 60.0
+    now = time.time()
+    with transaction.atomic():
+        # Lock the bucket before reading it, so two processes can't both
+        # spend the same token. The (no-op) UPDATE takes the database write
+        # lock on SQLite and the row lock on other databases.
+        if not RateLimitBucket.objects.filter(key=key).update(key=key):
+            RateLimitBucket.objects.get_or_create(
+                key=key, defaults={"tokens": burst, "updated_at": now}
+            )
+        bucket = RateLimitBucket.objects.select_for_update().get(key=key)
+
+        # Add the tokens earned since the last refill, up to the burst size
+        tokens = min(burst, bucket.tokens + max(0.0, now - bucket.updated_at) * rate)
+        if tokens >= 1:
+            bucket.tokens = tokens - 1
+            bucket.updated_at = now
+            bucket.save(update_fields=["tokens", "updated_at"])
+            return 0.0
+        return (1 - tokens) / rate
+
+
+def _buckets(user_id):
+    """The (key, per_minute, burst) buckets a call by this user takes tokens from."""
+    buckets = []
+    if user_id is not None and settings.LLM_USER_RATE_LIMIT_PER_MINUTE > 0:
+        buckets.append((f"user:{user_id}", settings.LLM_USER_RATE_LIMIT_PER_MINUTE,
+                        settings.LLM_USER_RATE_LIMIT_BURST))
+    if settings.LLM_RATE_LIMIT_PER_MINUTE > 0:
+        buckets.append(("global", settings.LLM_RATE_LIMIT_PER_MINUTE,
+                        settings.LLM_RATE_LIMIT_BURST))
+    return buckets
+
+
+def _try_take_token(key, per_minute, burst):
+    """_take_token(), but a bucket we can't use counts as a token taken."""
+    try:
+        return _take_token(key, per_minute, burst)
+    except DatabaseError as e:
+        logger.warning("Rate limit bucket %s unavailable, not limiting: %s", key, e)
+        count("llm.rate_limit_errors")
+        return 0.0
+
+
+def _wait_time(key, wait, deadline):
+    """How long to sleep before asking the bucket again (raises past the deadline)."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise RateLimitTimeout(f"Gemini rate limit ({key}): no capacity, try again later")
+    count("llm.rate_limit_waits")
+    # A little jitter so waiting processes don't all wake up together
+    return min(wait + random.uniform(0, 0.1), remaining)
+
+
+def acquire(user_id=None):
+    """
+    Wait until both the user's and the global bucket have a token, and take them.
+
+    Raises:
+        RateLimitTimeout: if that takes longer than LLM_RATE_LIMIT_MAX_WAIT
+    """
+    deadline = time.monotonic() + settings.LLM_RATE_LIMIT_MAX_WAIT
+    for key, per_minute, burst in _buckets(user_id):
+        while wait := _try_take_token(key, per_minute, burst):
+            time.sleep(_wait_time(key, wait, deadline))
+
+
+async def aacquire(user_id=None):
+    """acquire() for async code: the bucket query runs in a thread, the wait doesn't."""
+    deadline = time.monotonic() + settings.LLM_RATE_LIMIT_MAX_WAIT
+    for key, per_minute, burst in _buckets(user_id):
+        while wait := await sync_to_async(_try_take_token)(key, per_minute, burst):
+            await asyncio.sleep(_wait_time(key, wait, deadline))
+
+
+# ============================================
+# CIRCUIT BREAKER
+# ============================================
+
+class CircuitBreaker:
+    """
+    Stop calling a failing service for a while.
+
+    CLOSED: calls go through; `failure_threshold` failures in a row → OPEN
+    OPEN: calls are refused until `reset_seconds` have passed → HALF-OPEN
+    HALF-OPEN: one trial call goes through; success → CLOSED, failure → OPEN
+
+    The state is per process: each worker finds out on its own that the
+    provider is down, after a handful of failures at most.
+
+    A trial that ends without an answer from the provider (the rate limiter
+    timed out, the task was cancelled) must hand back its turn with
+    release_trial() - otherwise no other call could ever be the trial, and
+    the circuit would stay open until the process restarts.
+    """
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial = None  # Token of the trial call in progress, if any
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Raise CircuitOpen if the call shouldn't be attempted.
+
+        Returns:
+            A token if this call is the half-open trial (pass it to
+            release_trial() once the call is over), otherwise None
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return None
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial is not None:
+                count("llm.circuit_rejections")
+                raise CircuitOpen("Gemini is unavailable right now, please try again shortly")
+            # Cooldown over: let this one call through as a trial
+            self._trial = object()
+            return self._trial
+
+    def release_trial(self, trial):
+        """Let another call be the trial, if this one ended without a verdict."""
+        with self._lock:
+            if trial is not None and self._trial is trial:
+                self._trial = None
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial = None
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Gemini circuit opened after %d failures", self._failures)
+                self._opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker(
+    failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+    reset_seconds=settings.LLM_CIRCUIT_RESET_SECONDS,
+)
+
+
+# ============================================
+# CONCURRENCY LIMIT
+# ============================================
+
+_slots = threading.BoundedSemaphore(settings.LLM_MAX_IN_FLIGHT)
+# asyncio semaphores belong to one event loop, so there's one per loop
+_async_slots = weakref.WeakKeyDictionary()
+
+
+@contextmanager
+def llm_slot():
+    """Hold one of this process's LLM_MAX_IN_FLIGHT call slots."""
+    if not _slots.acquire(blocking=False):
+        count("llm.concurrency_waits")
+        _slots.acquire()
+    try:
+        yield
+    finally:
+        _slots.release()
+
+
+@asynccontextmanager
+async def allm_slot():
+    """llm_slot() for async code."""
+    loop = asyncio.get_running_loop()
+    slots = _async_slots.get(loop)
+    if slots is None:
+        slots = _async_slots[loop] = asyncio.Semaphore(settings.LLM_MAX_IN_FLIGHT)
+    if slots.locked():
+        count("llm.concurrency_waits")
+    async with slots:
+        yield
+
+
+# ============================================
+# RETRIES
+# ============================================
+
+def is_retryable(error):
+    """Rate limits, server errors and network failures are worth retrying."""
+    if isinstance(error, genai_errors.APIError):
+        return error.code == 429 or error.code >= 500
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+def _retry_delay(error, attempt):
+    """
+    Record a failed call and decide whether to try again.
+
+    Returns:
+        float | None: Seconds to wait before retry number `attempt + 1`,
+        or None if the error should be raised
+    """
+    if not is_retryable(error):
+        # Our fault (bad request, bad key): says nothing about whether the
+        # provider is up, so it's neither a failure nor a success. A
+        # half-open trial is handed back by the caller (release_trial)
+        return None
+    breaker.record_failure()
+    if attempt >= settings.LLM_MAX_RETRIES:
+        return None
+    # Full jitter: anywhere between 0 and the exponential delay
+    delay = random.uniform(0, min(settings.LLM_RETRY_MAX_DELAY,
+                                  settings.LLM_RETRY_BASE_DELAY * 2 ** attempt))
+    count("llm.retries")
+    logger.warning("Gemini call failed (%s), retry %d in %.1fs", error, attempt + 1, delay)
+    return delay
+
+
+def call_with_retries(call, user_id=None):
+    """
+    Run a Gemini call under the rate limiter, retrying transient failures.
+
+    Args:
+        call: Function making one Gemini request
+        user_id: Whose quota to charge (None = only the global bucket)
+
+    Returns:
+        Whatever call() returns
+    """
+    attempt = 0
+    while True:
+        trial = breaker.before_call()
+        try:
+            acquire(user_id)
+            try:
+                result = call()
+            except Exception as error:
+                delay = _retry_delay(error, attempt)
+                if delay is None:
+                    raise
+            else:
+                breaker.record_success()
+                return result
+        finally:
+            # Rate limit timeouts and cancellations record nothing
+            breaker.release_trial(trial)
+        attempt += 1
+        time.sleep(delay)
+
+
+async def acall_with_retries(call, user_id=None):
+    """
+    call_with_retries() for async code.
+
+    Args:
+        call: Function returning an awaitable that makes one Gemini request
+        user_id: Whose quota to charge (None = only the global bucket)
+    """
+    attempt = 0
+    while True:
+        trial = breaker.before_call()
+        try:
+            await aacquire(user_id)
+            try:
+                result = await call()
+            except Exception as error:
+                delay = _retry_delay(error, attempt)
+                if delay is None:
+                    raise
+            else:
+                breaker.record_success()
+                return result
+        finally:
+            # Rate limit timeouts and cancellations (CancelledError isn't an
+            # Exception) record nothing
+            breaker.release_trial(trial)
+        attempt += 1
+        await asyncio.sleep(delay)
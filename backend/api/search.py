@@ -0,0 +1,211 @@
+"""
+FLASHCARD SEARCH - The "Recipe Index" at the Back of the Cookbook
+
+Finding one card by loading whole decks and filtering in the browser gets
+slow once a student has thousands of cards. SQLite's FTS5 extension keeps
+an inverted index (word → the cards containing it) next to api_flashcard,
+so a search reads only the cards that contain the words searched for.
+
+HOW THE INDEX STAYS IN SYNC:
+- api_flashcard_fts is an "external content" FTS5 table: it stores only
+  the index, and reads question/answer back from api_flashcard by rowid
+  (= Flashcard.id) when it needs the text, e.g. for snippets
+- Triggers on api_flashcard add, replace and remove index entries on
+  INSERT, UPDATE and DELETE - so bulk_create(), bulk_update(), queryset
+  deletes and cascades (which send no Django signals) are covered too
+- When a migration changes the Flashcard table, Django's SQLite backend
+  rebuilds it (create a copy, drop the old one), which also drops its
+  triggers. install_search_triggers() runs after every migrate to put
+  them back (see apps.py)
+
+WHY user_id AND topic_id ARE IN THE INDEX:
+Every user's cards share one index. Filtering with a JOIN after the MATCH
+would rank the matching cards of ALL users, so a search would get slower
+as the site grows. With user_id (and topic_id) as indexed columns, the
+MATCH itself is "this user's cards AND these words": FTS5 intersects the
+lists in the index, and only the user's own matches are ranked.
+
+SEARCHING:
+- Every word of the query must match (in the question or the answer)
+- The last word matches as a prefix once it has MIN_PREFIX_CHARS letters,
+  so results show up while typing ("mit" finds "mitochondria");
+  "photo*" asks for a prefix anywhere
+- Cost grows with how many of the user's cards match: a common word or a
+  short prefix in a 100k-card account is slower than a specific search
+- Results are ranked with BM25 (rare words and short cards count more),
+  with question matches weighted above answer matches
+- Each result has a snippet of the matching text, matches in <mark>
+
+CONCEPTS: Full-Text Search, Inverted Indexes, BM25 Ranking, Triggers
+RELATED: migrations/0011_flashcard_fts.py, views.py (FlashcardSearch), apps.py
+"""
+
+import html
+import re
+
+from django.db import connection, connections
+
+from .instrumentation import span
+from .models import Flashcard
+
+FTS_TABLE = "api_flashcard_fts"
+
+# A question match counts twice as much as an answer match
+QUESTION_WEIGHT = 2.0
+ANSWER_WEIGHT = 1.0
+# Words of context around the matches in a snippet
+SNIPPET_WORDS = 16
+# Queries with more words than this are cut short (each word is a lookup)
+MAX_QUERY_TERMS = 12
+# A shorter last word only matches whole words: "ce" as a prefix would
+# match most cards in the account, and rank every one of them
+MIN_PREFIX_CHARS = 3
+
+# The index: unicode61 folds case and accents ("Élan" matches "elan");
+# prefix indexes make 2- and 3-letter prefix searches single lookups.
+# user_id and topic_id are only ever searched as whole numbers.
+CREATE_INDEX_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        question, answer, user_id, topic_id,
+        content='api_flashcard', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+"""
+DROP_INDEX_SQL = f"DROP TABLE IF EXISTS {FTS_TABLE}"
+# Re-index every card (also repairs an index that got out of sync)
+REBUILD_INDEX_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+# External content tables must be told the OLD text to remove an entry
+_DELETE_ENTRY = (
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, question, answer, user_id, topic_id) "
+    "VALUES ('delete', old.id, old.question, old.answer, old.user_id, old.topic_id);"
+)
+_INSERT_ENTRY = (
+    f"INSERT INTO {FTS_TABLE}(rowid, question, answer, user_id, topic_id) "
+    "VALUES (new.id, new.question, new.answer, new.user_id, new.topic_id);"
+)
+TRIGGERS = {
+    "api_flashcard_fts_insert": f"AFTER INSERT ON api_flashcard BEGIN {_INSERT_ENTRY} END",
+    "api_flashcard_fts_delete": f"AFTER DELETE ON api_flashcard BEGIN {_DELETE_ENTRY} END",
+    "api_flashcard_fts_update": (
+        f"AFTER UPDATE OF question, answer, user_id, topic_id ON api_flashcard BEGIN {_DELETE_ENTRY} {_INSERT_ENTRY} END"
+    ),
+}
+
+# Control characters can't appear in card text we got from the LLM or a
+# form, so they mark matches safely until the snippet is HTML-escaped
+_MATCH_START, _MATCH_END = "\x02", "\x03"
+_TERM = re.compile(r"\w+\*?")
+
+
+def install_search_triggers(cursor):
+    """Create the index triggers that are missing (safe to run any time)."""
+    for name, body in TRIGGERS.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+def drop_search_triggers(cursor):
+    for name in TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def reinstall_search_triggers(using, **kwargs):
+    """post_migrate handler: put back triggers a table rebuild dropped."""
+    db = connections[using]
+    if db.vendor != "sqlite" or FTS_TABLE not in db.introspection.table_names():
+        return
+    with db.cursor() as cursor:
+        install_search_triggers(cursor)
+
+
+def build_match_query(text):
+    """
+    Turn what the user typed into an FTS5 expression for the card text.
+
+    Every word is quoted, so FTS5 operators and punctuation in the query
+    (AND, NEAR, "-", ":") are searched for as text instead of being run.
+
+    Returns:
+        str or None: The expression, or None if there is nothing to search
+
+    EXAMPLE:
+        build_match_query("cell membr")      # '"cell" "membr"*'
+        build_match_query("photo* energy")   # '"photo"* "energy"*'
+        build_match_query("vitamin b")       # '"vitamin" "b"'
+    """
+    terms = _TERM.findall(text)[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    parts = []
+    for number, term in enumerate(terms):
+        word = term.rstrip("*")
+        prefix = term.endswith("*") or (number == len(terms) - 1 and len(word) >= MIN_PREFIX_CHARS)
+        parts.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(parts)
+
+
+def _highlight(snippet):
+    """HTML-escape a snippet, then turn the match markers into <mark> tags."""
+    return (
+        html.escape(snippet)
+        .replace(_MATCH_START, "<mark>")
+        .replace(_MATCH_END, "</mark>")
+    )
+
+
+def search_flashcards(user, text, topic_id=None, limit=20):
+    """
+    The user's best-matching flashcards for a search query.
+
+    Args:
+        user: Only this user's cards are searched
+        text (str): The query, as typed
+        topic_id (int): Optional - only search this topic
+        limit (int): How many results to return
+
+    Returns:
+        list[Flashcard]: Best match first, each with two extra attributes:
+                         .snippet and .score (higher is better)
+    """
+    words = build_match_query(text)
+    if words is None:
+        return []
+    match = f'user_id : "{int(user.id)}" AND '
+    if topic_id is not None:
+        match += f'topic_id : "{int(topic_id)}" AND '
+    match += f"{{question answer}} : ({words})"
+
+    # A snippet of each text column; the question's is used if it matches.
+    # (snippet() with column -1 could pick the matching user_id column.)
+    snippet_args = f"%s, %s, '…', {SNIPPET_WORDS}"
+    sql = f"""
+        SELECT rowid,
+               snippet({FTS_TABLE}, 0, {snippet_args}),
+               snippet({FTS_TABLE}, 1, {snippet_args}),
+               bm25({FTS_TABLE}, %s, %s, 0, 0) AS score
+        FROM {FTS_TABLE}
+        WHERE {FTS_TABLE} MATCH %s
+        ORDER BY score, rowid
+        LIMIT %s
+    """
+    markers = [_MATCH_START, _MATCH_END]
+    params = markers + markers + [QUESTION_WEIGHT, ANSWER_WEIGHT, match, limit]
+
+    with span("search"):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        # One more indexed query (by primary key) for the cards themselves
+        cards = Flashcard.objects.in_bulk([row[0] for row in rows])
+
+    results = []
+    for card_id, question_snippet, answer_snippet, score in rows:
+        card = cards.get(card_id)
+        if card is None:
+            continue  # Deleted between the two queries
+        snippet = question_snippet if _MATCH_START in question_snippet else answer_snippet
+        card.snippet = _highlight(snippet)
+        # bm25() is negative, more negative for better matches
+        card.score = round(-score, 4)
+        results.append(card)
+    return results
@@ -15,32 +15,10 @@ CONCEPTS: Serialization, Data Validation, JSON conversion
 RELATED: views.py (uses serializers), models.py (source of data)
 """
 
-import logging
 from django.contrib.auth.models import User
 from rest_framework import serializers
-from .models import Topic, Flashcard
-
-# ============================================
-# LOGGING FOR DATA TRANSFORMATION TRACKING
-# ============================================
-# Logger for tracking how data changes format as it moves through the system
-#
-# WHY LOG IN SERIALIZERS:
-# Serializers are the "translators" that convert data between formats.
-# Logging here helps you see:
-# - What the Python object looks like before conversion
-# - What the JSON looks like after conversion
-# - Any data transformations or calculations that happen
-#
-# REAL-WORLD EXAMPLE:
-# When you call an API endpoint, you want to verify the exact JSON
-# being sent to the frontend. Logging in serializers shows you this!
-#
-# FUTURE USE: In production, you might log to track:
-# - What data users are accessing
-# - How often certain fields are null
-# - Performance issues with large datasets
-logger = logging.getLogger('api')
+from .models import Topic, Flashcard, GenerationBatch, GenerationJob
+from .utils.scheduling import MIN_QUALITY, MAX_QUALITY
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -77,35 +55,112 @@ class FlashcardSerializer(serializers.ModelSerializer):
         extra_kwargs = {"user": {"read_only": True}}  # User set from JWT token
 
 
+class FlashcardSearchResultSerializer(FlashcardSerializer):
+    """
+    A flashcard found by GET /api/flashcards/search/
+
+    snippet: the matching part of the card (HTML-escaped, matches in <mark>)
+    score:   BM25 relevance, higher is better (only comparable within one search)
+    """
+    snippet = serializers.CharField(read_only=True)
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(FlashcardSerializer.Meta):
+        fields = FlashcardSerializer.Meta.fields + ["snippet", "score"]
+
+
+class ScheduledFlashcardSerializer(FlashcardSerializer):
+    """
+    A flashcard with its spaced repetition state (SM-2)
+
+    USAGE:
+    - GET /api/flashcards/due/ (the cards to review now)
+    - POST /api/flashcards/<id>/review/ responds with this
+    """
+    class Meta(FlashcardSerializer.Meta):
+        fields = FlashcardSerializer.Meta.fields + [
+            "ease_factor", "interval_days", "repetitions", "due_at", "last_reviewed_at",
+        ]
+        read_only_fields = fields
+
+
+class ReviewSerializer(serializers.Serializer):
+    """
+    Validates a review (POST /api/flashcards/<id>/review/)
+
+    quality: how well the student remembered the answer, 0 (blackout)
+             to 5 (perfect) - see utils/scheduling.py
+    """
+    quality = serializers.IntegerField(min_value=MIN_QUALITY, max_value=MAX_QUALITY)
+
+
 class TopicSerializer(serializers.ModelSerializer):
     """
     Converts Topic model ↔ JSON
 
     🔵 REQUEST JOURNEY - STEP 5: This converts the response to JSON
+
+    flashcard_count and last_card_at come from annotations on the queryset
+    (see TopicListCreate.get_queryset) - they're null for a topic that
+    wasn't loaded through an annotated query.
     """
+    flashcard_count = serializers.IntegerField(read_only=True, default=None)
+    last_card_at = serializers.DateTimeField(read_only=True, default=None)
+
     class Meta:
         model = Topic
-        fields = ["id", "name", "created_at", "user"]
+        fields = ["id", "name", "created_at", "user", "flashcard_count", "last_card_at"]
         extra_kwargs = {"user": {"read_only": True}}  # User set from JWT token
 
-    def to_representation(self, instance):
-        """
-        Convert Python object → JSON for response
-        Called when sending data back to frontend
-
-        LOGGING NOTE: This method is automatically called by Django REST Framework
-        whenever a Topic needs to be converted to JSON for an API response.
-        By logging here, you can see:
-        - The exact JSON structure being sent to the frontend
-        - The ID of the object being converted
-        - Any custom transformations you might add in the future
-
-        FUTURE USE: You might extend this method to:
-        - Add computed fields (e.g., flashcard count)
-        - Format dates differently
-        - Hide sensitive information
-        """
-        data = super().to_representation(instance)
-        logger.info(f"SERIALIZATION: Converting Topic(id={instance.id}) → JSON")
-        logger.info(f"JSON OUTPUT: {data}")
-        return data
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    """
+    Converts GenerationJob model → JSON
+
+    USAGE:
+    - POST /api/topics/ responds with this (202 Accepted)
+    - POST /api/topics/import/ responds with this for large files (202)
+    - GET /api/jobs/<id>/ lets the frontend poll until status is done/failed
+
+    result is only set for finished imports (what import_deck returned)
+    """
+    class Meta:
+        model = GenerationJob
+        fields = [
+            "id", "kind", "topic_name", "topic", "source_name", "status", "flashcard_count",
+            "error", "result", "created_at", "started_at", "finished_at",
+        ]
+        read_only_fields = fields
+
+
+class GenerationBatchSerializer(serializers.ModelSerializer):
+    """
+    Converts GenerationBatch model → JSON, with one entry per file
+
+    USAGE:
+    - POST /api/topics/batch/ responds with this (202 Accepted)
+    - GET /api/batches/<id>/ lets the frontend poll the whole batch
+
+    status is "running" while any file is still queued or running, then
+    "failed" if every file failed, otherwise "done" (check each job for
+    partial failures).
+    """
+    jobs = GenerationJobSerializer(many=True, read_only=True)
+    status = serializers.SerializerMethodField()
+    flashcard_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = GenerationBatch
+        fields = ["id", "status", "flashcard_count", "jobs", "created_at"]
+        read_only_fields = fields
+
+    def get_status(self, batch):
+        statuses = {job.status for job in batch.jobs.all()}
+        if statuses & {GenerationJob.STATUS_QUEUED, GenerationJob.STATUS_RUNNING}:
+            return "running"
+        if statuses == {GenerationJob.STATUS_FAILED}:
+            return GenerationJob.STATUS_FAILED
+        return GenerationJob.STATUS_DONE
+
+    def get_flashcard_count(self, batch):
+        return sum(job.flashcard_count for job in batch.jobs.all())
@@ -1,3 +1,1088 @@
-from django.test import TestCase
+"""
+API TESTS
 
-# Create your tests here.
+Run with: python manage.py test   (or: make test)
+
+OFFLINE PIPELINE TESTS:
+Run the whole upload → worker → deck path against the fake LLM provider
+(settings.LLM_PROVIDER = "fake"), so no API key or network is needed.
+The async views get the same treatment, with generation on the event loop.
+The job queue is checked too: oldest job first, claimed once, and put
+back in the queue (then failed) when the worker holding it is lost. A
+job's event stream sends its own cards only, and the sync stream lets go
+of its thread after JOB_EVENTS_MAX_SECONDS. The ingestion benchmark runs
+once on a small document, so its stages (and query counts) stay real.
+
+QUERY PLAN REGRESSION SUITE:
+The list endpoints run a handful of "hot" queries on every page load. Each
+one is backed by a composite index in models.py. These tests ask SQLite how
+it would run each query (EXPLAIN QUERY PLAN) and fail if any of them would
+read a whole table (SCAN) or sort rows in a temporary B-tree instead of
+reading them in index order - i.e. if an index is dropped or a query
+changes shape so it no longer matches one.
+
+LLM CACHE TESTS:
+Hits, misses, TTL expiry, LRU eviction, and a new prompt version (or
+model) never being served the old answers.
+
+TEXT CACHE TESTS:
+Extracted text is keyed by the extraction budget too, so raising
+EXTRACT_MAX_TOKENS doesn't serve texts cut short under the old one.
+
+CHUNKING TESTS:
+Long documents are cut at page breaks, then paragraphs, then sentences,
+without losing or repeating text; the chunks' cards are merged in order.
+
+PREPROCESSING TESTS:
+Check that what we strip before prompting is boilerplate, not content.
+
+DECK CACHE TESTS:
+A matching If-None-Match gets a 304, and creating, deleting or reviewing
+a card changes the deck's ETag.
+
+PAGINATION TESTS:
+Following keyset cursors through every page (rows with equal timestamps
+included), and what happens to invalid or hand-made cursors.
+
+JSON STREAM TESTS:
+The streamed-array parser against what LLMs actually send: fences, prose
+(with brackets of its own), repairs, truncation - cut at every position.
+
+RATE LIMIT TESTS:
+Token bucket waits and timeouts, and the circuit breaker's states -
+including a half-open trial that never gets an answer.
+
+CONCEPTS: Testing, Query Plans, Database Indexes
+RELATED: models.py (Meta.indexes), views.py, pagination.py, llm_providers.py,
+         utils/preprocessing.py
+"""
+
+import asyncio
+import base64
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import Q
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import async_views, geminiapi, rate_limit, views
+from .benchmarks import benchmark_document
+from .dedupe import candidates_query
+from .geminiapi import extract_text, save_flashcards, text_2flashcards
+from .events import ajob_event_stream
+from .jobs import (
+    claim_next_job, enqueue_generation_job, enqueue_import_job, run_job, run_worker,
+    wait_for_generation_jobs,
+)
+from .llm_cache import get_cached_flashcards, make_cache_key, store_flashcards
+from .llm_providers import FakeProvider
+from .models import ExtractedTextCache, Topic, Flashcard, FlashcardBand, GenerationJob, LLMResponseCache
+from .text_cache import get_cached_text, store_text
+from .geminiapi import merge_flashcards
+from .instrumentation import trace
+from .utils.chunking import CHARS_PER_TOKEN, estimate_tokens, split_into_chunks
+from .utils.json_stream import JSONArrayStreamParser
+from .utils.preprocessing import preprocess_text
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN is SQLite-specific")
+class HotQueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="student", password="pw")
+        cls.topic = Topic.objects.create(user=cls.user, name="Biology")
+        Flashcard.objects.bulk_create(
+            Flashcard(user=cls.user, topic=cls.topic, question=f"Q{i}", answer=f"A{i}")
+            for i in range(5)
+        )
+
+    def assertIndexedPlan(self, sql, params=()):
+        """Fail if the plan scans an api_ table or sorts with a temp B-tree."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = [row[-1] for row in cursor.fetchall()]
+
+        for step in plan:
+            self.assertFalse(
+                step.startswith("SCAN api_"),
+                f"Full table scan in query plan:\n{sql}\n" + "\n".join(plan),
+            )
+            self.assertNotIn(
+                "USE TEMP B-TREE", step,
+                f"Query sorts without an index:\n{sql}\n" + "\n".join(plan),
+            )
+
+    def assertQuerysetIndexed(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        self.assertIndexedPlan(sql, params)
+
+    def test_topic_list(self):
+        # TopicListCreate: first page, newest first
+        self.assertQuerysetIndexed(
+            Topic.objects.filter(user=self.user).order_by("-created_at", "-id")[:51]
+        )
+
+    def test_topic_list_next_page(self):
+        now = timezone.now()
+        self.assertQuerysetIndexed(
+            Topic.objects.filter(user=self.user)
+            .filter(Q(created_at__lt=now) | Q(created_at=now, pk__lt=10))
+            .order_by("-created_at", "-id")[:51]
+        )
+
+    def test_deck(self):
+        # FlashcardListByTopic: first page, creation order
+        self.assertQuerysetIndexed(
+            Flashcard.objects.filter(topic=self.topic).order_by("created_at", "id")[:51]
+        )
+
+    def test_deck_next_page(self):
+        now = timezone.now()
+        self.assertQuerysetIndexed(
+            Flashcard.objects.filter(topic=self.topic)
+            .filter(Q(created_at__gt=now) | Q(created_at=now, pk__gt=10))
+            .order_by("created_at", "id")[:51]
+        )
+
+    def test_flashcards_by_topic_name(self):
+        # FlashcardListCreate
+        self.assertQuerysetIndexed(
+            Flashcard.objects.filter(user=self.user, topic__name="Biology")
+        )
+
+    def test_near_duplicate_lookup(self):
+        # dedupe.py: candidates for a new card, from the topic's band index
+        self.assertIndexedPlan(*candidates_query(self.topic.id, [1, 2, 3]))
+
+    def test_due_cards(self):
+        # DueFlashcardList: the user's review queue, most overdue first
+        self.assertQuerysetIndexed(
+            Flashcard.objects.filter(user=self.user, due_at__lte=timezone.now())
+            .order_by("due_at", "id")[:20]
+        )
+
+    def test_list_endpoints_only_run_indexed_queries(self):
+        # Check the SQL the views actually send, not just our copies of it
+        client = APIClient()
+        client.force_authenticate(self.user)
+        urls = ["/api/topics/", f"/api/flashcards/{self.topic.id}/"]
+
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+            for query in queries.captured_queries:
+                if query["sql"].startswith("SELECT") and "api_" in query["sql"]:
+                    with self.subTest(url=url, sql=query["sql"]):
+                        self.assertIndexedPlan(query["sql"])
+
+
+@override_settings(LLM_PROVIDER="fake", FAKE_LLM_LATENCY=0, FAKE_LLM_CARDS=3,
+                   LLM_CACHE_ENABLED=False, TEXT_CACHE_ENABLED=False)
+class OfflinePipelineTests(TestCase):
+    """Upload → worker → deck, with the fake LLM provider (no API key or network)."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+        self.user = User.objects.create_user(username="student", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name="Biology"):
+        notes = SimpleUploadedFile("notes.txt", b"Cells are the unit of life.", content_type="text/plain")
+        response = self.client.post("/api/topics/", {"name": name, "file": notes}, format="multipart")
+        self.assertEqual(response.status_code, 202)
+        run_worker(once=True)
+        return GenerationJob.objects.get(id=response.data["id"])
+
+    def assertDeckSize(self, job, size):
+        response = self.client.get(f"/api/flashcards/{job.topic_id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), size)
+
+    def assertJobStages(self, logs, stages):
+        """The job's trace timed each of these stages."""
+        [job_trace] = [record.args[0] for record in logs.records
+                       if getattr(record.args[0], "name", None) == "generation_job"]
+        self.assertLessEqual(set(stages), set(job_trace.stages))
+
+    def test_streaming_upload(self):
+        with override_settings(LLM_STREAMING=True, INSTRUMENTATION_SAMPLE_RATE=1.0), \
+                self.assertLogs("api.timing", "INFO") as logs:
+            job = self.upload()
+        self.assertEqual(job.status, GenerationJob.STATUS_DONE)
+        self.assertEqual(job.flashcard_count, 3)
+        self.assertDeckSize(job, 3)
+        self.assertJobStages(logs, ["extract", "llm", "persist"])
+
+    def test_batch_upload(self):
+        with override_settings(LLM_STREAMING=False, INSTRUMENTATION_SAMPLE_RATE=1.0), \
+                self.assertLogs("api.timing", "INFO") as logs:
+            job = self.upload()
+        self.assertEqual(job.status, GenerationJob.STATUS_DONE)
+        self.assertDeckSize(job, 3)
+        self.assertJobStages(logs, ["extract", "llm", "persist"])
+
+    def test_multi_file_upload(self):
+        files = [
+            SimpleUploadedFile(f"week{n}.txt", f"Week {n}: cells are the unit of life.".encode(),
+                               content_type="text/plain")
+            for n in (1, 2)
+        ] + [SimpleUploadedFile("photo.png", b"\x89PNG", content_type="image/png")]
+        response = self.client.post(
+            "/api/topics/batch/", {"files": files, "name": "Biology"}, format="multipart"
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual([r["file"] for r in response.data["rejected"]], ["photo.png"])
+        run_worker(once=True)
+
+        batch = self.client.get(f"/api/batches/{response.data['id']}/").data
+        self.assertEqual(batch["status"], GenerationJob.STATUS_DONE)
+        self.assertEqual([job["source_name"] for job in batch["jobs"]], ["week1.txt", "week2.txt"])
+        # Both files' cards went into the one shared topic
+        self.assertEqual({job["topic"] for job in batch["jobs"]}, {Topic.objects.get(user=self.user).id})
+        self.assertEqual(batch["flashcard_count"], 6)
+
+    def test_near_duplicate_cards_are_skipped_or_merged(self):
+        topic = Topic.objects.create(user=self.user, name="Biology")
+        first = {"question": "What is the function of mitochondria?",
+                 "answer": "Mitochondria produce ATP through cellular respiration, supplying the cell with energy."}
+        reworded = {"question": "What is the main function of the mitochondria?",
+                    "answer": "Mitochondria produce ATP through cellular respiration, supplying the cell with the energy it needs."}
+        other = {"question": "What is the capital of France?", "answer": "Paris is the capital of France."}
+        self.assertEqual(len(save_flashcards([first, other], topic, self.user)), 2)
+
+        self.assertEqual(save_flashcards([reworded], topic, self.user), [])
+        with override_settings(FLASHCARD_DEDUPE="merge"):
+            self.assertEqual(save_flashcards([reworded], topic, self.user), [])
+        self.assertEqual(
+            list(topic.flashcards.order_by("id").values_list("answer", flat=True)),
+            [reworded["answer"], other["answer"]],
+        )
+
+    def test_search(self):
+        topic = Topic.objects.create(user=self.user, name="Biology")
+        cards = save_flashcards([
+            {"question": "What do mitochondria produce?", "answer": "ATP, the <cell>'s energy currency."},
+            {"question": "What is osmosis?", "answer": "Diffusion of water; mitochondria are not involved."},
+        ], topic, self.user)
+        stranger = User.objects.create_user(username="stranger", password="pw")
+        save_flashcards([{"question": "Where are mitochondria?", "answer": "In the cytoplasm."}],
+                        Topic.objects.create(user=stranger, name="Cells"), stranger)
+
+        def search(query):
+            response = self.client.get("/api/flashcards/search/", {"q": query})
+            self.assertEqual(response.status_code, 200)
+            return response.data["results"]
+
+        # Prefix match on the last word, question matches first, own cards only
+        results = search("mitochond")
+        self.assertEqual([r["id"] for r in results], [cards[0].id, cards[1].id])
+        self.assertIn("<mark>mitochondria</mark>", results[0]["snippet"])
+        self.assertIn("&lt;cell&gt;", search("energy")[0]["snippet"])
+        self.assertEqual(search('osmosis" OR "energy'), [])
+
+        # The index follows updates and deletes
+        Flashcard.objects.filter(id=cards[1].id).update(question="What is active transport?")
+        self.assertEqual([r["id"] for r in search("osmosis")], [])
+        cards[0].delete()
+        self.assertEqual([r["id"] for r in search("mitochondria")], [cards[1].id])
+
+    def test_review_schedules_next_due(self):
+        topic = Topic.objects.create(user=self.user, name="Biology")
+        first, second = save_flashcards([
+            {"question": "What is DNA?", "answer": "The molecule that carries genetic information."},
+            {"question": "What is RNA?", "answer": "A copy of a gene used to build proteins."},
+        ], topic, self.user)
+
+        due = self.client.get("/api/flashcards/due/").data["results"]
+        self.assertEqual([card["id"] for card in due], [first.id, second.id])
+
+        # Remembered: due tomorrow, then in 6 days, and gone from the queue
+        for quality, interval in [(4, 1), (5, 6)]:
+            response = self.client.post(f"/api/flashcards/{first.id}/review/", {"quality": quality})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["interval_days"], interval)
+        self.assertEqual(response.data["ease_factor"], 2.6)
+        due = self.client.get("/api/flashcards/due/").data["results"]
+        self.assertEqual([card["id"] for card in due], [second.id])
+
+        # Forgotten: start over
+        response = self.client.post(f"/api/flashcards/{first.id}/review/", {"quality": 1})
+        self.assertEqual((response.data["interval_days"], response.data["repetitions"]), (1, 0))
+        self.assertEqual(self.client.post(f"/api/flashcards/{first.id}/review/", {"quality": 6}).status_code, 400)
+
+    def test_import_and_export(self):
+        rows = 'question,answer\n"What is DNA?","A molecule,\nwith two strands"\nWhat is RNA?,\n'
+        notes = SimpleUploadedFile("genetics.csv", rows.encode("utf-8-sig"), content_type="text/csv")
+        response = self.client.post("/api/topics/import/", {"file": notes}, format="multipart")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data["imported"], response.data["invalid"]), (1, 1))
+        self.assertEqual(response.data["errors"][0]["line"], 4)
+        topic_id = response.data["topic"]["id"]
+        self.assertEqual(response.data["topic"]["name"], "genetics")
+
+        lines = [json.dumps({"question": "What is RNA?", "answer": "A copy of a gene."}),
+                 json.dumps({"question": "What is DNA?", "answer": "A molecule, with two strands"})]
+        notes = SimpleUploadedFile("more.jsonl", "\n".join(lines).encode(), content_type="text/plain")
+        response = self.client.post(
+            "/api/topics/import/", {"file": notes, "topic": topic_id}, format="multipart"
+        )
+        self.assertEqual((response.data["imported"], response.data["duplicates"]), (1, 1))
+
+        def export(topic_id, file_format):
+            response = self.client.get(f"/api/topics/{topic_id}/export/", {"type": file_format})
+            self.assertEqual(response.status_code, 200)
+            return b"".join(response.streaming_content).decode()
+
+        exported = export(topic_id, "anki")
+        self.assertEqual(exported.splitlines()[:3], ["#separator:tab", "#html:false", "#columns:Front\tBack"])
+        self.assertIn('What is DNA?\t"A molecule,\nwith two strands"\n', exported)
+
+        # An export imports back as the same deck
+        notes = SimpleUploadedFile("genetics.txt", exported.encode(), content_type="text/plain")
+        response = self.client.post("/api/topics/import/", {"file": notes}, format="multipart")
+        self.assertEqual(response.data["imported"], 2)
+        self.assertEqual(export(response.data["topic"]["id"], "csv"), export(topic_id, "csv"))
+
+    def export(self, topic_id, file_format):
+        response = self.client.get(f"/api/topics/{topic_id}/export/", {"type": file_format})
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_every_format_round_trips(self):
+        topic = Topic.objects.create(user=self.user, name="Tricky")
+        cards = [
+            {"question": 'What does "mitosis" produce?', "answer": "Two cells,\nidentical to the parent"},
+            {"question": "Tab\tand comma, in one", "answer": 'A "quoted", multi-line\r\nanswer'},
+            {"question": "Plain question?", "answer": "Émigré naïve café"},
+        ]
+        save_flashcards(cards, topic, self.user)
+        expected = list(topic.flashcards.order_by("id").values_list("question", "answer"))
+
+        for file_format, extension in [("csv", "csv"), ("jsonl", "jsonl"), ("anki", "txt")]:
+            with self.subTest(file_format=file_format):
+                exported = self.export(topic.id, file_format)
+                notes = SimpleUploadedFile(f"deck.{extension}", exported, content_type="text/plain")
+                response = self.client.post("/api/topics/import/", {"file": notes}, format="multipart")
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual((response.data["imported"], response.data["invalid"]), (3, 0))
+                imported = Topic.objects.get(id=response.data["topic"]["id"])
+                self.assertEqual(
+                    list(imported.flashcards.order_by("id").values_list("question", "answer")), expected
+                )
+                self.assertEqual(self.export(imported.id, file_format), exported)
+
+        # Spreadsheet programs save CSV with a byte order mark: the header
+        # must still be recognised, and not end up in the first question
+        bom_csv = "\ufeffQuestion,Answer\r\nWhat is ATP?,The cell's energy currency\r\n".encode("utf-8")
+        notes = SimpleUploadedFile("excel.csv", bom_csv, content_type="text/csv")
+        response = self.client.post("/api/topics/import/", {"file": notes}, format="multipart")
+        self.assertEqual((response.data["imported"], response.data["invalid"]), (1, 0))
+        card = Flashcard.objects.get(topic_id=response.data["topic"]["id"])
+        self.assertEqual(card.question, "What is ATP?")
+
+    def test_large_import_runs_in_a_worker(self):
+        rows = "".join(f"Question {n}?,Answer {n} is a number.\n" for n in range(30))
+        with override_settings(IMPORT_QUEUE_MIN_SIZE=len(rows)):
+            notes = SimpleUploadedFile("numbers.csv", rows.encode(), content_type="text/csv")
+            response = self.client.post("/api/topics/import/", {"file": notes}, format="multipart")
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual((response.data["kind"], response.data["status"]), ("import", "queued"))
+            self.assertFalse(Topic.objects.filter(user=self.user).exists())
+
+            empty = SimpleUploadedFile("empty.csv", b"question,answer\n" + b" " * len(rows))
+            failing = self.client.post("/api/topics/import/", {"file": empty}, format="multipart")
+            self.assertEqual(failing.status_code, 202)
+        run_worker(once=True)
+
+        job = self.client.get(f"/api/jobs/{response.data['id']}/").data
+        self.assertEqual(job["status"], GenerationJob.STATUS_DONE)
+        self.assertEqual(job["result"], {"imported": 30, "duplicates": 0, "invalid": 0, "errors": []})
+        self.assertEqual(Topic.objects.get(id=job["topic"]).name, "numbers")
+        self.assertEqual(Flashcard.objects.filter(topic_id=job["topic"]).count(), 30)
+
+        # A file without cards fails, without leaving a topic behind
+        job = self.client.get(f"/api/jobs/{failing.data['id']}/").data
+        self.assertEqual(job["status"], GenerationJob.STATUS_FAILED)
+        self.assertEqual(job["error"], "No flashcards found in the file")
+        self.assertEqual(Topic.objects.filter(user=self.user).count(), 1)
+
+    def read_events(self, stream):
+        """(event, data) for each event of a Server-Sent Events stream."""
+        events = []
+        for block in stream.split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+            if fields:
+                events.append((fields["event"], json.loads(fields["data"])))
+        return events
+
+    def test_event_stream_sends_only_the_jobs_cards(self):
+        topic = Topic.objects.create(user=self.user, name="Numbers")
+        save_flashcards([{"question": "What is zero?", "answer": "Nothing at all."}], topic, self.user)
+        rows = "".join(f"Question {n}?,Answer {n} is a number.\n" for n in range(3))
+        job = enqueue_import_job(SimpleUploadedFile("more.csv", rows.encode()), "csv", self.user, topic=topic)
+        # Another job adding to the same topic at the same time
+        enqueue_import_job(
+            SimpleUploadedFile("other.csv", b"What is a set?,A collection of things.\n"), "csv", self.user, topic=topic
+        )
+        run_worker(once=True)
+        imported = list(
+            Flashcard.objects.filter(question__startswith="Question").order_by("id").values_list("id", flat=True)
+        )
+
+        response = self.client.get(f"/api/jobs/{job.id}/events/")
+        events = self.read_events(b"".join(response.streaming_content).decode())
+        self.assertEqual([data["id"] for event, data in events if event == "card"], imported)
+        self.assertEqual(events[-1], ("job", self.client.get(f"/api/jobs/{job.id}/").data))
+        self.assertEqual(events[-1][1]["status"], GenerationJob.STATUS_DONE)
+
+        async def read_async_stream():
+            return "".join([event async for event in ajob_event_stream(job)])
+        self.assertEqual(self.read_events(async_to_sync(read_async_stream)()), events)
+
+    def test_sync_event_stream_lets_go_of_its_thread(self):
+        job = self.enqueue("Biology")
+        with override_settings(JOB_EVENTS_MAX_SECONDS=0.05, JOB_EVENTS_POLL_INTERVAL=0.01):
+            response = self.client.get(f"/api/jobs/{job.id}/events/")
+            events = self.read_events(b"".join(response.streaming_content).decode())
+        # Ends while the job is still queued: the frontend polls from here
+        self.assertEqual([(event, data["status"]) for event, data in events], [("job", "queued")])
+
+    def test_benchmark_counts_every_stages_queries(self):
+        result = benchmark_document("txt", 4096, self.user)
+        stages = result["stages"]
+        self.assertEqual(list(stages), ["upload", "extract", "preprocess", "chunk", "parse", "end_to_end"])
+        # The upload's request resets connection.queries_log, but still counts
+        self.assertGreater(stages["upload"]["queries"], 0)
+        self.assertGreater(stages["end_to_end"]["queries"], 0)
+        self.assertEqual(stages["extract"]["queries"], 0)
+
+    def test_chunks_are_generated_and_merged_within_the_trace(self):
+        text = "\n\n".join(f"Chapter {n}. " + "Cells are the unit of life. " * 10 for n in range(4))
+        chunk_count = len(split_into_chunks(text, 100))
+        self.assertGreater(chunk_count, 1)
+        for streaming in (False, True):
+            with self.subTest(streaming=streaming), \
+                    override_settings(LLM_CHUNK_TOKENS=100, INSTRUMENTATION_SAMPLE_RATE=1.0,
+                                      LLM_RATE_LIMIT_PER_MINUTE=0, LLM_USER_RATE_LIMIT_PER_MINUTE=0), \
+                    self.assertLogs("api.timing", "INFO"), trace("test") as job_trace:
+                if streaming:
+                    flashcards = list(geminiapi.document_2flashcards_stream(text))
+                else:
+                    flashcards = geminiapi.document_2flashcards(text)
+                self.assertEqual(len(flashcards), 3 * chunk_count)
+                # Counted in the chunks' threads, recorded in our trace
+                parsed = job_trace.counts.get("llm_parse.strict", 0) + job_trace.counts.get("llm_parse.clean", 0)
+                self.assertEqual(parsed, chunk_count)
+
+    def enqueue(self, name):
+        notes = SimpleUploadedFile(f"{name}.txt", b"Cells are the unit of life.", content_type="text/plain")
+        return enqueue_generation_job(notes, name, self.user)
+
+    def test_jobs_are_claimed_oldest_first_and_once(self):
+        first, second = self.enqueue("Biology"), self.enqueue("Chemistry")
+        self.assertEqual(first.status, GenerationJob.STATUS_QUEUED)
+
+        claimed = claim_next_job()
+        self.assertEqual((claimed.id, claimed.status, claimed.attempts), (first.id, GenerationJob.STATUS_RUNNING, 1))
+        self.assertIsNotNone(claimed.heartbeat_at)
+        self.assertEqual(claim_next_job().id, second.id)
+        self.assertIsNone(claim_next_job())
+
+        run_job(claimed)
+        claimed.refresh_from_db()
+        self.assertEqual((claimed.status, claimed.flashcard_count), (GenerationJob.STATUS_DONE, 3))
+        self.assertFalse(claimed.upload)
+
+    def test_job_of_a_lost_worker_is_retried_then_failed(self):
+        job = self.enqueue("Biology")
+        lease_expired = timezone.now() - timedelta(seconds=settings.JOB_LEASE_SECONDS + 1)
+        with override_settings(JOB_MAX_ATTEMPTS=2):
+            claim_next_job()  # ... and the worker dies
+            GenerationJob.objects.filter(id=job.id).update(heartbeat_at=lease_expired)
+            retried = claim_next_job()
+            self.assertEqual((retried.id, retried.attempts), (job.id, 2))
+
+            GenerationJob.objects.filter(id=job.id).update(heartbeat_at=lease_expired)
+            self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.STATUS_FAILED)
+        self.assertIn("stopped responding", job.error)
+        self.assertFalse(job.upload)
+
+    def test_worker_that_lost_its_lease_leaves_the_job_alone(self):
+        job = self.enqueue("Biology")
+        slow = claim_next_job()
+        # The slow worker's lease runs out, and another worker claims the job
+        GenerationJob.objects.filter(id=job.id).update(
+            heartbeat_at=timezone.now() - timedelta(seconds=settings.JOB_LEASE_SECONDS + 1)
+        )
+        current = claim_next_job()
+        self.assertEqual((current.id, current.attempts), (job.id, 2))
+        self.assertNotEqual(current.lease_token, slow.lease_token)
+
+        with self.assertLogs("api", "WARNING") as logs:
+            run_job(slow)
+        self.assertIn("lease lost", logs.output[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.lease_token), (GenerationJob.STATUS_RUNNING, 2, current.lease_token))
+        self.assertTrue(job.upload.storage.exists(job.upload.name))  # Still needed
+
+        run_job(current)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.lease_token), (GenerationJob.STATUS_DONE, None))
+        self.assertFalse(job.upload)
+
+    def test_topic_is_deleted_without_loading_its_cards(self):
+        topic = Topic.objects.create(user=self.user, name="Numbers")
+        cards = [{"question": f"What is {n} squared?", "answer": f"{n * n}."} for n in range(50)]
+        first, *_ = save_flashcards(cards, topic, self.user)
+
+        # A single card takes its near-duplicate index rows with it
+        request = APIRequestFactory().delete(f"/api/flashcards/{first.id}/")
+        force_authenticate(request, self.user)
+        self.assertEqual(views.FlashcardDelete.as_view()(request, pk=first.id).status_code, 204)
+        self.assertFalse(FlashcardBand.objects.filter(flashcard_id=first.id).exists())
+        self.assertTrue(FlashcardBand.objects.filter(topic=topic).exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            topic.delete()
+        # One DELETE per table, however big the deck: no card is read first
+        self.assertFalse([q["sql"] for q in queries if q["sql"].startswith('SELECT "api_flashcard"')])
+        self.assertFalse(Flashcard.objects.filter(topic_id=first.topic_id).exists())
+        self.assertFalse(FlashcardBand.objects.exists())
+
+    def test_provider_outage_fails_job_without_leaving_a_topic(self):
+        with override_settings(FAKE_LLM_FAILURE_RATE=1.0, LLM_MAX_RETRIES=0):
+            job = self.upload()
+        self.assertEqual(job.status, GenerationJob.STATUS_FAILED)
+        self.assertIsNone(job.topic_id)
+        self.assertFalse(Topic.objects.filter(user=self.user).exists())
+
+
+@override_settings(LLM_PROVIDER="fake", FAKE_LLM_LATENCY=0, FAKE_LLM_CARDS=3,
+                   LLM_CACHE_ENABLED=False, TEXT_CACHE_ENABLED=False)
+class AsyncViewTests(TestCase):
+    """Upload → in-process generation → deck through the async views."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+        self.user = User.objects.create_user(username="student", password="pw")
+        self.factory = AsyncRequestFactory()
+        self.auth = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    async def upload(self):
+        notes = SimpleUploadedFile("notes.txt", b"Cells are the unit of life.", content_type="text/plain")
+        request = self.factory.post("/api/topics/", {"name": "Biology", "file": notes}, headers=self.auth)
+        response = await async_views.TopicListCreate.as_view()(request)
+        self.assertEqual(response.status_code, 202)
+        await wait_for_generation_jobs()
+        return await GenerationJob.objects.aget(id=json.loads(response.content)["id"])
+
+    async def test_upload_is_generated_in_process(self):
+        for streaming in (True, False):
+            with self.subTest(streaming=streaming), override_settings(LLM_STREAMING=streaming):
+                job = await self.upload()
+                self.assertEqual(job.status, GenerationJob.STATUS_DONE)
+                self.assertEqual(job.flashcard_count, 3)
+                # Claimed (and leased) like a worker claims a job
+                self.assertEqual(job.attempts, 1)
+                self.assertIsNotNone(job.heartbeat_at)
+
+                deck = async_views.FlashcardListByTopic.as_view()
+                response = await deck(self.factory.get("/", headers=self.auth), topic_id=job.topic_id)
+                self.assertEqual(len(json.loads(response.content)["results"]), 3)
+                response = await deck(
+                    self.factory.get("/", headers={**self.auth, "If-None-Match": response["ETag"]}),
+                    topic_id=job.topic_id,
+                )
+                self.assertEqual(response.status_code, 304)
+
+                events = async_views.GenerationJobEvents.as_view()
+                response = await events(self.factory.get("/", headers=self.auth), pk=job.id)
+                stream = "".join([chunk.decode() async for chunk in response.streaming_content])
+                self.assertEqual(stream.count("event: card\n"), 3)
+
+    async def test_topic_list(self):
+        await self.upload()
+        response = await async_views.TopicListCreate.as_view()(self.factory.get("/api/topics/", headers=self.auth))
+        [topic] = json.loads(response.content)["results"]
+        self.assertEqual(topic["flashcard_count"], 3)
+
+    async def test_token_required(self):
+        request = self.factory.get("/api/topics/")
+        response = await async_views.TopicListCreate.as_view()(request)
+        self.assertEqual(response.status_code, 401)
+
+
+class DeckCacheTests(TestCase):
+    """ETags and cached pages of a deck, and what makes them stale."""
+
+    def setUp(self):
+        # Rolled-back tests reuse topic ids and versions: start (and leave)
+        # the cache empty so pages from another test can't be served
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="student", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.factory = APIRequestFactory()
+        self.topic = Topic.objects.create(user=self.user, name="Biology")
+        self.card, = save_flashcards(
+            [{"question": "What is DNA?", "answer": "The molecule that carries genetic information."}],
+            self.topic, self.user,
+        )
+
+    def deck(self, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(f"/api/flashcards/{self.topic.id}/", headers=headers)
+
+    def assertStale(self, etag):
+        """The old ETag no longer matches, and the page is served fresh."""
+        response = self.deck(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        return response
+
+    def test_matching_etag_gets_304(self):
+        etag = self.deck()["ETag"]
+        response = self.deck(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(self.deck('"some-other-version"').status_code, 200)
+
+    def test_create_makes_deck_stale(self):
+        etag = self.deck()["ETag"]
+        request = self.factory.post(
+            "/api/flashcards/",
+            {"id": self.topic.id, "topic": self.topic.id, "question": "What is RNA?",
+             "answer": "A copy of a gene used to build proteins."},
+            format="multipart",
+        )
+        force_authenticate(request, self.user)
+        self.assertEqual(views.FlashcardListCreate.as_view()(request).status_code, 201)
+        self.assertEqual(len(self.assertStale(etag).data["results"]), 2)
+
+    def test_delete_makes_deck_stale(self):
+        etag = self.deck()["ETag"]
+        request = self.factory.delete(f"/api/flashcards/{self.card.id}/")
+        force_authenticate(request, self.user)
+        self.assertEqual(views.FlashcardDelete.as_view()(request, pk=self.card.id).status_code, 204)
+        self.assertEqual(self.assertStale(etag).data["results"], [])
+        self.assertTrue(Topic.objects.filter(id=self.topic.id).exists())
+
+    def test_review_makes_deck_stale(self):
+        etag = self.deck()["ETag"]
+        response = self.client.post(f"/api/flashcards/{self.card.id}/review/", {"quality": 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertStale(etag)
+
+    def test_deleting_a_topic_sends_no_signal_per_card(self):
+        save_flashcards([{"question": f"Question {n}?", "answer": f"Answer number {n}."} for n in range(50)],
+                        self.topic, self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.delete(f"/api/topic/delete/{self.topic.id}")
+        # One version bump for the topic, not one per card
+        bumps = [q for q in queries.captured_queries if 'UPDATE "api_topic"' in q["sql"]]
+        self.assertEqual(len(bumps), 1)
+        self.assertFalse(Flashcard.objects.filter(topic_id=self.topic.id).exists())
+
+
+@override_settings(LLM_PROVIDER="fake", FAKE_LLM_LATENCY=0, FAKE_LLM_CARDS=3,
+                   LLM_CACHE_ENABLED=True, LLM_CACHE_MAX_ENTRIES=100)
+class LLMCacheTests(TestCase):
+    """Reusing generated flashcards: hits, misses, expiry and eviction."""
+
+    CARDS = [{"question": "What is DNA?", "answer": "Genetic material"}]
+
+    def key(self, text="Cells are the unit of life.", model="gemini", version=1):
+        return make_cache_key(text, model, version)
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(get_cached_flashcards(self.key()))
+        store_flashcards(self.key(), "gemini", self.CARDS)
+        # Whitespace doesn't matter; the model and prompt version do
+        self.assertEqual(get_cached_flashcards(self.key("Cells  are the\nunit of life. ")), self.CARDS)
+        self.assertIsNone(get_cached_flashcards(self.key(model="gemini-pro")))
+        self.assertIsNone(get_cached_flashcards(self.key(version=2)))
+        self.assertEqual(LLMResponseCache.objects.get().hit_count, 1)
+
+    def test_expired_entry_is_a_miss(self):
+        store_flashcards(self.key(), "gemini", self.CARDS)
+        LLMResponseCache.objects.update(
+            created_at=timezone.now() - timedelta(seconds=settings.LLM_CACHE_TTL_SECONDS + 1)
+        )
+        self.assertIsNone(get_cached_flashcards(self.key()))
+        self.assertFalse(LLMResponseCache.objects.exists())
+
+    def test_least_recently_used_entries_are_evicted(self):
+        with override_settings(LLM_CACHE_MAX_ENTRIES=2):
+            store_flashcards(self.key("first"), "gemini", self.CARDS)
+            store_flashcards(self.key("second"), "gemini", self.CARDS)
+            # "first" was used after "second" was stored
+            LLMResponseCache.objects.filter(key=self.key("second")).update(
+                last_used_at=timezone.now() - timedelta(minutes=1)
+            )
+            get_cached_flashcards(self.key("first"))
+            store_flashcards(self.key("third"), "gemini", self.CARDS)
+        self.assertEqual(
+            set(LLMResponseCache.objects.values_list("key", flat=True)),
+            {self.key("first"), self.key("third")},
+        )
+
+    def test_new_prompt_version_calls_the_llm_again(self):
+        text = "Mitochondria produce ATP."
+        with mock.patch.object(FakeProvider, "generate", autospec=True,
+                               side_effect=FakeProvider.generate) as generate:
+            first = text_2flashcards(text)
+            self.assertEqual(text_2flashcards(text), first)
+            self.assertEqual(generate.call_count, 1)
+
+            with mock.patch.object(geminiapi, "PROMPT_TEMPLATE_VERSION", geminiapi.PROMPT_TEMPLATE_VERSION + 1):
+                text_2flashcards(text)
+            self.assertEqual(generate.call_count, 2)
+        self.assertEqual(LLMResponseCache.objects.count(), 2)
+
+
+@override_settings(TEXT_CACHE_ENABLED=True, TEXT_CACHE_MAX_ENTRIES=100)
+class TextCacheTests(TestCase):
+    """Reusing extracted text, but only text extracted with the same budget."""
+
+    def test_budget_is_part_of_the_key(self):
+        store_text("ab" * 32, "text/plain", "Cut short", max_chars=9)
+        self.assertEqual(get_cached_text("ab" * 32, "text/plain", 9), "Cut short")
+        self.assertIsNone(get_cached_text("ab" * 32, "text/plain", 400))
+        self.assertIsNone(get_cached_text("ab" * 32, "text/plain"))
+        self.assertIsNone(get_cached_text("ab" * 32, "application/pdf", 9))
+
+    def test_raising_the_budget_extracts_again(self):
+        text = "Cells are the unit of life. " * 10
+        with tempfile.NamedTemporaryFile(suffix=".txt") as notes:
+            notes.write(text.encode())
+            notes.flush()
+            digest = "cd" * 32
+            with override_settings(EXTRACT_MAX_TOKENS=5):
+                self.assertEqual(extract_text(notes.name, "text/plain", digest), text[:20])
+            # Not the 20 characters cached under the old budget
+            with override_settings(EXTRACT_MAX_TOKENS=0):
+                self.assertEqual(extract_text(notes.name, "text/plain", digest), text)
+            with override_settings(EXTRACT_MAX_TOKENS=5):
+                with mock.patch.object(geminiapi, "extract_text_from_file") as extract:
+                    self.assertEqual(extract_text(notes.name, "text/plain", digest), text[:20])
+                extract.assert_not_called()
+        self.assertEqual(ExtractedTextCache.objects.count(), 2)
+
+
+class ChunkingTests(unittest.TestCase):
+    """Where long documents are cut, and how the chunks' cards are merged."""
+
+    def assertNothingLostOrRepeated(self, text, chunks):
+        self.assertEqual(" ".join(chunks).split(), text.split())
+
+    def test_cuts_at_page_breaks_first(self):
+        pages = [f"Page {n}. " + "Cells divide. " * 20 for n in range(1, 4)]
+        text = "\f".join(pages)
+        # Two pages don't fit one chunk, one does
+        chunks = split_into_chunks(text, max_tokens=estimate_tokens(pages[0]) + 10)
+        self.assertEqual(chunks, [page.strip() for page in pages])
+
+    def test_packs_paragraphs_greedily_without_overlap(self):
+        paragraphs = [f"Paragraph {n}: " + "ATP is energy. " * (n % 4 + 1) for n in range(30)]
+        text = "\n\n".join(paragraphs)
+        chunks = split_into_chunks(text, max_tokens=60)
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(estimate_tokens(chunk) <= 60 for chunk in chunks))
+        self.assertNothingLostOrRepeated(text, chunks)
+        # Greedy: no chunk could also have taken the next chunk's first paragraph
+        for chunk, following in zip(chunks, chunks[1:]):
+            first = following.split("\n\n")[0]
+            self.assertGreater(len(chunk) + 2 + len(first), 60 * CHARS_PER_TOKEN)
+
+    def test_oversized_single_page(self):
+        sentences = " ".join(f"Sentence number {n} is here." for n in range(200))
+        unbroken = "x" * 1000
+        text = f"Short page\f{sentences}\f{unbroken}"
+        chunks = split_into_chunks(text, max_tokens=50)
+        self.assertTrue(all(len(chunk) <= 50 * CHARS_PER_TOKEN for chunk in chunks))
+        self.assertNothingLostOrRepeated(text.replace(unbroken, ""), [c for c in chunks if "x" * 10 not in c])
+        # No sentence boundary left: hard cuts
+        self.assertEqual("".join(c for c in chunks if "x" * 10 in c), unbroken)
+        # Sentences are kept whole
+        self.assertTrue(all(chunk.endswith(".") for chunk in chunks[1:] if "x" * 10 not in chunk))
+
+    def test_blank_text(self):
+        self.assertEqual(split_into_chunks(" \n\n\f ", max_tokens=10), [])
+
+    def test_merge_keeps_the_first_of_repeated_questions_in_order(self):
+        merged = merge_flashcards([
+            [{"question": "What is DNA?", "answer": "First"}, {"question": "What is RNA?", "answer": "A"}],
+            [{"question": "what is  DNA", "answer": "Second"}, {"question": "What is ATP?", "answer": "B"}],
+            [],
+        ])
+        self.assertEqual([(card["question"], card["answer"]) for card in merged], [
+            ("What is DNA?", "First"), ("What is RNA?", "A"), ("What is ATP?", "B"),
+        ])
+
+
+class PreprocessingTests(unittest.TestCase):
+    """Extracted text → prompt text."""
+
+    def test_strips_page_boilerplate_but_keeps_content(self):
+        pages = [
+            "Intro to Biology   Lecture 3\nPhoto-\nsynthesis makes sugar in the leaves of plants.\n\n\nPage 1 of 3",
+            "Intro to Biology   Lecture 3\nPhotosynthesis makes sugar in the leaves of plants.\n\n"
+            "Mito-\nchondria make ATP.\nPage 2 of 3",
+            "Intro to Biology\tLecture 3\nH₂O is water.\nPage 3 of 3",
+        ]
+        text, stats = preprocess_text("\f".join(pages) + "\f")
+        self.assertEqual(
+            text,
+            "Photosynthesis makes sugar in the leaves of plants.\f"
+            "Mitochondria make ATP.\fH₂O is water.",
+        )
+        self.assertEqual(stats["boilerplate_lines"], 6)
+        self.assertEqual(stats["duplicate_paragraphs"], 1)
+        self.assertLess(stats["tokens_after"], stats["tokens_before"])
+
+
+class PaginationTests(TestCase):
+    """Keyset cursors: following them, tampering with them, and ties."""
+
+    def setUp(self):
+        # Deck pages are cached by cursor (see DeckCacheTests)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="student", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, page_size):
+        """Follow the next links from the first page; ids and page sizes."""
+        ids, sizes = [], []
+        response = self.client.get(url, {"page_size": page_size})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids += [row["id"] for row in response.data["results"]]
+            sizes.append(len(response.data["results"]))
+            if response.data["next"] is None:
+                return ids, sizes
+            response = self.client.get(response.data["next"])
+
+    def cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def test_cursor_round_trip_with_ties(self):
+        topic = Topic.objects.create(user=self.user, name="Biology")
+        cards = save_flashcards([{"question": f"Question {n}?", "answer": f"Answer number {n}."}
+                                 for n in range(7)], topic, self.user)
+        # Every card created at the same instant: only the id breaks ties
+        Flashcard.objects.filter(topic=topic).update(created_at=timezone.now())
+        ids, sizes = self.walk(f"/api/flashcards/{topic.id}/", page_size=3)
+        self.assertEqual(ids, [card.id for card in cards])
+        self.assertEqual(sizes, [3, 3, 1])
+
+    def test_newest_first_with_ties(self):
+        topics = [Topic.objects.create(user=self.user, name=f"Topic {n}") for n in range(5)]
+        Topic.objects.update(created_at=timezone.now())
+        ids, sizes = self.walk("/api/topics/", page_size=2)
+        self.assertEqual(ids, [topic.id for topic in reversed(topics)])
+        self.assertEqual(sizes, [2, 2, 1])
+
+    def test_invalid_cursors(self):
+        for cursor in ["not base64!", self.cursor({"a": 1}), self.cursor(["yesterday", 1]),
+                       self.cursor(["2026-01-01T00:00:00+00:00", "x"]), self.cursor([1, 2, 3]),
+                       self.cursor(None), self.cursor(["2026-13-45T00:00:00+00:00", 1])]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get("/api/topics/", {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.data["detail"], "Invalid cursor")
+
+    def test_tampered_cursor_only_moves_within_own_rows(self):
+        own = Topic.objects.create(user=self.user, name="Mine")
+        stranger = User.objects.create_user(username="stranger", password="pw")
+        Topic.objects.create(user=stranger, name="Not mine")
+        # A hand-made cursor from far in the future: everything is "after" it
+        future = self.cursor([(timezone.now() + timedelta(days=1)).isoformat(), 10 ** 9])
+        response = self.client.get("/api/topics/", {"cursor": future})
+        self.assertEqual([row["id"] for row in response.data["results"]], [own.id])
+
+
+class JSONStreamParserTests(unittest.TestCase):
+    """The streamed-array parser, fed LLM output the way it really arrives."""
+
+    CARDS = [{"question": "What is DNA?", "answer": "Genetic material"},
+             {"question": 'Say "hi"', "answer": "A \\ backslash, a tab\tand é"}]
+
+    def parse(self, pieces):
+        parser = JSONArrayStreamParser()
+        items = [item for piece in pieces for item in parser.feed(piece)]
+        parser.close()
+        return items, parser
+
+    def assertParsesInEveryChunking(self, text, expected):
+        """Same result fed whole, and cut into pieces at every position."""
+        for pieces in [[text], list(text)] + [[text[:cut], text[cut:]] for cut in range(1, len(text))]:
+            items, _ = self.parse(pieces)
+            self.assertEqual(items, expected, pieces)
+
+    def test_plain_and_fenced_arrays(self):
+        array = json.dumps(self.CARDS)
+        self.assertParsesInEveryChunking(array, self.CARDS)
+        self.assertParsesInEveryChunking(f"```json\n{array}\n```", self.CARDS)
+
+    def test_prose_before_and_after(self):
+        array = json.dumps(self.CARDS, indent=2)
+        self.assertParsesInEveryChunking(f"Here are [2] cards: {array}\nHope [these] help!", self.CARDS)
+        self.assertParsesInEveryChunking(f"Use brackets [ like this ] then:\n[\n  {array[1:]}", self.CARDS)
+
+    def test_brackets_in_prose_that_look_like_an_array(self):
+        items, parser = self.parse([f"Cards [{{see below}}] follow. {json.dumps(self.CARDS)}"])
+        self.assertEqual(items, self.CARDS)
+        self.assertEqual((parser.skipped, parser.repairs), (0, 0))
+
+    def test_repairs(self):
+        text = """[{'question': 'What\\'s ATP?', 'answer': 'Energy, "currency"',}, {"question": "Q", "answer": "A",},]"""
+        items, parser = self.parse([text])
+        self.assertEqual(items, [{"question": "What's ATP?", "answer": 'Energy, "currency"'},
+                                 {"question": "Q", "answer": "A"}])
+        self.assertEqual(parser.repairs, 7)  # 4 single-quoted strings, 3 trailing commas
+        self.assertParsesInEveryChunking(text, items)
+
+    def test_trailing_comma_after_the_last_object(self):
+        text = json.dumps(self.CARDS)[:-1] + ",\n]"
+        items, parser = self.parse([text])
+        self.assertEqual(items, self.CARDS)
+        self.assertEqual(parser.repairs, 1)
+        # Also when the comma and the "]" arrive in different pieces
+        for cut in range(len(text) - 3, len(text)):
+            with self.subTest(cut=cut):
+                items, parser = self.parse([text[:cut], text[cut:]])
+                self.assertEqual((items, parser.repairs, parser.finished), (self.CARDS, 1, True))
+
+    def test_truncated_output_keeps_the_finished_objects(self):
+        text = json.dumps(self.CARDS)
+        items, parser = self.parse([text[:text.index("}") + 3] + '{"question": "What is R'])
+        self.assertEqual(items, self.CARDS[:1])
+        self.assertTrue(parser.truncated)
+
+    def test_unparseable_objects_are_skipped(self):
+        items, parser = self.parse(['[{"question": oops}, ', json.dumps(self.CARDS[0]), "]"])
+        self.assertEqual(items, self.CARDS[:1])
+        self.assertEqual(parser.skipped, 1)
+
+    def test_no_array(self):
+        for text in ["Sorry, I can't help with that.", "Here are [2] cards."]:
+            parser = JSONArrayStreamParser()
+            self.assertEqual(parser.feed(text), [])
+            with self.assertRaises(ValueError):
+                parser.close()
+
+
+@override_settings(LLM_USER_RATE_LIMIT_PER_MINUTE=0, LLM_RATE_LIMIT_BURST=1, LLM_RATE_LIMIT_MAX_WAIT=5)
+class RateLimitTests(TestCase):
+    """Token buckets and the circuit breaker around every Gemini call."""
+
+    def setUp(self):
+        # A breaker of our own: opens after 2 failures, cools down instantly
+        self.breaker = rate_limit.CircuitBreaker(failure_threshold=2, reset_seconds=0)
+        self.enterContext(mock.patch.object(rate_limit, "breaker", self.breaker))
+
+    def outage(self):
+        raise ConnectionError("provider down")
+
+    def test_waits_for_a_token_then_times_out(self):
+        sleeps = []
+        with mock.patch.object(rate_limit.time, "sleep", side_effect=sleeps.append):
+            # 6000/minute refills a token every 10ms
+            with override_settings(LLM_RATE_LIMIT_PER_MINUTE=6000):
+                rate_limit.acquire()
+                # Empty bucket: the fake sleep doesn't let time pass, so keep
+                # asking until the real clock has refilled it
+                rate_limit.acquire()
+            self.assertTrue(sleeps)
+            self.assertTrue(all(0 < delay <= 5 for delay in sleeps))
+
+            with override_settings(LLM_RATE_LIMIT_PER_MINUTE=0.001, LLM_RATE_LIMIT_MAX_WAIT=0):
+                with self.assertRaises(rate_limit.RateLimitTimeout):
+                    rate_limit.acquire()
+
+    def test_circuit_opens_then_recovers_through_a_trial(self):
+        with override_settings(LLM_MAX_RETRIES=0):
+            for _ in range(2):
+                with self.assertRaises(ConnectionError):
+                    rate_limit.call_with_retries(self.outage)
+
+        # Open → half-open: one trial at a time
+        trial = self.breaker.before_call()
+        self.assertIsNotNone(trial)
+        with self.assertRaises(rate_limit.CircuitOpen):
+            self.breaker.before_call()
+        self.breaker.record_success()
+
+        # Closed again
+        self.assertIsNone(self.breaker.before_call())
+        self.assertEqual(rate_limit.call_with_retries(lambda: "cards"), "cards")
+
+    def test_failed_trial_reopens_the_circuit(self):
+        self.breaker.reset_seconds = 60
+        for _ in range(2):
+            self.breaker.record_failure()
+        with self.assertRaises(rate_limit.CircuitOpen):
+            rate_limit.call_with_retries(lambda: "cards")
+
+    def test_our_own_errors_leave_the_circuit_as_it_was(self):
+        def bad_request():
+            raise ValueError("400 Bad Request")
+
+        self.breaker.record_failure()
+        with self.assertRaises(ValueError):
+            rate_limit.call_with_retries(bad_request)
+        # Not a success either: the next outage still opens the circuit
+        self.breaker.record_failure()
+        trial = self.breaker.before_call()
+        self.assertIsNotNone(trial)
+
+        # A half-open trial that hits one doesn't close the circuit
+        self.breaker.release_trial(trial)
+        with self.assertRaises(ValueError):
+            rate_limit.call_with_retries(bad_request)
+        trial = self.breaker.before_call()
+        self.assertIsNotNone(trial)  # Still half-open, and the turn was handed back
+
+    def test_aborted_trial_lets_the_next_call_through(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+
+        with mock.patch.object(rate_limit, "acquire", side_effect=rate_limit.RateLimitTimeout):
+            with self.assertRaises(rate_limit.RateLimitTimeout):
+                rate_limit.call_with_retries(lambda: "cards")
+
+        async def cancelled():
+            raise asyncio.CancelledError
+        with self.assertRaises(asyncio.CancelledError):
+            async_to_sync(rate_limit.acall_with_retries)(cancelled)
+
+        self.assertEqual(rate_limit.call_with_retries(lambda: "cards"), "cards")
@@ -0,0 +1,106 @@
+"""
+EXTRACTED TEXT CACHE - The "Prep Station" in our Restaurant
+
+Pulling text out of a PDF or DOCX is the most CPU-hungry part of handling
+an upload. When dozens of students upload the same course PDF, there's no
+reason to parse it dozens of times: we remember the extracted text under
+the file's SHA-256 digest (computed while the upload streamed in, see
+upload_handlers.py) and reuse it.
+
+THE KEY: (digest, MIME type, character budget)
+Extraction stops once it has max_chars characters (EXTRACT_MAX_TOKENS),
+so the same file gives a longer text under a bigger budget. Keying on the
+budget too means raising EXTRACT_MAX_TOKENS can't serve texts that were
+cut short under the old one.
+
+STORAGE:
+- Text is zlib-compressed before it goes into the database
+- When the table exceeds TEXT_CACHE_MAX_ENTRIES, the least recently used
+  entries are deleted
+
+Like the LLM response cache, this is best-effort: database errors are
+logged and treated as a miss.
+
+CONCEPTS: Caching, Content Addressing, Compression, LRU Eviction
+RELATED: upload_handlers.py (computes digests), geminiapi.py (uses the cache),
+         llm_cache.py (the same idea for Gemini responses)
+"""
+
+import logging
+import zlib
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .models import ExtractedTextCache
+
+logger = logging.getLogger('api')
+
+
+def get_cached_text(sha256, mime_type, max_chars=None):
+    """
+    Look up previously extracted text for a file digest.
+
+    Args:
+        max_chars (int): The extraction budget (None = no limit); only text
+                         extracted with the same budget is returned
+
+    Returns:
+        str | None: The extracted text, or None on a miss
+    """
+    if not settings.TEXT_CACHE_ENABLED or not sha256:
+        return None
+
+    try:
+        entry = ExtractedTextCache.objects.filter(
+            sha256=sha256, mime_type=mime_type, max_chars=max_chars or 0
+        ).first()
+        if entry is None:
+            return None
+
+        # Touch the entry so LRU eviction keeps it around
+        ExtractedTextCache.objects.filter(pk=entry.pk).update(
+            last_used_at=timezone.now()
+        )
+    except DatabaseError as e:
+        logger.warning("TEXT CACHE: lookup failed, treating as miss: %s", e)
+        return None
+
+    logger.debug("TEXT CACHE: hit for %s", sha256[:12])
+    return zlib.decompress(entry.compressed_text).decode("utf-8")
+
+
+def store_text(sha256, mime_type, text, max_chars=None):
+    """Save text extracted with a budget under a file digest, then enforce the size limit."""
+    if not settings.TEXT_CACHE_ENABLED or not sha256:
+        return
+
+    now = timezone.now()
+    try:
+        ExtractedTextCache.objects.update_or_create(
+            sha256=sha256,
+            mime_type=mime_type,
+            max_chars=max_chars or 0,
+            defaults={
+                "compressed_text": zlib.compress(text.encode("utf-8")),
+                "text_length": len(text),
+                "last_used_at": now,
+            },
+        )
+        evict()
+    except DatabaseError as e:
+        logger.warning("TEXT CACHE: store failed, skipping: %s", e)
+
+
+def evict():
+    """Drop the least recently used entries over the limit."""
+    max_entries = settings.TEXT_CACHE_MAX_ENTRIES
+    if ExtractedTextCache.objects.count() <= max_entries:
+        return
+
+    stale_ids = list(
+        ExtractedTextCache.objects.order_by("-last_used_at")
+        .values_list("id", flat=True)[max_entries:]
+    )
+    ExtractedTextCache.objects.filter(id__in=stale_ids).delete()
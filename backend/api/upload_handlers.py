@@ -0,0 +1,73 @@
+"""
+UPLOAD HANDLERS - The "Receiving Dock Scale" in our Restaurant
+
+Django reads uploaded files in chunks as they stream in from the client and
+passes each chunk to its upload handlers. These handlers behave exactly like
+Django's built-in ones (small files in memory, large files in a temp file),
+but also feed every chunk into a SHA-256 hash on the way through.
+
+By the time the view sees the file, `uploaded_file.sha256` already holds its
+digest - no second pass over the data needed. We use it to recognise a
+document we've extracted before (see text_cache.py).
+
+ENABLED IN: settings.FILE_UPLOAD_HANDLERS
+
+CONCEPTS: Streaming, Hashing, Mixins, Django Upload Handlers
+RELATED: text_cache.py (uses the digest), geminiapi.py
+"""
+
+import hashlib
+
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+
+
+class Sha256UploadMixin:
+    """Hash the chunks this handler keeps and attach the digest to the file."""
+
+    def new_file(self, *args, **kwargs):
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        remaining = super().receive_data_chunk(raw_data, start)
+        # Returning None means this handler stored the chunk itself
+        # (otherwise it's passed on to the next handler, which hashes it)
+        if remaining is None:
+            self.sha256.update(raw_data)
+        return remaining
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        if uploaded_file is not None:
+            uploaded_file.sha256 = self.sha256.hexdigest()
+        return uploaded_file
+
+
+class Sha256MemoryFileUploadHandler(Sha256UploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class Sha256TemporaryFileUploadHandler(Sha256UploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def file_sha256(uploaded_file):
+    """
+    Return the SHA-256 hex digest of an uploaded file.
+
+    Uses the digest computed while the upload streamed in when available,
+    and only reads the file again for files that didn't come through the
+    handlers above (e.g. files created in code).
+    """
+    digest = getattr(uploaded_file, "sha256", None)
+    if digest:
+        return digest
+
+    sha256 = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        sha256.update(chunk)
+    uploaded_file.seek(0)
+    return sha256.hexdigest()
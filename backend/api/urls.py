@@ -13,19 +13,51 @@ URL STRUCTURE: /api/ + these patterns
 Example: POST /api/topics/ → calls TopicListCreate view
 """
 
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, async_views
+
+# The busiest endpoints have async versions (same URLs, same responses) for
+# running under an ASGI server - see async_views.py
+serving = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     # GET /api/topics/ - List all topics
     # POST /api/topics/ - Create new topic + upload file
-    path('topics/', views.TopicListCreate.as_view(), name="topic-list"),
+    path('topics/', serving.TopicListCreate.as_view(), name="topic-list"),
+
+    # POST /api/topics/batch/ - Upload several files at once
+    path('topics/batch/', serving.GenerationBatchCreate.as_view(), name="topic-batch"),
+
+    # POST /api/topics/import/ - Add flashcards from a CSV/JSONL/Anki file
+    path('topics/import/', views.DeckImport.as_view(), name="topic-import"),
+
+    # GET /api/topics/5/export/?type=csv - Download topic id=5's flashcards
+    path('topics/<int:pk>/export/', views.DeckExport.as_view(), name="topic-export"),
 
     # DELETE /api/topic/delete/5 - Delete topic with id=5
     # <int:pk> captures the topic ID from the URL
     path('topic/delete/<int:pk>', views.TopicDelete.as_view(), name="delete-topic"),
 
+    # GET /api/flashcards/search/?q=mitochondria - Search the user's flashcards
+    path('flashcards/search/', views.FlashcardSearch.as_view(), name="flashcard-search"),
+
+    # GET /api/flashcards/due/ - The next cards to review (spaced repetition)
+    path('flashcards/due/', views.DueFlashcardList.as_view(), name="flashcards-due"),
+
+    # POST /api/flashcards/12/review/ - Grade a review of flashcard id=12
+    path('flashcards/<int:pk>/review/', views.FlashcardReview.as_view(), name="flashcard-review"),
+
     # GET /api/flashcards/5/ - Get all flashcards for topic id=5
     # <int:topic_id> captures and passes to the view
-    path('flashcards/<int:topic_id>/', views.FlashcardListByTopic.as_view(), name="flashcards-by-topic"),
+    path('flashcards/<int:topic_id>/', serving.FlashcardListByTopic.as_view(), name="flashcards-by-topic"),
+
+    # GET /api/jobs/7/ - Check progress of flashcard generation job id=7
+    path('jobs/<int:pk>/', views.GenerationJobDetail.as_view(), name="generation-job"),
+
+    # GET /api/batches/3/ - Check progress of every file in batch upload id=3
+    path('batches/<int:pk>/', views.GenerationBatchDetail.as_view(), name="generation-batch"),
+
+    # GET /api/jobs/7/events/ - Live stream of job 7's progress and new cards
+    path('jobs/<int:pk>/events/', serving.GenerationJobEvents.as_view(), name="generation-job-events"),
 ]
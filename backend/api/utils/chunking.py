@@ -0,0 +1,96 @@
+"""
+TEXT CHUNKING UTILITIES - The "Portion Control" Toolbox
+
+Long documents don't fit in one prompt: a 200-page PDF either exceeds the
+model's context window or produces one enormous, slow response. These pure
+functions cut text into pieces that each fit a token budget, so every piece
+can be sent to the LLM separately (and at the same time).
+
+WHERE WE CUT:
+1. Page boundaries (form feed "\f", which pdf_to_text puts between pages)
+2. Paragraph boundaries (blank lines)
+3. Only if a single paragraph is too big: lines, then sentences, then
+   a hard cut as the last resort
+
+CONCEPTS: Chunking, Token Budgets, Greedy Packing, Map-Reduce
+RELATED: geminiapi.py (sends each chunk to Gemini), text_extractors.py
+"""
+
+import re
+
+# Rough average for English text with Gemini/GPT-style tokenizers.
+# Good enough for budgeting - we never need an exact count.
+CHARS_PER_TOKEN = 4
+
+# A page break or a blank line (possibly containing spaces) ends a paragraph
+_PARAGRAPH_BREAK = re.compile(r"\f|\n[ \t]*\n")
+_LINE_BREAK = re.compile(r"\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    """
+    Estimate how many tokens the LLM will count for this text.
+
+    EXAMPLE:
+        estimate_tokens("a" * 400)  # 100
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _split_oversized(paragraph, max_chars):
+    """Break one paragraph that is bigger than a whole chunk into smaller pieces."""
+    for boundary in (_LINE_BREAK, _SENTENCE_END):
+        pieces = boundary.split(paragraph)
+        if len(pieces) > 1:
+            for piece in pieces:
+                if len(piece) > max_chars:
+                    yield from _split_oversized(piece, max_chars)
+                elif piece.strip():
+                    yield piece
+            return
+
+    # No natural boundary left - cut at the budget
+    for start in range(0, len(paragraph), max_chars):
+        yield paragraph[start:start + max_chars]
+
+
+def split_into_chunks(text, max_tokens):
+    """
+    Split text into chunks of at most max_tokens (estimated) each.
+
+    Paragraphs are packed greedily, so each chunk holds as many whole
+    paragraphs as fit. The order of the text is preserved.
+
+    Args:
+        text (str): Full extracted document text
+        max_tokens (int): Token budget per chunk
+
+    Returns:
+        list[str]: Chunks in document order (empty list for blank text)
+
+    EXAMPLE:
+        split_into_chunks("Intro\\n\\nBody", max_tokens=2)  # ["Intro", "Body"]
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    current_len = 0
+
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        pieces = [paragraph] if len(paragraph) <= max_chars else _split_oversized(paragraph, max_chars)
+        for piece in pieces:
+            # +2 accounts for the "\n\n" we join paragraphs with
+            if current and current_len + len(piece) + 2 > max_chars:
+                chunks.append("\n\n".join(current))
+                current, current_len = [], 0
+            current.append(piece)
+            current_len += len(piece) + 2
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
@@ -0,0 +1,211 @@
+"""
+INCREMENTAL JSON UTILITIES - The "Pass" Where Dishes Leave One at a Time
+
+When the LLM streams its answer, the JSON array of flashcards arrives in
+small pieces:
+
+    '```json\\n[{"question": "What is'   ' DNA?", "answer": "..."},'   ' {"que...'
+
+json.loads() can only parse the whole array once the last piece is in.
+This parser is fed the pieces as they arrive and hands back each object
+of the array as soon as its closing brace shows up, so the first
+flashcard can be saved (and shown) while the rest are still generating.
+
+WHAT IT TOLERATES (in the same single pass over the text):
+- Anything before the opening "[" or after the closing "]"
+  (```json fences, a sentence of prose)
+- Brackets in that prose: the array only starts at a "[" followed by
+  "{" (or by "]" - an empty array), so "Here are [2] cards: [{...}]"
+  works, and a "[{...}]" whose objects all fail to parse is treated as
+  prose too, and the search goes on after it
+- Single-quoted strings: {'question': 'What is...?'}
+- Trailing commas: {"question": "...", "answer": "...",}
+- An object that still can't be parsed is skipped, not fatal
+- A response that stops before the closing "]" keeps the objects so far
+
+The counters (repairs, skipped, truncated) tell the caller how much
+fixing a response needed.
+
+CONCEPTS: Streaming, Incremental Parsing, State Machines, Error Recovery
+RELATED: geminiapi.py (feeds it Gemini's responses)
+"""
+
+import json
+
+
+class JSONArrayStreamParser:
+    """
+    Parse a streamed JSON array of objects, one object at a time.
+
+    EXAMPLE:
+        parser = JSONArrayStreamParser()
+        for piece in ["[{'a': 1,}, {\\"a\\"", ': 2}]']:
+            for item in parser.feed(piece):
+                print(item)        # {"a": 1}, then {"a": 2}
+        parser.close()             # raises ValueError if no array was found
+        parser.repairs             # 3 (two single quotes, one trailing comma)
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0              # next character of _buffer to look at
+        self._item_start = None    # where the object being read starts
+        self._edits = []           # (position, length, replacement) fixes for that object
+        self._last_token = None    # position of the last non-space character outside strings
+        self._last_char = None     # ...and the character itself (its position may be trimmed off)
+        self._depth = 0            # 0 = outside the array, 1 = inside it
+        self._array_items = 0      # objects parsed from the array we're in
+        self._counts_before = (0, 0)  # (repairs, skipped) when that array started
+        self._quote = None         # quote character of the string we're in, if any
+        self._escaped = False
+        self.started = False       # seen the opening "["
+        self.finished = False      # seen the closing "]"
+        self.repairs = 0           # single quotes / trailing commas fixed
+        self.skipped = 0           # objects that couldn't be parsed even after fixing
+        self.truncated = False     # the text ended before the closing "]"
+
+    def feed(self, text):
+        """
+        Add the next piece of the stream.
+
+        Returns:
+            list[dict]: Objects of the array completed by this piece
+        """
+        if self.finished:
+            return []
+        self._buffer += text
+        items = []
+        buffer = self._buffer
+        waiting_at = None          # a "[" at the end of the text so far
+
+        for pos in range(self._pos, len(buffer)):
+            char = buffer[pos]
+
+            if self._quote is not None:
+                if self._escaped:
+                    self._escaped = False
+                    if char == "'" and self._quote == "'":
+                        # \' is not a JSON escape - drop the backslash
+                        self._edits.append((pos - 1, 1, ""))
+                elif char == "\\":
+                    self._escaped = True
+                elif char == self._quote:
+                    if char == "'":
+                        self._edits.append((pos, 1, '"'))
+                    self._quote = None
+                    self._last_token = pos
+                    self._last_char = char
+                elif char == '"':
+                    # A double quote inside a single-quoted string
+                    self._edits.append((pos, 1, '\\"'))
+                continue
+
+            if not self.started:
+                # Skip fences/prose until the array opens
+                if char == "[":
+                    following = buffer[pos + 1:].lstrip()[:1]
+                    if not following:
+                        # Can't tell yet - look at this "[" again next time
+                        waiting_at = pos
+                        break
+                    if following in "{]":
+                        self.started = True
+                        self._depth = 1
+                        self._last_char = char
+                        self._array_items = 0
+                        self._counts_before = (self.repairs, self.skipped)
+                continue
+
+            if char == '"':
+                self._quote = '"'
+            elif char == "'" and self._item_start is not None:
+                # Only inside an object: between objects it's probably prose
+                self._quote = "'"
+                self._edits.append((pos, 1, '"'))
+                self.repairs += 1
+            elif char in "[{":
+                if self._depth == 1 and char == "{":
+                    self._item_start = pos
+                    self._edits = []
+                self._depth += 1
+            elif char in "]}":
+                if (self._item_start is not None and self._last_token is not None
+                        and buffer[self._last_token] == ","):
+                    # Trailing comma before a closing bracket
+                    self._edits.append((self._last_token, 1, ""))
+                    self.repairs += 1
+                elif char == "]" and self._depth == 1 and self._last_char == ",":
+                    # After the last object: nothing to edit (the array
+                    # itself is never parsed), but it was still a repair
+                    self.repairs += 1
+                self._depth -= 1
+                if self._depth == 1 and char == "}" and self._item_start is not None:
+                    item = self._parse_item(buffer, pos + 1)
+                    if item is not None:
+                        items.append(item)
+                        self._array_items += 1
+                    self._item_start = None
+                elif self._depth == 0:
+                    if not self._array_items and self.skipped > self._counts_before[1]:
+                        # Nothing in it parsed: brackets in prose, not the
+                        # array - forget it and keep looking
+                        self.started = False
+                        self.repairs, self.skipped = self._counts_before
+                        continue
+                    self.finished = True
+                    break
+
+            if not char.isspace():
+                self._last_token = pos
+                self._last_char = char
+
+        # Keep only the unfinished object (or the undecided "["); everything
+        # before it is done with
+        if waiting_at is not None:
+            keep_from = waiting_at
+        elif self._item_start is not None:
+            keep_from = self._item_start
+        else:
+            keep_from = len(buffer)
+        self._buffer = buffer[keep_from:]
+        if self._item_start is not None:
+            self._item_start = 0
+            self._edits = [(p - keep_from, n, r) for p, n, r in self._edits]
+        if self._last_token is not None:
+            self._last_token -= keep_from
+        self._pos = 0 if waiting_at is not None else len(self._buffer)
+        return items
+
+    def _parse_item(self, buffer, end):
+        """Apply the fixes collected for the current object and parse it."""
+        start = self._item_start
+        if not self._edits:
+            text = buffer[start:end]
+        else:
+            parts = []
+            position = start
+            for edit_pos, length, replacement in sorted(self._edits):
+                parts.append(buffer[position:edit_pos])
+                parts.append(replacement)
+                position = edit_pos + length
+            parts.append(buffer[position:end])
+            text = "".join(parts)
+
+        try:
+            return json.loads(text)
+        except ValueError:
+            self.skipped += 1
+            return None
+
+    def close(self):
+        """
+        Finish parsing.
+
+        Raises ValueError if the text never contained an array. A response
+        that ended early only sets `truncated` - the objects already
+        returned are still good.
+        """
+        if not self.started:
+            raise ValueError("No JSON array found in the response")
+        if not self.finished:
+            self.truncated = True
@@ -0,0 +1,129 @@
+"""
+MINHASH UTILITIES - The "Taste Test" Toolbox
+
+Finding near-duplicate flashcards ("What is the function of mitochondria?"
+vs "What is the main function of the mitochondria?", with nearly the same
+answer) by comparing every new card with every card already in the deck
+would get slower with every card added. These pure functions make the
+comparison cheap:
+
+1. SHINGLING: a card (question + answer) becomes the set of its words.
+   Two cards that share most of their words say nearly the same thing;
+   the share is their Jaccard similarity (|A ∩ B| / |A ∪ B|).
+2. MINHASH: NUM_HASHES hash functions each keep only the smallest hash of
+   any word. The chance that two sets keep the same minimum equals their
+   Jaccard similarity, so a short signature stands in for the set.
+3. LSH (locality-sensitive hashing): the signature is cut into BANDS bands
+   of ROWS values, and each band is hashed to one number. Similar cards
+   almost always share at least one band hash, unrelated cards almost
+   never do - so looking up a card's band hashes in an index finds its
+   likely duplicates without reading the rest of the deck.
+
+With 16 bands of 4 rows, cards with 65% of their words in common end up as
+candidates 96% of the time, cards with 20% in common 2.5% of the time.
+Candidates are then checked exactly with is_near_duplicate(), so false
+matches never get through.
+
+WHY WORDS AND NOT CHARACTER N-GRAMS:
+Flashcard questions are short and formulaic, so character n-grams make
+"What is the capital of France?" and "...of Spain?" look alike. Including
+the answer and comparing words separates real duplicates from cards that
+merely share a template - and a card has a few dozen words, but hundreds
+of character n-grams to hash.
+
+CONCEPTS: Shingling, Jaccard Similarity, MinHash, Locality-Sensitive Hashing
+RELATED: dedupe.py (the per-topic index), geminiapi.py (save_flashcards)
+"""
+
+import functools
+import hashlib
+import random
+import re
+import struct
+
+BANDS = 16
+ROWS = 4
+NUM_HASHES = BANDS * ROWS
+
+# XOR with a random 64-bit mask reorders the (already random) word hashes,
+# which is all MinHash needs; it's several times cheaper than the textbook
+# (a * x + b) mod p. The fixed seed keeps signatures stable across
+# processes and restarts, since they're stored in the database.
+_rng = random.Random(20240601)
+_MASKS = [_rng.getrandbits(64) for _ in range(NUM_HASHES)]
+
+_NON_WORD = re.compile(r"[\W_]+")
+_NUMBER = re.compile(r"\d+")
+
+
+def card_words(question, answer):
+    """
+    The set of (lower-case) words of a flashcard.
+
+    EXAMPLE:
+        card_words("What is DNA?", "A molecule")  # {"what", "is", "dna", "a", "molecule"}
+    """
+    return set(_NON_WORD.sub(" ", f"{question} {answer}").casefold().split())
+
+
+def _word_hash(word):
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+# Course material reuses the same few thousand words over and over, so a
+# word's NUM_HASHES values are worth keeping (about 3 KB per word)
+@functools.lru_cache(maxsize=4096)
+def _word_minhashes(word):
+    """The word's value under each of the NUM_HASHES hash functions."""
+    word_hash = _word_hash(word)
+    return tuple([mask ^ word_hash for mask in _MASKS])
+
+
+def signature(words):
+    """
+    The MinHash signature (NUM_HASHES integers) of a set of words.
+
+    An empty set gets an empty signature (and so no band hashes).
+
+    zip() lines up every word's values per hash function, so all the
+    minimums are taken in C - this is most of the work of saving a card.
+    """
+    if not words:
+        return []
+    return list(map(min, zip(*map(_word_minhashes, words))))
+
+
+def band_hashes(sig):
+    """
+    One 64-bit signed integer per band of a signature (fits a BigIntegerField).
+
+    The band number is hashed too, so equal values in different bands
+    don't collide and a single indexed column is enough.
+    """
+    result = []
+    for band in range(len(sig) // ROWS):
+        rows = sig[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(struct.pack(f">H{ROWS}Q", band, *rows), digest_size=8).digest()
+        result.append(int.from_bytes(digest, "big", signed=True))
+    return result
+
+
+def jaccard(a, b):
+    """|A ∩ B| / |A ∪ B| (0.0 for two empty sets)"""
+    if not a and not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def is_near_duplicate(words_a, words_b, threshold):
+    """
+    Exact check of an LSH candidate pair.
+
+    Cards that mention different numbers (also inside words, like "CO2")
+    are never duplicates, however similar the wording: "What happens in
+    step 1?" and "What happens in step 2?" share almost every word but
+    ask different things.
+    """
+    if set(_NUMBER.findall(" ".join(words_a))) != set(_NUMBER.findall(" ".join(words_b))):
+        return False
+    return jaccard(words_a, words_b) >= threshold
@@ -0,0 +1,211 @@
+"""
+TEXT PREPROCESSING UTILITIES - The "Trimming Board" Toolbox
+
+Extracted text is full of things the LLM can't learn anything from, but
+that we still pay for in tokens (and wait for, since a longer prompt is a
+slower prompt):
+- running headers and footers repeated on every PDF page
+  ("Introduction to Biology - Lecture 3", "Page 12 of 40")
+- words broken across lines ("photo-\\nsynthesis")
+- runs of spaces, tabs and blank lines left over from the page layout
+- the same paragraph appearing several times (slide decks exported with
+  every build step, copied disclaimers)
+
+preprocess_text() removes them before the text is chunked and prompted.
+
+WHAT WE'RE CAREFUL NOT TO DO:
+- Touch the wording of the content: only whole lines/paragraphs that are
+  repeated are dropped, and hyphens are only joined between lower-case
+  letters ("well-\\nknown" would become "wellknown", but "Anti-\\nBody"
+  and dashes at the end of a sentence are left alone)
+- Remove page breaks ("\\f"): utils/chunking.py still splits on them
+
+CONCEPTS: Text Normalization, Boilerplate Detection, Deduplication, Token Budgets
+RELATED: geminiapi.py (prepare_text), chunking.py (estimate_tokens), text_extractors.py
+"""
+
+import re
+import unicodedata
+from collections import Counter
+
+from .chunking import estimate_tokens
+
+# Header/footer detection only makes sense once there are a few pages
+# to compare, and a line has to be on at least this share of them
+MIN_PAGES_FOR_BOILERPLATE = 3
+BOILERPLATE_PAGE_SHARE = 0.5
+# How many lines at the top and bottom of each page can be header/footer
+EDGE_LINES = 3
+
+# Short paragraphs ("Summary", "Example") repeat legitimately as headings;
+# only longer ones are dropped when repeated
+MIN_DUPLICATE_PARAGRAPH_CHARS = 40
+
+# Zero-width characters and soft hyphens PDFs like to leave in the text
+_INVISIBLE = dict.fromkeys(map(ord, "\u00ad\u200b\u200c\u200d\u2060\ufeff"))
+# Typographic ligatures ("ﬁ" is one character, and an unusual token)
+_LIGATURES = str.maketrans({
+    "\ufb00": "ff", "\ufb01": "fi", "\ufb02": "fl", "\ufb03": "ffi", "\ufb04": "ffl",
+    "\ufb05": "st", "\ufb06": "st",
+})
+# Whitespace other than line/page breaks that isn't a lone space. (Matching
+# lone spaces too would replace every gap between words with itself.)
+_SPACES = re.compile(r"[^\S\n\f ][^\S\n\f]*| [^\S\n\f]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+# Starts with the literal "-" so the regex engine can skip ahead to
+# candidates instead of trying the look-behind at every character
+_HYPHENATED = re.compile(r"-(?<=[a-z]-)\n(?=[a-z])")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_DIGITS = re.compile(r"\d+")
+# "12", "- 12 -", "Page 12", "page 12 of 40", "p. 12", "12 / 40"
+_PAGE_NUMBER = re.compile(
+    r"^[-–—\s]*(?:(?:page|p\.?|pg\.?)\s*)?\d+(?:\s*(?:of|/)\s*\d+)?[-–—\s]*$", re.IGNORECASE
+)
+
+
+def normalize_whitespace(text):
+    """
+    Unify characters and spacing without changing any words.
+
+    - Ligatures become plain letters ("ﬁ" → "fi"), which also tokenize
+      better, and invisible characters (soft hyphens, zero-width spaces)
+      are dropped. We don't use NFKC for this: it would also turn "x²"
+      into "x2" and "H₂O" into "H2O"
+    - Runs of spaces/tabs become one space, lines are trimmed
+    - More than one blank line in a row becomes one blank line
+
+    EXAMPLE:
+        normalize_whitespace("a  \\t b\\r\\n\\n\\n\\nc")  # "a b\\n\\nc"
+    """
+    text = unicodedata.normalize("NFC", text).translate(_INVISIBLE).translate(_LIGATURES)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = _SPACES.sub(" ", text)
+    text = "\n".join(line.strip(" ") for line in text.split("\n"))
+    return _BLANK_LINES.sub("\n\n", text)
+
+
+def _line_key(line):
+    """Compare header/footer lines ignoring case and page numbers."""
+    return _DIGITS.sub("#", line.casefold())
+
+
+def _edge_indexes(lines):
+    """Indexes of the first and last EDGE_LINES non-empty lines of a page."""
+    filled = [index for index, line in enumerate(lines) if line]
+    return set(filled[:EDGE_LINES] + filled[-EDGE_LINES:])
+
+
+def strip_page_boilerplate(pages):
+    """
+    Remove running headers/footers and page numbers from a list of pages.
+
+    A line at the top or bottom of a page counts as boilerplate when the
+    same line (ignoring digits, so "Page 3" matches "Page 4") is at the top
+    or bottom of at least half the pages, or when it's just a page number.
+    Documents with fewer than MIN_PAGES_FOR_BOILERPLATE pages are left
+    alone (a "2024" on the first line of a text file is probably content).
+
+    Returns:
+        tuple: (list of cleaned pages, number of lines removed)
+    """
+    if len(pages) < MIN_PAGES_FOR_BOILERPLATE:
+        return pages, 0
+
+    split_pages = [page.split("\n") for page in pages]
+    edges = [_edge_indexes(lines) for lines in split_pages]
+
+    # Count each line once per page, however often it appears on it
+    seen_on = Counter()
+    for lines, indexes in zip(split_pages, edges):
+        seen_on.update({_line_key(lines[index]) for index in indexes})
+    threshold = max(MIN_PAGES_FOR_BOILERPLATE, len(pages) * BOILERPLATE_PAGE_SHARE)
+    repeated = {key for key, pages_with_line in seen_on.items() if pages_with_line >= threshold}
+
+    cleaned, removed = [], 0
+    for lines, indexes in zip(split_pages, edges):
+        kept = []
+        for index, line in enumerate(lines):
+            if index in indexes and (_line_key(line) in repeated or _PAGE_NUMBER.match(line)):
+                removed += 1
+            else:
+                kept.append(line)
+        cleaned.append("\n".join(kept).strip("\n"))
+    return cleaned, removed
+
+
+def join_hyphenated_words(text):
+    """
+    Undo line-break hyphenation: "photo-\\nsynthesis" → "photosynthesis".
+
+    EXAMPLE:
+        join_hyphenated_words("mito-\\nchondria")  # "mitochondria"
+    """
+    return _HYPHENATED.sub("", text)
+
+
+def drop_duplicate_paragraphs(text, seen):
+    """
+    Remove paragraphs that already appeared earlier in the document.
+
+    Args:
+        text (str): One page (or a whole document without page breaks)
+        seen (set): Keys of paragraphs already kept - shared between the
+            pages of one document, and updated in place
+
+    Returns:
+        tuple: (text without the repeats, number of paragraphs removed)
+    """
+    kept, removed = [], 0
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        if len(paragraph) >= MIN_DUPLICATE_PARAGRAPH_CHARS:
+            # Spaces are already normalized; only the line wrapping can differ
+            key = paragraph.casefold().replace("\n", " ")
+            if key in seen:
+                removed += 1
+                continue
+            seen.add(key)
+        kept.append(paragraph)
+    return "\n\n".join(kept), removed
+
+
+def preprocess_text(text):
+    """
+    Shrink extracted text before it is sent to the LLM.
+
+    PURE FUNCTION: Same input always produces same output, no side effects
+
+    Args:
+        text (str): Text from extract_text_from_file() (pages separated by "\\f")
+
+    Returns:
+        tuple: (cleaned text, stats dict with "bytes_before", "bytes_after",
+                "tokens_before", "tokens_after", "boilerplate_lines" and
+                "duplicate_paragraphs")
+
+    EXAMPLE:
+        pages = "Bio 101\\nCells divide.\\n1\\fBio 101\\nDNA copies.\\n2\\fBio 101\\nGenes.\\n3"
+        preprocess_text(pages)[0]  # "Cells divide.\\fDNA copies.\\fGenes."
+
+    ORDER MATTERS:
+    Headers are stripped before hyphens are joined and paragraphs compared,
+    because a footer between two halves of a word or paragraph would hide
+    the match.
+    """
+    pages = normalize_whitespace(text).split("\f")
+    pages, boilerplate_lines = strip_page_boilerplate(pages)
+
+    seen = set()
+    duplicate_paragraphs = 0
+    for number, page in enumerate(pages):
+        pages[number], removed = drop_duplicate_paragraphs(join_hyphenated_words(page), seen)
+        duplicate_paragraphs += removed
+
+    cleaned = "\f".join(page for page in pages if page)
+    return cleaned, {
+        "bytes_before": len(text.encode("utf-8")),
+        "bytes_after": len(cleaned.encode("utf-8")),
+        "tokens_before": estimate_tokens(text),
+        "tokens_after": estimate_tokens(cleaned),
+        "boilerplate_lines": boilerplate_lines,
+        "duplicate_paragraphs": duplicate_paragraphs,
+    }
@@ -0,0 +1,76 @@
+"""
+SPACED REPETITION UTILITIES - The "When to Serve It Again" Toolbox
+
+Reviewing a whole deck in the same order every time wastes most of a study
+session on cards the student already knows. Spaced repetition shows each
+card again just before it would be forgotten: a card answered easily comes
+back after days, then weeks; a card that was missed comes back tomorrow.
+
+THE SM-2 ALGORITHM (SuperMemo 2, the basis of Anki's scheduler):
+After each review the student grades their answer from 0 to 5:
+    5 perfect, 4 correct after some thought, 3 correct but hard,
+    2 wrong but it felt familiar, 1 wrong, 0 complete blackout
+- Grade 3 or more: the card was remembered. The gap before the next
+  review grows: 1 day, then 6 days, then the previous gap × ease factor
+- Grade below 3: the card was forgotten. Start over with a 1-day gap
+- The ease factor (starts at 2.5, never below 1.3) goes up after easy
+  reviews and down after hard ones, so every card gets its own pace
+
+CONCEPTS: Spaced Repetition, Scheduling, Pure Functions
+RELATED: views.py (FlashcardReview, DueFlashcardList), models.py (Flashcard)
+"""
+
+from datetime import timedelta
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+MIN_QUALITY, MAX_QUALITY = 0, 5
+# The lowest grade that counts as remembering the card
+PASSING_QUALITY = 3
+
+
+def sm2(quality, ease, interval_days, repetitions):
+    """
+    The next review state of a card after a review.
+
+    PURE FUNCTION: Same input always produces same output, no side effects
+
+    Args:
+        quality (int): The grade, MIN_QUALITY to MAX_QUALITY
+        ease (float): The card's ease factor before this review
+        interval_days (int): The gap that led up to this review
+        repetitions (int): Reviews in a row graded PASSING_QUALITY or more
+
+    Returns:
+        tuple: (ease, interval_days, repetitions) after this review
+
+    EXAMPLE:
+        sm2(4, 2.5, 0, 0)   # (2.5, 1, 1)   - new card: see it tomorrow
+        sm2(4, 2.5, 1, 1)   # (2.5, 6, 2)
+        sm2(5, 2.5, 6, 2)   # (2.6, 15, 3)  - 6 days × 2.5, then a bit easier
+        sm2(1, 2.6, 15, 3)  # (2.06, 1, 0)  - forgotten: start over
+    """
+    if not MIN_QUALITY <= quality <= MAX_QUALITY:
+        raise ValueError(f"Quality must be between {MIN_QUALITY} and {MAX_QUALITY}")
+
+    if quality >= PASSING_QUALITY:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = round(interval_days * ease)
+        repetitions += 1
+    else:
+        repetitions = 0
+        interval_days = 1
+
+    # The ease changes after every review, by +0.1 for a 5 down to -0.8 for a 0
+    misses = MAX_QUALITY - quality
+    ease = max(MIN_EASE, round(ease + 0.1 - misses * (0.08 + misses * 0.02), 2))
+    return ease, interval_days, repetitions
+
+
+def next_due(reviewed_at, interval_days):
+    """When a card reviewed at `reviewed_at` is due again."""
+    return reviewed_at + timedelta(days=interval_days)
@@ -2,7 +2,12 @@
 TEXT EXTRACTION UTILITIES - The "Document Readers" Toolbox
 
 This module contains utility functions for extracting text from different file formats.
-These are PURE FUNCTIONS - they take a file path and return text, with no side effects.
+These are PURE FUNCTIONS - they take a file and return text, with no side effects.
+
+Every extractor reads a path on disk: the upload as stored with its
+generation job (see jobs.py). Django spools big uploads to a temp file, and
+the storage backend moves (renames) that file into MEDIA_ROOT instead of
+copying it, so a document is only written to disk once.
 
 EDUCATIONAL NOTE:
 We extracted these functions from geminiapi.py into a separate utility module.
@@ -19,21 +24,116 @@ CONCEPTS: Pure Functions, Utility Functions, Single Responsibility Principle
 RELATED: geminiapi.py (uses these functions), file_validators.py (validates before extraction)
 """
 
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
 import PyPDF2
 import docx2txt
 
+# The file types extract_text_from_file() can read
+SUPPORTED_MIME_TYPES = {
+    "application/pdf",
+    "text/plain",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+def iter_pdf_pages(file_path):
+    """
+    Yield the text of each PDF page, one page at a time.
+
+    GENERATOR: Pages are parsed only as the caller asks for them, so a caller
+    that stops early (e.g. once it has enough text) never pays for the rest.
+
+    Args:
+        file_path (str): Path to the PDF file
+
+    Yields:
+        str: Text of the next page
+    """
+    with open(file_path, "rb") as file:
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+
+
+def _extract_page_range(file_path, start, stop):
+    """
+    Extract pages [start, stop) - runs inside a worker process.
+
+    Must be a module-level function so the process pool can pickle it.
+    """
+    with open(file_path, "rb") as file:
+        reader = PyPDF2.PdfReader(file)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
 
-def pdf_to_text(file_path):
+def iter_pdf_pages_parallel(file_path, processes, pages_per_task=8):
+    """
+    Yield the text of each PDF page, extracting page ranges in parallel.
+
+    Text extraction is CPU-bound, so threads wouldn't help (the GIL lets only
+    one run Python code at a time). Instead, blocks of pages_per_task pages
+    are handed to a pool of worker processes. Pages are still yielded in
+    document order, and only a few blocks are in flight at any time, so
+    stopping early cancels the remaining work.
+
+    Args:
+        file_path (str): Absolute path to the PDF file
+        processes (int): Number of worker processes
+        pages_per_task (int): Pages each worker extracts per task
+
+    Yields:
+        str: Text of the next page
+    """
+    with open(file_path, "rb") as file:
+        page_count = len(PyPDF2.PdfReader(file).pages)
+
+    ranges = iter(
+        (start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    )
+    executor = ProcessPoolExecutor(max_workers=processes)
+    try:
+        # Keep two blocks queued per process so workers never sit idle
+        in_flight = deque(
+            executor.submit(_extract_page_range, file_path, start, stop)
+            for start, stop in _take(ranges, processes * 2)
+        )
+        while in_flight:
+            pages = in_flight.popleft().result()
+            for start, stop in _take(ranges, 1):
+                in_flight.append(
+                    executor.submit(_extract_page_range, file_path, start, stop)
+                )
+            yield from pages
+    finally:
+        # Runs on normal exit and when the caller stops early
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _take(iterator, n):
+    """Return up to n items from an iterator."""
+    return [item for _, item in zip(range(n), iterator)]
+
+
+def pdf_to_text(file_path, max_chars=None, processes=1):
     """
     Extract text content from a PDF file.
 
     PURE FUNCTION: Same input always produces same output, no side effects
 
     Args:
-        file_path (str): Absolute path to the PDF file
+        file_path (str): Path to the PDF file
+        max_chars (int, optional): Stop reading pages once this much text
+            has been collected, and trim the result to it (None = no limit)
+        processes (int): Worker processes for parallel extraction
+            (1 = extract in this process)
 
     Returns:
-        str: Extracted text from all pages
+        str: Extracted text from all pages, each followed by a form feed ("\f")
 
     Raises:
         ValueError: If PDF cannot be read or is corrupted
@@ -52,15 +152,30 @@ def pdf_to_text(file_path):
     WHY BINARY MODE ("rb"):
     PDFs contain binary data (images, fonts, etc.), not just text.
     Reading in binary mode preserves this data structure.
+
+    WHY COLLECT PAGES IN A LIST:
+    Building a string with text += page_text copies everything collected so
+    far on every page, which gets slow on big documents. Appending to a list
+    and joining once at the end copies each character only once.
     """
     try:
-        text = ""
-        with open(file_path, "rb") as file:
-            reader = PyPDF2.PdfReader(file)
-            # Loop through all pages and extract text
-            for page_num in range(len(reader.pages)):
-                text += reader.pages[page_num].extract_text()
-        return text
+        if processes > 1:
+            pages = iter_pdf_pages_parallel(file_path, processes)
+        else:
+            pages = iter_pdf_pages(file_path)
+        with closing(pages):
+            parts = []
+            collected = 0
+            for page_text in pages:
+                # A form feed marks each page break so later stages
+                # (e.g. utils/chunking.py) can split on page boundaries
+                parts.append(page_text + "\f")
+                collected += len(page_text) + 1
+                if max_chars is not None and collected >= max_chars:
+                    break
+
+        text = "".join(parts)
+        return text if max_chars is None else text[:max_chars]
     except Exception as e:
         # Re-raise with more context for debugging
         raise ValueError(f"Failed to read PDF file: {str(e)}")
@@ -73,7 +188,7 @@ def docx_to_text(file_path):
     PURE FUNCTION: Same input always produces same output, no side effects
 
     Args:
-        file_path (str): Absolute path to the DOCX file
+        file_path (str): Path to the DOCX file
 
     Returns:
         str: Extracted text from the document
@@ -113,7 +228,7 @@ def txt_to_text(file_path):
     PURE FUNCTION: Same input always produces same output, no side effects
 
     Args:
-        file_path (str): Absolute path to the TXT file
+        file_path (str): Path to the TXT file
 
     Returns:
         str: File contents
@@ -129,18 +244,29 @@ def txt_to_text(file_path):
     Plain text files are the simplest - just characters!
 
     ENCODING:
-    - encoding="utf-8": Handles international characters (é, 中, etc.)
+    - "utf-8": Handles international characters (é, 中, etc.)
     - Without it, might fail on non-ASCII characters
     - UTF-8 is the standard for web and modern applications
+
+    WHY MMAP:
+    Memory-mapping lets the OS page the file straight into memory, and we
+    decode it to a string in one step instead of reading it into a bytes
+    buffer first.
     """
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            return file.read()
+        with open(file_path, "rb") as file:
+            # An empty file can't be mapped
+            if os.fstat(file.fileno()).st_size == 0:
+                return ""
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                text = str(mapped, "utf-8")
+        # Match text mode's universal newlines
+        return text.replace("\r\n", "\n")
     except Exception as e:
         raise ValueError(f"Failed to read text file: {str(e)}")
 
 
-def extract_text_from_file(file_path, mime_type):
+def extract_text_from_file(file_path, mime_type, max_chars=None, pdf_processes=1):
     """
     Smart dispatcher function - routes to the correct extractor based on file type.
 
@@ -148,8 +274,11 @@ def extract_text_from_file(file_path, mime_type):
     Instead of calling pdf_to_text() or docx_to_text() directly, you call this!
 
     Args:
-        file_path (str): Absolute path to the file
+        file_path (str): Path to the file
         mime_type (str): MIME type of the file (e.g., "application/pdf")
+        max_chars (int, optional): Return at most this many characters.
+            PDFs stop parsing pages as soon as the budget is reached.
+        pdf_processes (int): Worker processes for PDF page extraction
 
     Returns:
         str: Extracted text
@@ -183,13 +312,14 @@ def extract_text_from_file(file_path, mime_type):
     Just add the function and update this dispatcher!
     """
     if mime_type == "application/pdf":
-        return pdf_to_text(file_path)
+        return pdf_to_text(file_path, max_chars=max_chars, processes=pdf_processes)
     elif mime_type == "text/plain":
-        return txt_to_text(file_path)
+        text = txt_to_text(file_path)
     elif mime_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-        return docx_to_text(file_path)
+        text = docx_to_text(file_path)
     else:
         raise ValueError(f"Unsupported file type: {mime_type}")
+    return text if max_chars is None else text[:max_chars]
 
 
 """
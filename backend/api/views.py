@@ -16,42 +16,113 @@ RELATED: urls.py (routes to these views), models.py (database), serializers.py (
 """
 
 import logging
+from pathlib import Path
+from django.conf import settings
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.http import content_disposition_header, parse_etags
 from django.contrib.auth.models import User
-from rest_framework import generics, serializers
+from rest_framework import generics, serializers, status
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.views import APIView
-from .serializers import UserSerializer, TopicSerializer, FlashcardSerializer
+from .serializers import (
+    UserSerializer, TopicSerializer, FlashcardSerializer, GenerationJobSerializer,
+    GenerationBatchSerializer, FlashcardSearchResultSerializer, ScheduledFlashcardSerializer,
+    ReviewSerializer,
+)
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from .models import Topic, Flashcard
-from .geminiapi import handle_flashcard_creation
+from .models import Topic, Flashcard, GenerationBatch, GenerationJob
+from .geminiapi import validate_upload
+from .jobs import enqueue_generation_job, enqueue_generation_batch, enqueue_import_job
+from .dedupe import index_flashcards
+from .search import search_flashcards
+from .deck_io import FORMATS, detect_format, export_deck, import_deck
+from .pagination import KeysetPagination
+from .instrumentation import span
+from .deck_cache import bump_deck_version, deck_etag, get_cached_page, store_page
+from .events import EventStreamRenderer, job_event_stream
+from .utils.scheduling import next_due, sm2
+from .utils.text_extractors import SUPPORTED_MIME_TYPES
 
 # ============================================
-# LOGGING SETUP FOR PRESENTATION & DEBUGGING
+# LOGGING & TIMING
 # ============================================
-# Logger for tracking request journey through the system
+# Stage timings (upload, extract, LLM, persist, serialize) are recorded by
+# span() blocks and logged once per sampled request - see instrumentation.py.
 #
-# WHY LOGGING IS IMPORTANT:
-# 1. DEBUGGING: Helps identify where errors occur in the request flow
-# 2. MONITORING: Track system behavior in production
-# 3. LEARNING: Visualize how data moves through the application
-# 4. PERFORMANCE: Measure how long operations take
-#
-# HOW TO USE:
-# - logger.info() for normal operations (what we use for presentations)
-# - logger.warning() for concerning but non-critical issues
-# - logger.error() for errors that need attention
-# - logger.debug() for detailed debugging info
-#
-# WHERE TO VIEW: When you run `python manage.py runserver`,
-# logs appear in the terminal with 🔵 markers for easy tracking
-#
-# FUTURE USE: In production, logs go to files or monitoring services
-# like AWS CloudWatch, DataDog, or Sentry for real-time alerts
+# Ordinary log lines use %-style arguments, e.g.
+#     logger.debug("Queued job %s", job.id)
+# so the message is only formatted if the log level is actually enabled.
 logger = logging.getLogger('api')
 
 
+# Shared with the async versions of these views (see async_views.py)
+
+def topics_with_deck_stats(user):
+    """The user's topics, each with its flashcard_count and last_card_at."""
+    cards = Flashcard.objects.filter(topic=OuterRef("pk")).order_by().values("topic")
+    return Topic.objects.filter(user=user).annotate(
+        flashcard_count=Coalesce(Subquery(cards.annotate(n=Count("id")).values("n")), 0),
+        last_card_at=Subquery(cards.annotate(last=Max("created_at")).values("last")),
+    )
+
+
+def client_has_etag(request, etag):
+    """True if the request's If-None-Match header says the client already has `etag`."""
+    if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+    return "*" in if_none_match or etag in [tag.removeprefix("W/") for tag in if_none_match]
+
+
+def read_batch_upload(form, files):
+    """
+    Check the files of a batch upload (multipart fields below).
+
+    - files: the documents (repeat the field once per file)
+    - name:  optional - put every file's cards into one topic with this name
+    - names: optional - a topic name per file, in the same order as files
+             (default: the file name without its extension)
+
+    Files that fail validation are reported instead of failing the batch.
+
+    Returns:
+        tuple: ([(uploaded_file, topic_name), ...], shared topic name or None,
+                [{"file": name, "error": message}, ...] for rejected files)
+
+    Raises:
+        ValueError: If there is nothing to queue, or too many files
+    """
+    uploaded_files = files.getlist("files")
+    if not uploaded_files:
+        raise ValueError("No files uploaded")
+    if len(uploaded_files) > settings.BATCH_MAX_FILES:
+        raise ValueError(f"At most {settings.BATCH_MAX_FILES} files per batch")
+
+    shared_name = (form.get("name") or "").strip()[:255] or None
+    names = form.getlist("names")
+    uploads, rejected = [], []
+    for index, uploaded_file in enumerate(uploaded_files):
+        try:
+            validate_upload(uploaded_file)
+            # Caught here rather than by a failed job, since one upload can
+            # easily pick up a stray file
+            if uploaded_file.content_type not in SUPPORTED_MIME_TYPES:
+                raise ValueError(f"Unsupported file type: {uploaded_file.content_type}")
+        except ValueError as e:
+            rejected.append({"file": uploaded_file.name, "error": str(e)})
+            continue
+        name = names[index].strip() if index < len(names) else ""
+        uploads.append((uploaded_file, (name or Path(uploaded_file.name).stem)[:255]))
+
+    if not uploads:
+        raise ValueError("None of the uploaded files can be used")
+    return uploads, shared_name, rejected
+
+
 class CreateUserView(generics.CreateAPIView):
     """
     ENDPOINT: POST /api/user/register/
@@ -75,82 +146,300 @@ class TopicListCreate(generics.ListCreateAPIView):
 
     PERMISSION: IsAuthenticated (must have valid JWT token)
     HTTP METHODS:
-    - GET: Returns list of user's topics
-    - POST: Creates topic + generates flashcards from uploaded file
+    - GET: Returns a page of user's topics, newest first
+      (?cursor=... for the next page, ?page_size=N to change the page size)
+    - POST: Queues a job that creates the topic + flashcards from an uploaded file
 
     🔵 REQUEST JOURNEY - STEP 3: This is where file uploads arrive!
     """
     serializer_class = TopicSerializer
     permission_classes = [IsAuthenticated]  # Must be logged in
+    pagination_class = KeysetPagination
+    keyset_ordering = ("-created_at", "-id")  # Newest topics first
 
     def get_queryset(self):
         """
         GET request handler - returns only THIS user's topics
 
-        CONCEPT: Query filtering with ORM
-        SQL equivalent: SELECT * FROM topics WHERE user_id = ?
+        CONCEPT: Query filtering with ORM, Correlated Subqueries
+        SQL equivalent:
+            SELECT topic.*,
+                   (SELECT COUNT(*) FROM flashcards WHERE topic_id = topic.id),
+                   (SELECT MAX(created_at) FROM flashcards WHERE topic_id = topic.id)
+            FROM topics WHERE user_id = ?
 
         This ensures users can only see their own topics (security!)
+
+        WHY SUBQUERIES INSTEAD OF JOIN + GROUP BY:
+        Card counts and last activity come back in the same query as the
+        topics, so the frontend doesn't have to fetch every deck (N+1
+        requests). A JOIN + GROUP BY would make SQLite group (and then sort)
+        every topic the user has before returning one page; with a subquery
+        per column, topics are still read page by page in index order and
+        each count is a short lookup on the (topic, created_at) index.
         """
-        user = self.request.user
-        logger.info(f"REQUEST JOURNEY - STEP 3: Fetching topics for user: {user.username}")
-        queryset = Topic.objects.filter(user=user)
-        logger.info(f"DATABASE: Found {queryset.count()} topics")
-        return queryset
+        return topics_with_deck_stats(self.request.user)
 
-    def perform_create(self, serializer):
+    def list(self, request, *args, **kwargs):
+        """GET request handler - one page of topics, timed as "serialize" """
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        with span("serialize"):
+            data = self.get_serializer(page, many=True).data
+        return self.get_paginated_response(data)
+
+    def create(self, request, *args, **kwargs):
         """
-        POST request handler - creates topic and flashcards
+        POST request handler - queues flashcard generation for an upload
 
         🔵 REQUEST JOURNEY - STEP 4: Processing the upload
         Flow:
         1. Validate incoming data
-        2. Save topic to database
-        3. Extract uploaded file
-        4. Send file to Gemini AI for processing
-        5. AI creates flashcards (happens in geminiapi.py)
-
-        CONCEPTS: File handling, Data validation, External API integration
-
-        LOGGING NOTE: Each logger.info() statement below tracks a different
-        stage of the request. This is invaluable for:
-        - Presentations: Show the complete data flow to an audience
-        - Debugging: Quickly identify which step failed
-        - Learning: Understand the order of operations
-        - Performance: Add timestamps to measure bottlenecks
+        2. Extract uploaded file
+        3. Store the file and queue a generation job
+        4. Respond 202 Accepted with the job straight away
+        5. A worker extracts text, asks Gemini for flashcards and creates the
+           topic (happens in jobs.py / geminiapi.py)
+
+        WHY 202 INSTEAD OF 201:
+        Generating flashcards takes tens of seconds. Doing it here would block
+        this web worker for everyone else, so we only accept the work and let
+        the frontend poll GET /api/jobs/<id>/ until it is done.
+
+        CONCEPTS: File handling, Data validation, Background jobs
         """
-        # Visual separator makes logs easier to read
-        logger.info("=" * 60)
-        logger.info("REQUEST JOURNEY - STEP 3: POST request arrived at TopicListCreate view")
-
         # Validate the data structure
+        serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        logger.info("VALIDATION: Data structure validated successfully")
+        user = request.user
 
-        user = self.request.user
-        logger.info(f"AUTHENTICATION: User '{user.username}' authenticated via JWT")
+        # Extract file from multipart form data
+        uploaded_file = request.data.get("file")
+        if not uploaded_file:
+            raise serializers.ValidationError({"error": "No file uploaded"})
+
+        try:
+            validate_upload(uploaded_file)
+        except ValueError as e:
+            raise serializers.ValidationError({"error": str(e)})
 
-        # Save topic to database first (CREATE operation)
+        # 🔵 REQUEST JOURNEY - STEP 5: Queue for AI processing
         topic_name = serializer.validated_data.get('name')
-        logger.info(f"DATABASE - STEP 4: Creating new topic '{topic_name}'")
-        topic = serializer.save(user=user)
-        logger.info(f"DATABASE: Topic created with ID={topic.id}")
+        with span("upload"):
+            job = enqueue_generation_job(uploaded_file, topic_name, user)
+        logger.debug("Queued generation job %s (%s)", job.id, uploaded_file.content_type)
 
-        # Extract file from multipart form data
-        uploaded_file = self.request.data.get("file")
+        return Response(
+            GenerationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
+
+class GenerationBatchCreate(APIView):
+    """
+    ENDPOINT: POST /api/topics/batch/
+    PURPOSE: Upload several documents at once (e.g. a whole semester's notes)
+
+    PERMISSION: IsAuthenticated
+    HTTP METHOD: POST only (multipart: files, optional name / names -
+    see read_batch_upload)
+
+    Each file becomes its own generation job, so workers generate them in
+    parallel. Responds 202 with the batch; files that were rejected are
+    listed under "rejected" and the rest still go ahead.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        try:
+            uploads, shared_name, rejected = read_batch_upload(request.data, request.FILES)
+        except ValueError as e:
+            raise serializers.ValidationError({"error": str(e), "rejected": []})
+
+        with span("upload"):
+            batch, jobs = enqueue_generation_batch(uploads, request.user, shared_name)
+        logger.debug("Queued batch %s (%d files)", batch.id, len(jobs))
+
+        # The jobs were just created, so serialize them without a query
+        batch._prefetched_objects_cache = {"jobs": jobs}
+        data = GenerationBatchSerializer(batch).data
+        data["rejected"] = rejected
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+class DeckImport(APIView):
+    """
+    ENDPOINT: POST /api/topics/import/
+    PURPOSE: Add flashcards from a CSV, JSONL or Anki text file, in bulk
+
+    PERMISSION: IsAuthenticated
+    HTTP METHOD: POST only (multipart)
+    FORM FIELDS:
+    - file:  the cards (see deck_io.py for the formats)
+    - type:  optional - csv, jsonl or anki (default: from the file extension)
+    - topic: optional - id of an existing topic to add the cards to
+    - name:  optional - name of the new topic (default: the file name)
+
+    RESPONSE: 201 with the topic and how many cards were imported, skipped
+    as near-duplicates, or invalid (with the first few invalid lines)
+
+    Files of settings.IMPORT_QUEUE_MIN_SIZE or more get 202 with a job
+    instead: an import costs around a millisecond per card (keeping the
+    near-duplicate and search indexes up to date), so a big deck is
+    imported by a worker. Poll GET /api/jobs/<id>/ - once it's done, the
+    same counts are in the job's "result".
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        uploaded_file = request.FILES.get("file")
         if not uploaded_file:
-            logger.error("ERROR: No file uploaded in request")
             raise serializers.ValidationError({"error": "No file uploaded"})
+        if uploaded_file.size > settings.IMPORT_MAX_FILE_SIZE:
+            raise serializers.ValidationError({
+                "error": f"File too large. Maximum size is {settings.IMPORT_MAX_FILE_SIZE // (1024 * 1024)}MB."
+            })
+        try:
+            file_format = detect_format(uploaded_file.name, request.data.get("type") or None)
+        except ValueError as e:
+            raise serializers.ValidationError({"error": str(e)})
+
+        topic_id = request.data.get("topic")
+        topic = None
+        if topic_id:
+            if not str(topic_id).isdigit():
+                raise serializers.ValidationError({"error": "topic must be a topic id"})
+            # Security: users can only import into their own topics
+            topic = get_object_or_404(Topic, id=topic_id, user=request.user)
+        name = (request.data.get("name") or "").strip() or Path(uploaded_file.name).stem
+
+        if uploaded_file.size >= settings.IMPORT_QUEUE_MIN_SIZE:
+            with span("upload"):
+                job = enqueue_import_job(uploaded_file, file_format, request.user, topic, name[:255])
+            logger.debug("Queued import job %s", job.id)
+            return Response(GenerationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        if topic is None:
+            topic = Topic.objects.create(user=request.user, name=name[:255])
+
+        try:
+            with span("import"):
+                result = import_deck(uploaded_file, file_format, topic, request.user)
+            if not result["imported"] and not result["duplicates"]:
+                raise ValueError("No flashcards found in the file")
+        except ValueError as e:
+            # Don't leave an empty topic behind for a file we couldn't use
+            if not topic_id and not topic.flashcards.exists():
+                topic.delete()
+            raise serializers.ValidationError({"error": str(e)})
+        logger.debug("Imported %d flashcards into topic %s", result["imported"], topic.id)
+
+        return Response(
+            {"topic": TopicSerializer(topic).data, **result}, status=status.HTTP_201_CREATED
+        )
+
+
+class DeckExport(APIView):
+    """
+    ENDPOINT: GET /api/topics/<id>/export/?type=csv
+    PURPOSE: Download a topic's flashcards as a file
 
-        logger.info(f"FILE UPLOAD: Received file '{uploaded_file.name}' ({uploaded_file.content_type})")
+    PERMISSION: IsAuthenticated
+    HTTP METHOD: GET only
+    QUERY PARAMS: ?type=csv (default), jsonl or anki (tab-separated text
+    for Anki's File → Import)
 
-        # 🔵 REQUEST JOURNEY - STEP 5: Send to AI for processing
-        # This function extracts text and generates flashcards
-        logger.info("AI PROCESSING - STEP 5: Sending file to Gemini AI...")
-        handle_flashcard_creation(uploaded_file, topic, user)
-        logger.info("AI PROCESSING: Flashcards generated successfully")
-        logger.info("RESPONSE - STEP 6: Sending JSON response back to frontend")
-        logger.info("=" * 60)
+    RESPONSE: The file, streamed as it's written (see deck_io.py), so even
+    a huge deck starts downloading at once and never sits in memory
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        # Security: users can only export their own topics
+        topic = get_object_or_404(Topic, id=pk, user=request.user)
+        try:
+            file_format = detect_format("", request.query_params.get("type", "csv"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        content_type, extension = FORMATS[file_format]
+
+        flashcards = Flashcard.objects.filter(topic=topic).order_by("created_at", "id")
+        response = StreamingHttpResponse(
+            export_deck(flashcards, file_format), content_type=f"{content_type}; charset=utf-8"
+        )
+        response["Content-Disposition"] = content_disposition_header(
+            as_attachment=True, filename=f"{topic.name}{extension}"
+        )
+        return response
+
+
+class GenerationBatchDetail(generics.RetrieveAPIView):
+    """
+    ENDPOINT: GET /api/batches/<id>/
+    PURPOSE: Report progress of every file in a batch upload
+
+    PERMISSION: IsAuthenticated
+    HTTP METHOD: GET only
+
+    RESPONSE: { "status": "running" | "done" | "failed",
+                "flashcard_count": 40, "jobs": [{...one per file...}], ... }
+    """
+    serializer_class = GenerationBatchSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        # Security: users can only see their own batches.
+        # All the batch's jobs are loaded in one extra query.
+        return GenerationBatch.objects.filter(user=self.request.user).prefetch_related("jobs")
+
+
+class GenerationJobDetail(generics.RetrieveAPIView):
+    """
+    ENDPOINT: GET /api/jobs/<id>/
+    PURPOSE: Report progress of a flashcard generation job
+
+    PERMISSION: IsAuthenticated
+    HTTP METHOD: GET only
+
+    RESPONSE: { "status": "queued" | "running" | "done" | "failed",
+                "flashcard_count": 12, "topic": 5, ... }
+    """
+    serializer_class = GenerationJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        # Security: users can only see their own jobs
+        return GenerationJob.objects.filter(user=self.request.user)
+
+
+class GenerationJobEvents(APIView):
+    """
+    ENDPOINT: GET /api/jobs/<id>/events/
+    PURPOSE: Stream a generation job's progress and its flashcards as they
+             are created (Server-Sent Events)
+
+    PERMISSION: IsAuthenticated
+    HTTP METHOD: GET only
+
+    RESPONSE: text/event-stream of `job` and `card` events (see events.py);
+    the stream closes once the job is done or has failed - or after
+    JOB_EVENTS_MAX_SECONDS, since it holds a worker thread (the async
+    version in async_views.py doesn't)
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request, pk):
+        # Security: users can only follow their own jobs
+        job = get_object_or_404(GenerationJob, pk=pk, user=request.user)
+
+        response = StreamingHttpResponse(
+            job_event_stream(job), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        # Ask nginx-style proxies not to buffer the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
 
 
 class TopicDelete(generics.DestroyAPIView):
@@ -200,9 +489,14 @@ class FlashcardListCreate(generics.ListCreateAPIView):
         user = self.request.user
         topic = Topic.objects.get(user=user, id=topic_id)
         if serializer.is_valid():
-            serializer.save(user=user, topic=topic)
+            card = serializer.save(user=user, topic=topic)
+            # Add it to the near-duplicate index, so generated cards that
+            # repeat it are caught (see dedupe.py)
+            index_flashcards([card])
+            bump_deck_version(topic.id)
         else:
-            print(serializer.errors)
+            logger.warning("Invalid flashcard for topic %s: %s", topic_id, serializer.errors)
+            raise serializers.ValidationError(serializer.errors)
 
 
 class FlashcardDelete(generics.DestroyAPIView):
@@ -217,34 +511,175 @@ class FlashcardDelete(generics.DestroyAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
+        # Security: users can only delete their own flashcards
         user = self.request.user
-        return Topic.objects.filter(user=user)
+        return Flashcard.objects.filter(user=user)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        bump_deck_version(instance.topic_id)
+
+
+class FlashcardSearch(APIView):
+    """
+    ENDPOINT: GET /api/flashcards/search/?q=...
+    PURPOSE: Find the user's flashcards by words in their question or answer
+
+    PERMISSION: IsAuthenticated
+    HTTP METHOD: GET only
+    QUERY PARAMS: ?q=cell membr (required; the last word matches as a
+    prefix), ?topic=<id> (only search one topic), ?limit=N (default 20)
+
+    RESPONSE: { "results": [ {...flashcard, "snippet": "...", "score": 7.1}, ... ] }
+    best match first (see search.py)
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response({"error": "Missing search query (?q=...)"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            topic_id = request.query_params.get("topic")
+            topic_id = int(topic_id) if topic_id else None
+            limit = int(request.query_params.get("limit", settings.SEARCH_PAGE_SIZE))
+        except ValueError:
+            return Response({"error": "topic and limit must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.SEARCH_MAX_PAGE_SIZE))
+
+        results = search_flashcards(request.user, query, topic_id=topic_id, limit=limit)
+        with span("serialize"):
+            data = FlashcardSearchResultSerializer(results, many=True).data
+        return Response({"results": data})
+
+
+class DueFlashcardList(APIView):
+    """
+    ENDPOINT: GET /api/flashcards/due/
+    PURPOSE: The user's next flashcards to review, most overdue first
+
+    PERMISSION: IsAuthenticated
+    HTTP METHOD: GET only
+    QUERY PARAMS: ?limit=N (default 20)
+
+    RESPONSE: { "results": [ {...flashcard, "due_at": ..., "ease_factor": ...}, ... ] }
+    An empty list means nothing is due - come back later.
+
+    CONCEPT: The flashcard_user_due_idx index (user, due_at, id) holds every
+    user's cards sorted by when they're due, so this reads the first N
+    entries of the user's range instead of loading and sorting the deck.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get("limit", settings.REVIEW_PAGE_SIZE))
+        except ValueError:
+            return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.REVIEW_MAX_PAGE_SIZE))
+
+        due = (
+            Flashcard.objects.filter(user=request.user, due_at__lte=timezone.now())
+            .order_by("due_at", "id")[:limit]
+        )
+        with span("serialize"):
+            data = ScheduledFlashcardSerializer(due, many=True).data
+        return Response({"results": data})
+
+
+class FlashcardReview(APIView):
+    """
+    ENDPOINT: POST /api/flashcards/<id>/review/
+    PURPOSE: Record how well the user remembered a card, and schedule its
+             next review (SM-2, see utils/scheduling.py)
+
+    PERMISSION: IsAuthenticated
+    HTTP METHOD: POST only
+
+    REQUEST BODY: { "quality": 0-5 }
+    RESPONSE: The card with its new ease_factor, interval_days and due_at
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        serializer = ReviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # Security: users can only review their own cards
+        card = get_object_or_404(Flashcard, pk=pk, user=request.user)
+
+        card.ease_factor, card.interval_days, card.repetitions = sm2(
+            serializer.validated_data["quality"], card.ease_factor, card.interval_days, card.repetitions
+        )
+        card.last_reviewed_at = timezone.now()
+        card.due_at = next_due(card.last_reviewed_at, card.interval_days)
+        # update() writes only the review state, not the card's text
+        Flashcard.objects.filter(pk=card.pk).update(
+            ease_factor=card.ease_factor, interval_days=card.interval_days,
+            repetitions=card.repetitions, due_at=card.due_at,
+            last_reviewed_at=card.last_reviewed_at,
+        )
+        # Like any other write to a card, this makes the deck's cached
+        # pages and ETags stale
+        bump_deck_version(card.topic_id)
+        return Response(ScheduledFlashcardSerializer(card).data)
 
 
 class FlashcardListByTopic(APIView):
     """
     ENDPOINT: GET /api/flashcards/<topic_id>/
-    PURPOSE: Get all flashcards for a specific topic
+    PURPOSE: Get the flashcards for a specific topic, a page at a time
 
     PERMISSION: IsAuthenticated (checked automatically)
     HTTP METHOD: GET only
+    QUERY PARAMS: ?cursor=... (next page), ?page_size=N
+    CONDITIONAL GET: send back the ETag from a previous response in an
+    If-None-Match header and get an empty 304 if the deck hasn't changed
 
     🔵 REQUEST JOURNEY - STEP 6: This returns data to the frontend
     """
+    pagination_class = KeysetPagination
+
     def get(self, request, topic_id):
         """
-        Fetch flashcards and return as JSON
+        Fetch a page of flashcards and return as JSON
+
+        CONCEPTS: ORM query, Pagination, Serialization, HTTP Response, Caching
 
-        CONCEPTS: ORM query, Serialization, HTTP Response
+        Decks rarely change after generation, so a repeat visit costs one
+        small query (the topic, which carries the deck version):
+        - the browser already has this version → 304, no body
+        - another visitor already loaded it → serialized page from the cache
+        - otherwise → query, serialize and cache it for next time
         """
         # Get topic (or 404 if not found/not owned by user)
         topic = get_object_or_404(Topic, id=topic_id, user=self.request.user)
 
-        # Query all flashcards for this topic (READ operation)
-        flashcards = Flashcard.objects.filter(topic=topic)
+        paginator = self.pagination_class()
+        cursor = request.query_params.get(paginator.cursor_query_param)
+        page_size = paginator.get_page_size(request)
+        etag = deck_etag(topic, cursor, page_size)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
 
-        # Convert Python objects → JSON
-        serializer = FlashcardSerializer(flashcards, many=True)
+        # The client's copy is still current - nothing to send
+        if client_has_etag(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
-        # Return HTTP response with JSON data
-        return Response(serializer.data)
+        cached = get_cached_page(topic, cursor, page_size)
+        if cached is not None:
+            data, paginator.next_cursor = cached
+            paginator.request = request
+        else:
+            # Query this topic's flashcards in creation order (READ operation)
+            flashcards = Flashcard.objects.filter(topic=topic)
+            page = paginator.paginate_queryset(flashcards, request, view=self)
+
+            # Convert Python objects → JSON
+            with span("serialize"):
+                data = FlashcardSerializer(page, many=True).data
+            store_page(topic, cursor, page_size, data, paginator.next_cursor)
+
+        # Return HTTP response with JSON data (plus the next-page link)
+        response = paginator.get_paginated_response(data)
+        for header, value in headers.items():
+            response[header] = value
+        return response
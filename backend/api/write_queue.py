@@ -0,0 +1,90 @@
+"""
+WRITE QUEUE - The "One Cook at the Grill" Rule in our Restaurant
+
+SQLite lets only one connection write at a time. When several threads of
+the same process (generation threads, async jobs, request threads) try to
+write at once, the losers sit in SQLite's busy handler: they sleep and
+retry on their own schedule, so a thread can keep losing to newer arrivals
+and stall for seconds, or give up with "database is locked".
+
+Instead, threads that are about to insert flashcards take a ticket and
+wait in line here, first come first served. Only the thread whose turn it
+is asks SQLite for the write lock, and it gets it straight away unless
+another process is writing (then SQLite's busy timeout still applies).
+
+ORDER MATTERS:
+Take your turn BEFORE starting the transaction:
+    with serialized_write(), transaction.atomic():
+        ...
+A thread that already holds SQLite's write lock and then queued here could
+wait for a thread that is itself waiting for that write lock.
+
+Only used with SQLite and settings.SQLITE_WRITE_QUEUE (see settings.py);
+other databases have row-level locks and don't need it.
+
+CONCEPTS: Locks, Fairness, Queues, Lock Ordering
+RELATED: geminiapi.py (save_flashcards), jobs.py, settings.py (SQLITE_* settings)
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+from .instrumentation import count, span
+
+
+class WriteQueue:
+    """
+    A first-come, first-served lock.
+
+    Re-entrant: a thread that already has its turn can enter again (e.g.
+    save_flashcards() called from inside another queued write).
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._next_ticket = 0
+        self._now_serving = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def turn(self):
+        if getattr(self._local, "depth", 0):
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+
+        with self._condition:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            if ticket != self._now_serving:
+                count("db.write_queue_waits")
+                with span("write_queue"):
+                    self._condition.wait_for(lambda: ticket == self._now_serving)
+
+        self._local.depth = 1
+        try:
+            yield
+        finally:
+            self._local.depth = 0
+            with self._condition:
+                self._now_serving += 1
+                self._condition.notify_all()
+
+
+write_queue = WriteQueue()
+
+
+@contextmanager
+def serialized_write():
+    """Wait for this process's turn to write (a no-op unless SQLite + SQLITE_WRITE_QUEUE)."""
+    if not settings.SQLITE_WRITE_QUEUE or connection.vendor != "sqlite":
+        yield
+        return
+    with write_queue.turn():
+        yield
@@ -41,6 +41,18 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Default number of items per page on paginated list endpoints
+# (see api/pagination.py)
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "50"))
+# Search results per request (GET /api/flashcards/search/), and the most
+# a client can ask for with ?limit=
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv("SEARCH_MAX_PAGE_SIZE", "50"))
+# Due cards per request (GET /api/flashcards/due/), and the most a client
+# can ask for with ?limit=
+REVIEW_PAGE_SIZE = int(os.getenv("REVIEW_PAGE_SIZE", "20"))
+REVIEW_MAX_PAGE_SIZE = int(os.getenv("REVIEW_MAX_PAGE_SIZE", "100"))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -62,6 +74,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.instrumentation.TimingMiddleware",  # Per-stage timings (sampled)
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -96,11 +109,43 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# SQLITE CONCURRENCY PROFILE (on by default, SQLITE_CONCURRENT=False turns it off)
+# Out of the box SQLite lets a writer block every reader, and a second
+# writer fails with "database is locked" almost immediately. With the profile:
+# - journal_mode=WAL: readers keep reading while a writer writes
+# - synchronous=NORMAL: fewer fsyncs; safe from app crashes, but the last
+#   few commits can be lost if the machine loses power
+# - timeout: wait up to SQLITE_BUSY_TIMEOUT seconds for the write lock
+# - transaction_mode=IMMEDIATE: a transaction takes the write lock at BEGIN,
+#   so it waits its turn instead of failing halfway through
+# - mmap_size / cache_size / temp_store: read pages from memory, not disk
+# Writes that insert cards also queue up inside each process, see
+# api/write_queue.py (SQLITE_WRITE_QUEUE)
+SQLITE_CONCURRENT = os.getenv("SQLITE_CONCURRENT", "True") == "True"
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "20"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))      # per connection
+SQLITE_WRITE_QUEUE = os.getenv("SQLITE_WRITE_QUEUE", "True") == "True"
+
+SQLITE_OPTIONS = {}
+if SQLITE_CONCURRENT:
+    SQLITE_OPTIONS = {
+        "timeout": SQLITE_BUSY_TIMEOUT,
+        "transaction_mode": "IMMEDIATE",
+        "init_command": (
+            "PRAGMA journal_mode=WAL;"
+            "PRAGMA synchronous=NORMAL;"
+            f"PRAGMA mmap_size={SQLITE_MMAP_SIZE};"
+            f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB};"
+            "PRAGMA temp_store=MEMORY;"
+        ),
+    }
+
 DATABASES = {
     'default': {
         "ENGINE": 'django.db.backends.sqlite3',
         "NAME": BASE_DIR / "db.sqlite3",
-
+        "OPTIONS": SQLITE_OPTIONS,
     }
 }
 
@@ -149,6 +194,175 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOWS_CREDENTIALS = True
 
+# Uploaded documents waiting for a generation worker are stored here
+MEDIA_ROOT = BASE_DIR / "media"
+
+# ============================================
+# FLASHCARD GENERATION WORKERS
+# ============================================
+# Uploads are processed by `python manage.py run_generation_worker`
+# How long an idle worker waits before checking the queue again (seconds)
+GENERATION_WORKER_POLL_INTERVAL = float(os.getenv("GENERATION_WORKER_POLL_INTERVAL", "1.0"))
+# Jobs each worker process runs at the same time (one thread each). Jobs
+# spend most of their time waiting on Gemini, so a batch upload finishes
+# much sooner with several
+GENERATION_WORKER_THREADS = int(os.getenv("GENERATION_WORKER_THREADS", "4"))
+# Most files accepted by one batch upload (POST /api/topics/batch/)
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "30"))
+
+# Generated flashcards are inserted in batches of this many rows
+FLASHCARD_BULK_BATCH_SIZE = int(os.getenv("FLASHCARD_BULK_BATCH_SIZE", "500"))
+# Deck imports (POST /api/topics/import/): largest accepted file, and how
+# many cards are saved per transaction (see api/deck_io.py)
+IMPORT_MAX_FILE_SIZE = int(os.getenv("IMPORT_MAX_FILE_SIZE_MB", "50")) * 1024 * 1024
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "2000"))
+# Files at least this big are imported by a worker (202 + a job to poll)
+# instead of in the request - about 2,500 cards, a few seconds of work
+IMPORT_QUEUE_MIN_SIZE = int(os.getenv("IMPORT_QUEUE_MIN_SIZE_KB", "256")) * 1024
+# What to do with a new card that nearly repeats one already in the topic
+# (see api/dedupe.py): "skip" it, "merge" it into the existing card, or
+# "off" to keep every card
+FLASHCARD_DEDUPE = os.getenv("FLASHCARD_DEDUPE", "skip")
+# How many of their words two cards must share (0.0 - 1.0) to count as
+# near-duplicates
+FLASHCARD_DEDUPE_THRESHOLD = float(os.getenv("FLASHCARD_DEDUPE_THRESHOLD", "0.65"))
+# Ask Gemini for JSON matching our flashcard schema (structured output)
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "True") == "True"
+# Stream Gemini's answer and save each flashcard as soon as it's complete,
+# instead of saving the whole deck at the end
+LLM_STREAMING = os.getenv("LLM_STREAMING", "True") == "True"
+# How often GET /api/jobs/<id>/events/ checks for new cards (seconds)
+JOB_EVENTS_POLL_INTERVAL = float(os.getenv("JOB_EVENTS_POLL_INTERVAL", "0.5"))
+# How long the sync (WSGI) event stream may hold a worker thread before it
+# ends and the frontend polls instead (seconds, 0 = no limit). The async
+# view (ASYNC_VIEWS) doesn't hold a thread and streams until the job is done
+JOB_EVENTS_MAX_SECONDS = float(os.getenv("JOB_EVENTS_MAX_SECONDS", "60"))
+# A running job's worker checks in (heartbeat) every third of this many
+# seconds; a job that missed a whole lease is presumed lost with its worker
+# (crash, deploy, killed web process) and queued again
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+# Attempts before a job whose worker keeps disappearing is marked failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# ============================================
+# ASYNC REQUEST PATH (ASGI)
+# ============================================
+# Serve uploads and deck pages with the async views in api/async_views.py.
+# Only worth it under an ASGI server:
+#     ASYNC_VIEWS=True uvicorn backend.asgi:application
+# Uploads are then generated inside the web process (no worker needed).
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "False") == "True"
+# Generations one web process runs at once; further uploads stay queued
+# for run_generation_worker
+ASYNC_MAX_GENERATIONS = int(os.getenv("ASYNC_MAX_GENERATIONS", "200"))
+# Threads extracting text for those generations (extraction is CPU-bound,
+# so this stays small no matter how many generations are waiting on Gemini)
+ASYNC_EXTRACT_WORKERS = int(os.getenv("ASYNC_EXTRACT_WORKERS", "4"))
+
+# ============================================
+# CACHE
+# ============================================
+# Serialized deck pages are cached here (see api/deck_cache.py).
+# The default in-process cache is fine for one web process; point
+# CACHE_LOCATION at a shared backend (e.g. Redis) when running several.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "help2study"),
+    }
+}
+# How long a cached deck page is kept (seconds). Entries never go stale -
+# a changed deck gets a new version and therefore a new key.
+DECK_CACHE_TIMEOUT = int(os.getenv("DECK_CACHE_TIMEOUT", str(60 * 60)))
+
+# ============================================
+# LLM PROVIDER
+# ============================================
+# "gemini" (needs API_KEY) or "fake" (offline, for tests and load tests;
+# see api/llm_providers.py)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+# Fake provider behaviour
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.5"))      # seconds per response
+FAKE_LLM_CARDS = int(os.getenv("FAKE_LLM_CARDS", "10"))              # flashcards per response
+FAKE_LLM_ANSWER_CHARS = int(os.getenv("FAKE_LLM_ANSWER_CHARS", "200"))
+FAKE_LLM_FAILURE_RATE = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))  # 0.0 - 1.0
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+
+# ============================================
+# GEMINI RATE LIMITS AND RETRIES
+# ============================================
+# Token buckets shared by all processes (see api/rate_limit.py).
+# Requests per minute for everyone together (0 = no limit) ...
+LLM_RATE_LIMIT_PER_MINUTE = float(os.getenv("LLM_RATE_LIMIT_PER_MINUTE", "60"))
+LLM_RATE_LIMIT_BURST = float(os.getenv("LLM_RATE_LIMIT_BURST", "10"))
+# ... and for each user
+LLM_USER_RATE_LIMIT_PER_MINUTE = float(os.getenv("LLM_USER_RATE_LIMIT_PER_MINUTE", "20"))
+LLM_USER_RATE_LIMIT_BURST = float(os.getenv("LLM_USER_RATE_LIMIT_BURST", "5"))
+# Give up on a call that has waited this long for a token (seconds)
+LLM_RATE_LIMIT_MAX_WAIT = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", "120"))
+# Retries of 429/5xx errors, with exponential backoff between them (seconds)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "30"))
+# Stop calling Gemini for LLM_CIRCUIT_RESET_SECONDS after this many failures in a row
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+
+# ============================================
+# LARGE DOCUMENTS
+# ============================================
+# Text extraction stops once roughly this many tokens have been read
+# (0 = read the whole document)
+EXTRACT_MAX_TOKENS = int(os.getenv("EXTRACT_MAX_TOKENS", "500000"))
+# Strip repeated headers/footers, page numbers, hyphenation and duplicate
+# paragraphs from extracted text before prompting (see api/utils/preprocessing.py)
+TEXT_PREPROCESSING = os.getenv("TEXT_PREPROCESSING", "True") == "True"
+# Worker processes used to extract PDF pages in parallel (1 = no pool)
+PDF_EXTRACT_PROCESSES = int(os.getenv("PDF_EXTRACT_PROCESSES", "1"))
+# Documents are split into chunks of about this many tokens, and each
+# chunk is sent to Gemini separately (see api/utils/chunking.py)
+LLM_CHUNK_TOKENS = int(os.getenv("LLM_CHUNK_TOKENS", "8000"))
+# Maximum number of chunks sent to Gemini at the same time per document
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# Maximum number of LLM calls running at the same time in one process,
+# across all documents (see llm_slot() in api/rate_limit.py)
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "16"))
+
+# ============================================
+# UPLOADS AND EXTRACTED TEXT CACHE
+# ============================================
+# Same as Django's defaults, but each handler also computes the file's
+# SHA-256 while the upload streams in (see api/upload_handlers.py)
+FILE_UPLOAD_HANDLERS = [
+    "api.upload_handlers.Sha256MemoryFileUploadHandler",
+    "api.upload_handlers.Sha256TemporaryFileUploadHandler",
+]
+# Text extracted from a file is reused when the same file is uploaded again
+TEXT_CACHE_ENABLED = os.getenv("TEXT_CACHE_ENABLED", "True") == "True"
+# Least recently used entries are evicted beyond this many
+TEXT_CACHE_MAX_ENTRIES = int(os.getenv("TEXT_CACHE_MAX_ENTRIES", "2000"))
+
+# ============================================
+# GEMINI RESPONSE CACHE
+# ============================================
+# Flashcards generated for a document are reused when the same text is
+# uploaded again (see api/llm_cache.py)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True") == "True"
+# Least recently used entries are evicted beyond this many
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+# Entries older than this are regenerated (default: 30 days)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+
+# ============================================
+# STAGE TIMING
+# ============================================
+# Fraction of requests and generation jobs whose stage timings (upload,
+# extract, llm, persist, serialize) are recorded and logged to 'api.timing'
+# (see api/instrumentation.py). Everything is timed while developing.
+INSTRUMENTATION_SAMPLE_RATE = float(
+    os.getenv("INSTRUMENTATION_SAMPLE_RATE", "1.0" if DEBUG else "0.01")
+)
+
 # ============================================
 # LOGGING CONFIGURATION FOR PRESENTATION MODE
 # ============================================
@@ -10,6 +10,7 @@ import flashcardService from "@/services/flashcardService";
 function DisplayFlashcards() {
   const { id } = useParams();
   const [flashcards, setFlashcards] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [currentCardIndex, setCurrentCardIndex] = useState(0);
   const [isFlipped, setIsFlipped] = useState(false);
 
@@ -20,19 +21,32 @@ function DisplayFlashcards() {
   const getFlashcards = async () => {
     try {
       // Using flashcardService instead of calling API directly
-      const data = await flashcardService.getFlashcardsByTopic(id);
-      setFlashcards(data);
+      const page = await flashcardService.getFlashcardsByTopic(id);
+      setFlashcards(page.results);
+      setNextPage(page.next);
     } catch (err) {
       alert("Failed to load flashcards.");
       console.error(err);
     }
   };
 
-  const handleNextCard = () => {
-    if (currentCardIndex < flashcards.length - 1) {
-      setCurrentCardIndex(currentCardIndex + 1);
-      setIsFlipped(false);
+  const handleNextCard = async () => {
+    // Reached the last loaded card - fetch the next page of the deck first
+    if (currentCardIndex === flashcards.length - 1 && nextPage) {
+      try {
+        const page = await flashcardService.getFlashcardsByTopic(id, nextPage);
+        setFlashcards((loaded) => [...loaded, ...page.results]);
+        setNextPage(page.next);
+      } catch (err) {
+        alert("Failed to load more flashcards.");
+        console.error(err);
+        return;
+      }
+    } else if (currentCardIndex >= flashcards.length - 1) {
+      return;
     }
+    setCurrentCardIndex(currentCardIndex + 1);
+    setIsFlipped(false);
   };
 
   const handlePrevCard = () => {
@@ -75,7 +89,7 @@ function DisplayFlashcards() {
             {flashcards.topic}
           </h1>
           <p className="text-muted-foreground mt-1">
-            Card {currentCardIndex + 1} of {flashcards.length}
+            Card {currentCardIndex + 1} of {flashcards.length}{nextPage ? "+" : ""}
           </p>
         </div>
       </div>
@@ -126,7 +140,7 @@ function DisplayFlashcards() {
           variant="default"
           size="lg"
           onClick={handleNextCard}
-          disabled={currentCardIndex === flashcards.length - 1}
+          disabled={currentCardIndex === flashcards.length - 1 && !nextPage}
         >
           Next
           <ChevronRight className="ml-2 h-5 w-5" />
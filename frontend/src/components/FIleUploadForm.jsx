@@ -19,6 +19,44 @@ import { Label } from "@/components/ui/label";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
 import { Loader2, Upload, Check } from "lucide-react";
 
+// How often to ask the backend whether flashcard generation has finished
+const JOB_POLL_INTERVAL_MS = 2000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/**
+ * Poll a generation job until the backend reports it finished
+ *
+ * The upload request returns immediately (202 Accepted) while a worker
+ * generates the flashcards, so we check back every couple of seconds.
+ * Only used if the live event stream can't be opened.
+ */
+const waitForJob = async (jobId) => {
+  for (;;) {
+    const job = await topicService.getGenerationJob(jobId);
+    if (job.status === "done") return job;
+    if (job.status === "failed") throw new Error(job.error || "Flashcard generation failed");
+    await sleep(JOB_POLL_INTERVAL_MS);
+  }
+};
+
+/**
+ * Poll a batch upload until every file has finished
+ *
+ * @param {Function} onProgress - Called with each new state of the batch
+ */
+const waitForBatch = async (batchId, onProgress) => {
+  for (;;) {
+    const batch = await topicService.getGenerationBatch(batchId);
+    onProgress(batch);
+    if (batch.status !== "running") return batch;
+    await sleep(JOB_POLL_INTERVAL_MS);
+  }
+};
+
+const finishedFiles = (batch) =>
+  batch.jobs.filter((job) => job.status === "done" || job.status === "failed").length;
+
 function FileUploadForm() {
   /**
    * STATE MANAGEMENT - Tracking component data
@@ -30,8 +68,10 @@ function FileUploadForm() {
    */
   const [loading, setLoading] = useState(false);     // Is API call in progress?
   const [topic, setTopic] = useState("");            // Topic name from input
-  const [file, setFile] = useState(null);            // Selected file
+  const [files, setFiles] = useState([]);            // Selected file(s)
   const [apicall, setAPIcall] = useState(false);     // Was upload successful?
+  const [cards, setCards] = useState([]);            // Flashcards generated so far
+  const [batch, setBatch] = useState(null);          // Progress of a multi-file upload
   const navigate = useNavigate();                     // For navigation after success
 
   /**
@@ -58,14 +98,40 @@ function FileUploadForm() {
     e.preventDefault();           // Prevent page refresh (default form behavior)
 
     // Validate file was selected
-    if (!file) {
+    if (files.length === 0) {
       console.warn('⚠️ Validation failed: No file selected');
       alert("Please upload a file.");
       setLoading(false);
       return;
     }
 
-    console.log('📝 Form data collected:', { topic, fileName: file.name, fileType: file.type });
+    console.log('📝 Form data collected:', { topic, fileNames: files.map((f) => f.name) });
+    setAPIcall(false);
+    setCards([]);
+    setBatch(null);
+
+    // Several files: one batch request, then follow the whole batch
+    if (files.length > 1) {
+      try {
+        const queued = await topicService.createTopicsBatch(files, topic);
+        setBatch(queued);
+        const finished = await waitForBatch(queued.id, setBatch);
+        const problems = [
+          ...queued.rejected.map((r) => `${r.file}: ${r.error}`),
+          ...finished.jobs.filter((job) => job.status === "failed").map((job) => `${job.source_name}: ${job.error}`),
+        ];
+        if (finished.status === "failed") throw new Error(problems.join("\n"));
+        alert(problems.length ? `Flashcards created, except for:\n${problems.join("\n")}` : "Flashcards created");
+        setAPIcall(true);
+      } catch (err) {
+        console.error('❌ Error creating flashcards:', err);
+        alert("Failed to create flashcards. Please try again.");
+      } finally {
+        setLoading(false);
+      }
+      return;
+    }
+    const file = files[0];
 
     /**
      * FormData - For file uploads
@@ -76,7 +142,6 @@ function FileUploadForm() {
     const formData = new FormData();
     formData.append("name", topic);   // Add topic name
     formData.append("file", file);    // Add selected file
-    setAPIcall(false);
 
     console.log('📦 FormData prepared for upload');
 
@@ -89,7 +154,22 @@ function FileUploadForm() {
      * CONCEPTS: HTTP Request, Asynchronous JavaScript, Service Layer
      */
     try {
-      await topicService.createTopic(formData);
+      const job = await topicService.createTopic(formData);
+      console.log(`⏳ Generation job ${job.id} queued, waiting for flashcards...`);
+
+      // Show each flashcard the moment it's generated; fall back to
+      // polling if the event stream isn't available
+      let finished;
+      try {
+        finished = await topicService.streamGenerationJob(job.id, {
+          onCard: (card) => setCards((previous) => [...previous, card]),
+        });
+      } catch (streamError) {
+        console.warn("⚠️ Live updates unavailable, polling instead:", streamError);
+        finished = await waitForJob(job.id);
+      }
+      if (finished.status === "failed") throw new Error(finished.error || "Flashcard generation failed");
+
       // 🔵 REQUEST JOURNEY - STEP 8: UI Update
       console.log('%c🔵 REQUEST JOURNEY - STEP 8: Updating UI', 'color: #F39C12; font-weight: bold');
       console.log('✅ Flashcards created successfully!');
@@ -151,9 +231,16 @@ function FileUploadForm() {
           <div className="text-center">
             <h3 className="text-lg font-semibold">Creating Flashcards</h3>
             <p className="text-sm text-muted-foreground mt-1">
-              Processing your document...
+              {batch
+                ? `${finishedFiles(batch)} of ${batch.jobs.length} files done`
+                : cards.length === 0
+                ? "Processing your document..."
+                : `${cards.length} ${cards.length === 1 ? "card" : "cards"} so far`}
             </p>
           </div>
+          {cards.length > 0 && (
+            <p className="text-sm text-center italic">“{cards[cards.length - 1].question}”</p>
+          )}
         </CardContent>
       </Card>
     );
@@ -194,17 +281,19 @@ function FileUploadForm() {
 
           {/* File input */}
           <div className="space-y-2">
-            <Label htmlFor="file-upload">Upload Document</Label>
+            <Label htmlFor="file-upload">Upload Documents</Label>
             <div className="grid w-full items-center gap-1.5">
               <Input
                 id="file-upload"
                 type="file"
-                onChange={(e) => setFile(e.target.files[0])}
+                onChange={(e) => setFiles(Array.from(e.target.files))}
                 accept=".pdf,.txt,.docx"
+                multiple
                 className="cursor-pointer"
               />
               <p className="text-xs text-muted-foreground">
-                Accepted formats: PDF, TXT, DOCX
+                Accepted formats: PDF, TXT, DOCX. Select several files to
+                upload them together into this topic.
               </p>
             </div>
           </div>
@@ -9,6 +9,7 @@ import { useState, useEffect } from "react"
 
 function FlashcardTopics() {
   const [topics, setTopics] = useState([])
+  const [nextPage, setNextPage] = useState(null)
   const [isLoading, setIsLoading] = useState(true)
   const [error, setError] = useState(null)
 
@@ -20,8 +21,9 @@ function FlashcardTopics() {
     setIsLoading(true)
     try {
       // Using topicService instead of calling API directly
-      const data = await topicService.getAllTopics()
-      setTopics(data)
+      const page = await topicService.getAllTopics()
+      setTopics(page.results)
+      setNextPage(page.next)
       setIsLoading(false)
     } catch (err) {
       setError("Failed to load topics")
@@ -30,6 +32,17 @@ function FlashcardTopics() {
     }
   }
 
+  const loadMoreTopics = async () => {
+    try {
+      const page = await topicService.getAllTopics(nextPage)
+      setTopics((loaded) => [...loaded, ...page.results])
+      setNextPage(page.next)
+    } catch (err) {
+      alert("Failed to load more topics.")
+      console.error(err)
+    }
+  }
+
   const deleteTopic = async (id, e) => {
     // Prevent the click from navigating to the topic page
     e.stopPropagation()
@@ -106,7 +119,12 @@ function FlashcardTopics() {
                   </CardDescription>
                 </CardHeader>
                 <CardFooter className="flex justify-between items-center">
-                  <div className="text-sm text-muted-foreground">Click to view cards</div>
+                  <div className="text-sm text-muted-foreground">
+                    {topic.flashcard_count} {topic.flashcard_count === 1 ? "card" : "cards"}
+                    {topic.last_card_at && (
+                      <span> · updated {new Date(topic.last_card_at).toLocaleDateString("en-US", { month: "short", day: "numeric" })}</span>
+                    )}
+                  </div>
                   <Button variant="destructive" size="sm" onClick={(e) => deleteTopic(topic.id, e)} className="ml-auto">
                     <Trash2 className="h-4 w-4" />
                     <span className="sr-only">Delete topic</span>
@@ -117,6 +135,14 @@ function FlashcardTopics() {
           ))}
         </div>
       )}
+
+      {nextPage && (
+        <div className="mt-8 flex justify-center">
+          <Button variant="outline" onClick={loadMoreTopics}>
+            Load more topics
+          </Button>
+        </div>
+      )}
     </div>
   )
 }
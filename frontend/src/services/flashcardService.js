@@ -22,15 +22,16 @@
 import api from "../api";
 
 /**
- * Fetch all flashcards for a specific topic
+ * Fetch one page of flashcards for a specific topic
  *
  * @param {number} topicId - ID of the topic
- * @returns {Promise<Array>} Array of flashcard objects
+ * @param {string|null} nextUrl - The "next" link from the previous page, or null for the first page
+ * @returns {Promise<Object>} { results: Array of flashcard objects, next: URL of the next page or null }
  * @throws {Error} If API call fails
  *
  * EXAMPLE USAGE:
- *   const flashcards = await flashcardService.getFlashcardsByTopic(5);
- *   console.log(flashcards); // [{ id: 1, question: "...", answer: "..." }, ...]
+ *   const page = await flashcardService.getFlashcardsByTopic(5);
+ *   console.log(page.results); // [{ id: 1, question: "...", answer: "..." }, ...]
  *
  * EDUCATIONAL NOTE - REST API:
  * The endpoint /api/flashcards/:id follows RESTful convention:
@@ -38,8 +39,8 @@ import api from "../api";
  * - Identifier: :id (topic ID)
  * - Action: GET (read)
  */
-export const getFlashcardsByTopic = async (topicId) => {
-  const response = await api.get(`/api/flashcards/${topicId}/`);
+export const getFlashcardsByTopic = async (topicId, nextUrl = null) => {
+  const response = await api.get(nextUrl ?? `/api/flashcards/${topicId}/`);
   return response.data;
 };
 
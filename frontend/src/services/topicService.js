@@ -31,38 +31,50 @@
  */
 
 import api from "../api";
+import { ACCESS_TOKEN } from "../constants";
 
 /**
- * Fetch all topics for the current user
+ * Fetch one page of topics for the current user (newest first)
  *
- * @returns {Promise<Array>} Array of topic objects
+ * @param {string|null} nextUrl - The "next" link from the previous page, or null for the first page
+ * @returns {Promise<Object>} { results: Array of topic objects, next: URL of the next page or null }
  * @throws {Error} If API call fails
  *
  * EXAMPLE USAGE:
- *   const topics = await topicService.getAllTopics();
- *   console.log(topics); // [{ id: 1, name: "Math", created_at: "..." }, ...]
+ *   const page = await topicService.getAllTopics();
+ *   console.log(page.results); // [{ id: 1, name: "Math", created_at: "..." }, ...]
+ *   if (page.next) await topicService.getAllTopics(page.next);
+ *
+ * EDUCATIONAL NOTE - PAGINATION:
+ * The backend returns topics a page at a time so the response stays small
+ * no matter how many topics a user has. Pass the "next" link back in to
+ * load more.
  */
-export const getAllTopics = async () => {
-  const response = await api.get("/api/topics/");
+export const getAllTopics = async (nextUrl = null) => {
+  const response = await api.get(nextUrl ?? "/api/topics/");
   return response.data;
 };
 
 /**
- * Create a new topic with flashcards from uploaded file
+ * Queue creation of a new topic with flashcards from uploaded file
  *
  * @param {FormData} formData - Contains 'name' (topic name) and 'file' (uploaded document)
- * @returns {Promise<Object>} Created topic object
+ * @returns {Promise<Object>} Generation job object ({ id, status, ... })
  * @throws {Error} If API call fails or validation fails
  *
  * EXAMPLE USAGE:
  *   const formData = new FormData();
  *   formData.append('name', 'Biology Chapter 1');
  *   formData.append('file', fileObject);
- *   const newTopic = await topicService.createTopic(formData);
+ *   const job = await topicService.createTopic(formData);
  *
  * EDUCATIONAL NOTE - FormData:
  * FormData is used for file uploads. It creates multipart/form-data format
  * which is required for sending files over HTTP.
+ *
+ * EDUCATIONAL NOTE - 202 Accepted:
+ * The backend answers before the flashcards exist. Poll the returned job
+ * with getGenerationJob() until its status is "done" or "failed".
  */
 export const createTopic = async (formData) => {
   const response = await api.post("/api/topics/", formData, {
@@ -73,6 +85,128 @@ export const createTopic = async (formData) => {
   return response.data;
 };
 
+/**
+ * Queue several documents at once (e.g. a whole semester's lecture notes)
+ *
+ * @param {File[]} files - The documents to upload
+ * @param {string} name - Topic that collects every file's flashcards
+ *                        (leave empty to get one topic per file, named after it)
+ * @returns {Promise<Object>} Batch object ({ id, status, jobs: [...], rejected: [...] })
+ * @throws {Error} If API call fails or none of the files can be used
+ *
+ * EXAMPLE USAGE:
+ *   const batch = await topicService.createTopicsBatch(fileList, "Biology");
+ *   batch.rejected.forEach((r) => console.warn(r.file, r.error));
+ *
+ * EDUCATIONAL NOTE - REPEATED FORM FIELDS:
+ * Appending "files" once per file sends them all in one request; Django
+ * reads them back with request.FILES.getlist("files"). Each file becomes
+ * its own job on the backend, so they are generated in parallel.
+ */
+export const createTopicsBatch = async (files, name = "") => {
+  const formData = new FormData();
+  for (const file of files) formData.append("files", file);
+  if (name) formData.append("name", name);
+  const response = await api.post("/api/topics/batch/", formData, {
+    headers: {
+      "Content-Type": "multipart/form-data",
+    },
+  });
+  return response.data;
+};
+
+/**
+ * Fetch the current state of a batch upload and each of its files
+ *
+ * @param {number} batchId - ID returned by createTopicsBatch()
+ * @returns {Promise<Object>} Batch with status "running" | "done" | "failed" and its jobs
+ * @throws {Error} If API call fails
+ */
+export const getGenerationBatch = async (batchId) => {
+  const response = await api.get(`/api/batches/${batchId}/`);
+  return response.data;
+};
+
+/**
+ * Fetch the current state of a flashcard generation job
+ *
+ * @param {number} jobId - ID returned by createTopic()
+ * @returns {Promise<Object>} Job object with status "queued" | "running" | "done" | "failed"
+ * @throws {Error} If API call fails
+ *
+ * EXAMPLE USAGE:
+ *   const job = await topicService.getGenerationJob(7);
+ *   if (job.status === "done") console.log(`${job.flashcard_count} cards ready`);
+ */
+export const getGenerationJob = async (jobId) => {
+  const response = await api.get(`/api/jobs/${jobId}/`);
+  return response.data;
+};
+
+/**
+ * Follow a generation job live, receiving each flashcard as it is created
+ *
+ * @param {number} jobId - ID returned by createTopic()
+ * @param {Object} handlers - { onJob(job), onCard(flashcard) }, both optional
+ * @returns {Promise<Object>} The finished job (status "done" or "failed")
+ * @throws {Error} If the stream can't be opened or ends before the job finishes
+ *
+ * EXAMPLE USAGE:
+ *   const job = await topicService.streamGenerationJob(7, {
+ *     onCard: (card) => console.log("New card:", card.question),
+ *   });
+ *
+ * EDUCATIONAL NOTE - SERVER-SENT EVENTS:
+ * The backend keeps the response open and writes an event every time
+ * something happens ("event: card\ndata: {...}\n\n"). The browser's
+ * EventSource can't send our JWT header, so we read the stream with
+ * fetch() and split it into events ourselves.
+ */
+export const streamGenerationJob = async (jobId, { onJob, onCard } = {}) => {
+  const response = await fetch(`${import.meta.env.VITE_API_URL}/api/jobs/${jobId}/events/`, {
+    headers: {
+      Accept: "text/event-stream",
+      Authorization: `Bearer ${localStorage.getItem(ACCESS_TOKEN)}`,
+    },
+  });
+  if (!response.ok) throw new Error(`Event stream failed with status ${response.status}`);
+
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  let job = null;
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+
+    // Events are separated by a blank line; the last piece may be incomplete
+    const events = buffer.split("\n\n");
+    buffer = events.pop();
+
+    for (const event of events) {
+      let name = "message";
+      let data = "";
+      for (const line of event.split("\n")) {
+        if (line.startsWith("event: ")) name = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      if (!data) continue; // keepalive comment
+
+      if (name === "card") onCard?.(JSON.parse(data));
+      if (name === "job") {
+        job = JSON.parse(data);
+        onJob?.(job);
+      }
+    }
+  }
+
+  if (!job || (job.status !== "done" && job.status !== "failed")) {
+    throw new Error("Event stream ended before the job finished");
+  }
+  return job;
+};
+
 /**
  * Delete a topic and all its flashcards
  *
@@ -108,6 +242,10 @@ export const deleteTopic = async (topicId) => {
 export default {
   getAllTopics,
   createTopic,
+  createTopicsBatch,
+  getGenerationBatch,
+  getGenerationJob,
+  streamGenerationJob,
   deleteTopic,
 };
 